@@ -0,0 +1,46 @@
+# To start command: python3 benchmarks/bench_entropy.py --length 16
+#
+# Mikro-benchmark: secrets.choice + random.shuffle kontra bufor EntropyPool.
+
+import argparse, random, secrets, string, sys, timeit
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from entropy import EntropyPool
+
+
+ALPHABET = string.ascii_letters + string.digits + string.punctuation
+
+
+def legacy(length):
+    """Dotychczasowe podejście: wywołanie secrets.choice na każdy znak"""
+    password = [secrets.choice(ALPHABET) for _ in range(length)]
+    random.shuffle(password)
+    return ''.join(password)
+
+
+def pooled(pool, length):
+    """Jeden odczyt bufora na całe hasło + tasowanie na CSPRNG"""
+    password = list(pool.sample_chars(ALPHABET, length))
+    pool.shuffle(password)
+    return ''.join(password)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FortiPass® entropy pool micro-benchmark.")
+    parser.add_argument("--length", type=int, default=16)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    pool = EntropyPool()
+    results = {
+        "secrets.choice + random.shuffle": timeit.timeit(lambda: legacy(args.length), number=args.number),
+        "EntropyPool": timeit.timeit(lambda: pooled(pool, args.length), number=args.number),
+    }
+    baseline = results["secrets.choice + random.shuffle"]
+    for name, elapsed in results.items():
+        print(f"{name:<34} {args.number / elapsed:>12,.0f} passwords/s   x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
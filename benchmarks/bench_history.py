@@ -0,0 +1,71 @@
+# To start command: python3 benchmarks/bench_history.py --entries 1000000
+#
+# Benchmark szyfrowanej historii haseł: zapis partiami (jeden fsync na partię), otwarcie z zapisanym
+# indeksem i bez niego (odtworzenie po awarii), wyszukiwanie po etykiecie, usunięcie i kompaktowanie.
+
+import argparse, os, random, sys, tempfile, time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from generator import get_policy, iter_passwords
+from history import PasswordHistory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password history store benchmark.")
+    parser.add_argument("--entries", type=int, default=1_000_000, help="Number of stored passwords.")
+    parser.add_argument("--batch", type=int, default=10_000, help="Entries per fsync.")
+    parser.add_argument("--lookups", type=int, default=10_000, help="Random lookups by label.")
+    args = parser.parse_args()
+
+    passphrase = "benchmark passphrase"
+    with tempfile.TemporaryDirectory(prefix="fortipass-history-") as directory:
+        path = Path(directory) / "history.fpv"
+        history = PasswordHistory(path, passphrase)
+        policy = get_policy(16)
+        elapsed, number = 0.0, 0
+        for chunk in iter_passwords(args.entries, policy, chunk_size=args.batch):
+            entries = [(f"entry-{number + i}", password, {"length": 16, "strength": "strong"})
+                       for i, password in enumerate(chunk)]
+            start = time.perf_counter()
+            history.put_many(entries)
+            elapsed += time.perf_counter() - start
+            number += len(chunk)
+        print(f"Insert: {args.entries} entries in {elapsed:.1f} s ({args.entries / elapsed:,.0f} entries/s, "
+              f"batches of {args.batch})")
+        start = time.perf_counter()
+        history.close()
+        print(f"Close (index): {time.perf_counter() - start:.2f} s, data {path.stat().st_size >> 20} MiB, "
+              f"index {history.index_path.stat().st_size >> 20} MiB")
+
+        start = time.perf_counter()
+        history = PasswordHistory(path, passphrase)
+        print(f"Open with index: {(time.perf_counter() - start) * 1000:.0f} ms (scrypt included), "
+              f"{len(history)} entries")
+
+        labels = [f"entry-{random.randrange(args.entries)}" for _ in range(args.lookups)]
+        start = time.perf_counter()
+        for label in labels:
+            history.get(label)
+        print(f"Lookup: {(time.perf_counter() - start) / len(labels) * 1e6:.1f} us per label (decrypted)")
+
+        history.close()
+        os.unlink(history.index_path)
+        start = time.perf_counter()
+        history = PasswordHistory(path, passphrase)
+        print(f"Open without index (recovery scan): {time.perf_counter() - start:.2f} s")
+
+        start = time.perf_counter()
+        with history.batch():
+            for i in range(0, args.entries, 3):
+                history.delete(f"entry-{i}", sync=False)
+        print(f"Delete: {-(-args.entries // 3)} entries in {time.perf_counter() - start:.1f} s")
+        start = time.perf_counter()
+        kept = history.compact()
+        print(f"Compact: {kept} entries kept in {time.perf_counter() - start:.1f} s, "
+              f"data {path.stat().st_size >> 20} MiB")
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
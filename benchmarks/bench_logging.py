@@ -0,0 +1,88 @@
+# To start command: python3 benchmarks/bench_logging.py --clicks 5000
+#
+# Benchmark kosztu rejestrowania w wątku interfejsu: poprzednia konfiguracja (basicConfig, DEBUG,
+# zapis i opróżnienie bufora przy każdym wpisie) i potok z kolejką (INFO, zapis w tle).
+
+import argparse, logging, sys, tempfile, time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from logsetup import BatchingFileHandler, create_pipeline, LOG_FORMAT
+
+
+def click(logger, length, composition):
+    """Wpisy jednego kliknięcia 'Generuj hasło' (jak w PasswordGeneratorApp.generate_password)"""
+    logger.debug("Starting the password generation.".upper())
+    logger.warning("Initializing the password generation process.")
+    logger.info("Length: %s.", length)
+    logger.info("Include: %s.", ", ".join(composition))
+    logger.info("Strength: %s.", "strong")
+    logger.info("The password generated successfully.")
+
+
+def click_eager(logger, length, composition):
+    """Te same wpisy w poprzedniej postaci (f-stringi formatowane zawsze)"""
+    logger.debug("Starting the password generation.".upper())
+    logger.warning("Initializing the password generation process.")
+    logger.info(f"Length: {length}.")
+    logger.info(f"Include: {', '.join(composition)}.")
+    logger.info(f"Strength: {'strong'}.")
+    logger.info(f"The password generated successfully.")
+
+
+def measure(logger, clicks, action, pause):
+    """Czasy kolejnych kliknięć w wątku wywołującym (s); pause - przerwa między kliknięciami"""
+    composition = ["letters", "digits", "special characters"]
+    timer = time.perf_counter
+    samples = []
+    for _ in range(clicks):
+        start = timer()
+        action(logger, 12, composition)
+        samples.append(timer() - start)
+        if pause:
+            time.sleep(pause)
+    return sorted(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FortiPass® logging cost benchmark.")
+    parser.add_argument("--clicks", type=int, default=5000)
+    parser.add_argument("--pause-ms", type=float, default=1.0,
+                        help="Pause between clicks (0: back-to-back, the writer competes for the CPU).")
+    args = parser.parse_args()
+    pause = args.pause_ms / 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Poprzednio: FileHandler na poziomie DEBUG w wątku wywołującym
+        old = logging.getLogger("bench.synchronous")
+        old.propagate = False
+        old.setLevel(logging.DEBUG)
+        handler = logging.FileHandler(Path(directory) / "synchronous.log")
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        old.addHandler(handler)
+        old_samples = measure(old, args.clicks, click_eager, pause)
+        handler.close()
+
+        # Teraz: kolejka, INFO, formatowanie i zapis w wątku w tle
+        new = logging.getLogger("bench.queued")
+        new.propagate = False
+        new.setLevel(logging.INFO)
+        queue_handler, listener = create_pipeline(BatchingFileHandler(Path(directory) / "queued.log"), "INFO")
+        new.addHandler(queue_handler)
+        listener.start()
+        new_samples = measure(new, args.clicks, click, pause)
+        drain_start = time.perf_counter()
+        listener.stop()
+        drain_time = time.perf_counter() - drain_start
+        listener.handlers[0].close()
+
+    for name, samples in (("synchronous, DEBUG", old_samples), ("queued, INFO", new_samples)):
+        mean = sum(samples) / len(samples)
+        print(f"{name:<20} mean {mean * 1e6:8.2f} us/click ({mean / 6 * 1e6:6.2f} us/call)   "
+              f"p50 {samples[len(samples) // 2] * 1e6:8.2f} us   p99 {samples[int(len(samples) * 0.99)] * 1e6:8.2f} us   "
+              f"max {samples[-1] * 1e6:9.2f} us")
+    print(f"The background writer finished {drain_time * 1000:.1f} ms after the last call.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# To start command: python3 benchmarks/bench_mailer.py --messages 500 --latency-ms 5
+#
+# Benchmark wysyłki haseł e-mailem do lokalnego serwera SMTP (smtpsink) z opóźnieniem odpowiedzi udającym sieć:
+# wiadomości/s dla różnej liczby połączeń, z PIPELINING i bez niego, oraz koszt szyfrowania załącznika (scrypt).
+
+import argparse, sys, time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.append(str(Path(__file__).resolve().parent.parent / "tests"))  # smtpsink
+from generator import get_policy
+from crypto import SCRYPT_N, SCRYPT_R, SCRYPT_P
+from mailer import MailPool, Recipient, seal, password_jobs
+from smtpsink import SmtpSink
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encrypted password e-mail delivery benchmark.")
+    parser.add_argument("--messages", type=int, default=500, help="Messages per run.")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated network round trip (ms).")
+    parser.add_argument("--connections", default="1,4,8", help="Comma separated numbers of SMTP connections.")
+    parser.add_argument("--seals", type=int, default=20, help="Attachments sealed with the default scrypt cost.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for _ in range(args.seals):
+        seal("S3cret!password", "passphrase", (SCRYPT_N, SCRYPT_R, SCRYPT_P))
+    print(f"Sealing (scrypt n={SCRYPT_N}): {(time.perf_counter() - start) / args.seals * 1000:.1f} ms per attachment")
+
+    # Tani scrypt w pomiarach wysyłki - mierzony jest transport SMTP
+    kdf = (1 << 10, 8, 1)
+    policy = get_policy(16)
+    passwords = {}
+    recipients = [Recipient(f"user{i}@example.com", f"User {i}", f"passphrase-{i}") for i in range(args.messages)]
+    print(f"{'connections':>11} {'pipelining':>10} {'messages/s':>11} {'round trips':>12}")
+    for connections in map(int, args.connections.split(",")):
+        for pipelining in (False, True):
+            with SmtpSink(pipelining=pipelining, latency=args.latency_ms / 1000) as sink:
+                pool = MailPool("127.0.0.1", sink.port, connections=connections)
+                jobs = password_jobs(recipients, "it@example.com", "Welcome", policy, passwords.__setitem__, kdf)
+                report = pool.deliver(jobs)
+            assert report.sent == args.messages, report.failed
+            print(f"{connections:>11} {'yes' if pipelining else 'no':>10} {report.rate:>11,.1f} "
+                  f"{sink.round_trips:>12}")
+
+
+if __name__ == "__main__":
+    main()
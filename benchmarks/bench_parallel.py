@@ -0,0 +1,43 @@
+# To start command: python3 benchmarks/bench_parallel.py --count 200000
+#
+# Benchmark trybu wieloprocesowego: hasła/s dla 1, 2, 4 i 8 procesów.
+
+import argparse, sys, time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from generator import Policy, iter_passwords
+from parallel import iter_passwords_parallel, default_workers
+
+
+def run(count, length, workers, chunk_size, ordered):
+    """Zwraca liczbę haseł na sekundę dla podanej liczby procesów"""
+    policy = Policy(length)
+    start = time.perf_counter()
+    if workers == 1:
+        chunks = iter_passwords(count, policy, chunk_size)
+    else:
+        chunks = iter_passwords_parallel(count, policy, workers, chunk_size, ordered)
+    generated = sum(len(chunk) for chunk in chunks)
+    return generated / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FortiPass® parallel generation benchmark.")
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--length", type=int, default=16)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--unordered", action="store_true")
+    args = parser.parse_args()
+
+    print(f"CPU cores available: {default_workers()}")
+    baseline = None
+    for workers in args.workers:
+        rate = run(args.count, args.length, workers, args.chunk_size, not args.unordered)
+        baseline = baseline or rate
+        print(f"workers={workers:<3} {rate:>12,.0f} passwords/s   speedup x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# To start command: python3 benchmarks/bench_server.py --requests 5000 --concurrency 16
+#
+# Test obciążeniowy usługi 'fortipass serve': opóźnienie p50/p99 i liczba żądań na sekundę.
+# Bez --url/--unix-socket uruchamia lokalną instancję na wolnym porcie.
+
+import argparse, asyncio, json, subprocess, sys, time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+async def open_connection(args):
+    if args.unix_socket:
+        return await asyncio.open_unix_connection(args.unix_socket)
+    url = urlsplit(args.url)
+    return await asyncio.open_connection(url.hostname, url.port or 80)
+
+
+def build_request(args):
+    """Żądanie HTTP/1.1 z keep-alive dla wybranej ścieżki"""
+    if args.endpoint == "strength":
+        body = json.dumps({"passwords": ["x7#Qm9!vR2$kLp", "Weak123", "k7Rm2pQx9wZb"] * (args.count // 3 or 1)})
+        return (f"POST /strength HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n{body}").encode()
+    return (f"GET /generate?count={args.count}&length={args.length} HTTP/1.1\r\n"
+            f"Host: localhost\r\n\r\n").encode()
+
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(args, request, remaining, latencies, errors):
+    """Jedno połączenie wysyłające kolejne żądania, dopóki licznik się nie wyczerpie"""
+    reader, writer = await open_connection(args)
+    try:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors[0] += 1
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run(args):
+    request = build_request(args)
+    remaining, latencies, errors = [args.requests], [], [0]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args, request, remaining, latencies, errors)
+                           for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"endpoint=/{args.endpoint} count={args.count} concurrency={args.concurrency}")
+    print(f"requests {len(latencies)}, errors {errors[0]}, {len(latencies) / elapsed:,.0f} requests/s")
+    print(f"latency p50 {percentile(latencies, 0.50) * 1000:.2f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+
+
+def start_local(args):
+    """Uruchamia 'fortipass serve' w podprocesie i czeka na gotowość"""
+    command = [sys.executable, str(SRC / "main.py"), "serve", "--port", "0"]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    process = subprocess.Popen(command, stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline()
+    if not line.startswith("Serving on "):
+        process.kill()
+        raise SystemExit(f"The server did not start: {line.strip()}")
+    args.url = line.split()[2]
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FortiPass® HTTP service load test.")
+    parser.add_argument("--url", help="Running instance, e.g. http://127.0.0.1:8765.")
+    parser.add_argument("--unix-socket", help="Running instance listening on a Unix socket.")
+    parser.add_argument("--endpoint", choices=("generate", "strength"), default="generate")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--count", type=int, default=10, help="Passwords per request.")
+    parser.add_argument("--length", type=int, default=16)
+    parser.add_argument("--workers", type=int, help="Worker processes of the local instance.")
+    args = parser.parse_args()
+
+    process = None if args.url or args.unix_socket else start_local(args)
+    try:
+        asyncio.run(run(args))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# To start command: python3 benchmarks/bench_startup.py --runs 10
+#
+# Benchmark czasu uruchomienia: import modułu main (-X importtime), start trybu CLI
+# oraz czas do pierwszej klatki okna i do końca odroczonej inicjalizacji (wymaga ekranu).
+# Zimny start: pusty katalog kodu bajtowego (PYTHONPYCACHEPREFIX), ciepły: kod bajtowy w pamięci podręcznej.
+
+import argparse, os, statistics, subprocess, sys, tempfile, time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+# Pomiar w nowym interpreterze: znaczniki czasu od chwili uruchomienia procesu
+GUI_PROBE = """
+import sys, time
+import main
+root, app = main.create_window()
+marks = {}
+
+def on_map(event):
+    if event.widget is root and "first_frame" not in marks:
+        root.update_idletasks()
+        marks["first_frame"] = time.time()
+
+def wait_for_startup():
+    if app.startup_complete:
+        marks["startup_complete"] = time.time()
+        print(marks["first_frame"], marks["startup_complete"])
+        app.locker.unlock_instance()
+        root.destroy()
+    else:
+        root.after(1, wait_for_startup)
+
+root.bind("<Map>", on_map, add="+")
+root.after(1, wait_for_startup)
+root.mainloop()
+"""
+
+
+def environment(cold):
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    if cold:
+        env["PYTHONPYCACHEPREFIX"] = tempfile.mkdtemp(prefix="fortipass-pycache-")
+    return env
+
+
+def import_time(cold):
+    """Skumulowany czas importu modułu main (ms) według -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            env=environment(cold), capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == "main":
+            return int(fields[1]) / 1000
+    raise RuntimeError("The import of main was not reported.")
+
+
+def cli_time(cold):
+    """Czas (ms) od uruchomienia do zakończenia 'main.py gen --count 1'"""
+    start = time.time()
+    subprocess.run([sys.executable, str(SRC / "main.py"), "gen", "--count", "1", "--quiet", "-o", os.devnull],
+                   env=environment(cold), check=True)
+    return (time.time() - start) * 1000
+
+
+def gui_times(cold):
+    """Czas (ms) do pierwszej klatki i do końca odroczonej inicjalizacji"""
+    start = time.time()
+    result = subprocess.run([sys.executable, "-c", GUI_PROBE], env=environment(cold),
+                            capture_output=True, text=True, check=True, cwd=SRC)
+    first_frame, complete = map(float, result.stdout.split())
+    return (first_frame - start) * 1000, (complete - start) * 1000
+
+
+def report(name, samples):
+    print(f"{name:<32} median {statistics.median(samples):8.1f} ms   "
+          f"min {min(samples):8.1f} ms   max {max(samples):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FortiPass® startup time benchmark.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--no-gui", action="store_true", help="Skip the time-to-first-frame measurement.")
+    args = parser.parse_args()
+
+    gui = not args.no_gui and bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    for cold in (True, False):
+        label = "cold" if cold else "warm"
+        if not cold:
+            import_time(False)  # zapełnienie pamięci podręcznej kodu bajtowego
+        report(f"{label}: import main", [import_time(cold) for _ in range(args.runs)])
+        report(f"{label}: CLI 'gen --count 1'", [cli_time(cold) for _ in range(args.runs)])
+        if gui:
+            frames, completes = zip(*(gui_times(cold) for _ in range(args.runs)))
+            report(f"{label}: time to first frame", frames)
+            report(f"{label}: deferred startup done", completes)
+    if not gui:
+        print("Time to first frame skipped: no display available.")
+
+
+if __name__ == "__main__":
+    main()
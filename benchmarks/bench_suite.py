@@ -0,0 +1,240 @@
+# To start command: python3 benchmarks/bench_suite.py --output baseline.json
+#                   python3 benchmarks/bench_suite.py --compare baseline.json
+#
+# Zestaw benchmarków bez ekranu: generowanie haseł (długość, klasy znaków), ocena siły,
+# otwarcie logu 10 MB / 100 MB w przeglądarce logu (bez widgetów) i czas uruchomienia.
+# Wyniki zapisywane jako JSON (baseline) i porównywane z poprzednim przebiegiem; kod wyjścia 1 oznacza regresję.
+# Na współdzielonych maszynach wyniki są zaszumione: dłuższe pomiary (--seconds 2) i --normalize je stabilizują.
+
+import argparse, json, os, platform, random, statistics, sys, tempfile, time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
+from generator import get_policy, generate_password, iter_passwords
+
+BASELINE_VERSION = 1
+
+# Pomiary przepustowości powtarzane; zapisywany jest najlepszy (najmniej zakłócony przez inne procesy)
+REPEAT = 5
+GROUPS = ("generate", "strength", "log", "startup")
+CALIBRATION = "calibration/python_loop"
+
+LENGTHS = (8, 16, 32, 64)
+CLASS_MIXES = {
+    "letters": (True, False, False),
+    "letters+digits": (True, True, False),
+    "all": (True, True, True),
+}
+
+LOG_MESSAGES = ("Starting the password generation.".upper(), "Initializing the password generation process.",
+                "Length: 16.", "Include: letters, digits, special characters.", "Strength: strong.",
+                "The password generated successfully.", "The lock file could not be removed!")
+LOG_LEVELS = ("DEBUG", "WARNING", "INFO", "INFO", "INFO", "INFO", "ERROR")
+
+
+def metric(value, unit, better):
+    return {"value": value, "unit": unit, "better": better}
+
+
+def rate(action, seconds, repeat=REPEAT):
+    """Liczba wywołań action na sekundę: najlepszy z repeat pomiarów trwających razem ok. seconds"""
+    action()
+    best = 0.0
+    for _ in range(repeat):
+        calls, start = 0, time.perf_counter()
+        deadline = start + seconds / repeat
+        while True:
+            action()
+            calls += 1
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+        best = max(best, calls / (now - start))
+    return best
+
+
+def bench_generate(args):
+    """Hasła na sekundę: pojedyncze wywołania (okno) i partie (CLI) dla długości i klas znaków"""
+    results = {}
+    for mix, classes in CLASS_MIXES.items():
+        for length in LENGTHS:
+            policy = get_policy(length, *classes)
+            results[f"generate/{mix}/{length}"] = metric(
+                100 * rate(lambda: [generate_password(policy) for _ in range(100)], args.seconds),
+                "passwords/s", "higher")
+        policy = get_policy(16, *classes)
+        results[f"generate/{mix}/16/batch"] = metric(
+            1000 * rate(lambda: sum(map(len, iter_passwords(1000, policy))), args.seconds), "passwords/s", "higher")
+    return results
+
+
+def bench_strength(args):
+    """Oceny siły na sekundę (z wyszukiwaniem wzorców i bez niego)"""
+    from strength import estimate
+
+    results = {}
+    rng = random.Random(7)
+    samples = [generate_password(get_policy(length)) for length in (8, 12, 16, 24)]
+    samples += ["password123", "Summer2024!", "qwerty", "correcthorsebatterystaple", "P@ssw0rd"]
+    samples = [rng.choice(samples) for _ in range(1000)]
+    position = [0]
+
+    def evaluate():
+        estimate(samples[position[0] % len(samples)])
+        position[0] += 1
+
+    results["strength/estimate"] = metric(rate(evaluate, args.seconds), "evaluations/s", "higher")
+    results["strength/estimate_no_patterns"] = metric(
+        rate(lambda: estimate(samples[0], patterns=False), args.seconds), "evaluations/s", "higher")
+    return results
+
+
+def write_log(path, megabytes):
+    """Syntetyczny log (jeden aktywny plik bez rotacji, jak dawne logi) o podanym rozmiarze"""
+    target = megabytes << 20
+    base = time.mktime((2024, 11, 5, 12, 0, 0, 0, 0, -1))
+    written, second = 0, 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            block = []
+            for _ in range(1000):
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(base + second // 7))
+                index = second % len(LOG_MESSAGES)
+                block.append(f"{stamp},{second % 1000:03d} - {LOG_LEVELS[index]} - {LOG_MESSAGES[index]}\n")
+                second += 1
+            text = "".join(block)
+            f.write(text)
+            written += len(text)
+
+
+def bench_log(args):
+    """Otwarcie logu w przeglądarce bez widgetów: indeks linii (zimny i zapisany), pierwsza strona, filtr poziomu"""
+    from logstore import LogDocument
+    from logsearch import LogSearch
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="fortipass-bench-") as directory:
+        for megabytes in args.log_sizes:
+            log_file = Path(directory) / f"log-{megabytes}" / "password_generator.log"
+            log_file.parent.mkdir()
+            write_log(log_file, megabytes)
+            cache = Path(directory) / f"cache-{megabytes}"
+            name = f"log/{megabytes}MB"
+
+            for state in ("cold", "warm"):
+                start = time.perf_counter()
+                document = LogDocument(log_file, cache_dir=cache)
+                page = document.lines(max(0, len(document) - 60), len(document))
+                results[f"{name}/open_{state}_ms"] = metric((time.perf_counter() - start) * 1000, "ms", "lower")
+                assert len(page) == 60
+                document.close()
+
+            document = LogDocument(log_file, cache_dir=cache)
+            pages = [random.randrange(len(document)) for _ in range(200)]
+            start = time.perf_counter()
+            for first in pages:
+                document.lines(first, first + 60)
+            results[f"{name}/page_ms"] = metric((time.perf_counter() - start) * 1000 / len(pages), "ms", "lower")
+            if megabytes == min(args.log_sizes):
+                for state in ("cold", "warm"):
+                    search = LogSearch(document)
+                    start = time.perf_counter()
+                    search.search(["ERROR"])
+                    results[f"{name}/filter_error_{state}_ms"] = metric((time.perf_counter() - start) * 1000,
+                                                                        "ms", "lower")
+                    search.close()
+            document.close()
+    return results
+
+
+def bench_startup(args):
+    """Czas importu main i uruchomienia trybu CLI (zimny - bez kodu bajtowego, ciepły)"""
+    from bench_startup import import_time, cli_time
+
+    results = {}
+    for cold in (True, False):
+        label = "cold" if cold else "warm"
+        if not cold:
+            import_time(False)
+        results[f"startup/import_main_{label}_ms"] = metric(
+            statistics.median(import_time(cold) for _ in range(args.runs)), "ms", "lower")
+        results[f"startup/cli_{label}_ms"] = metric(
+            statistics.median(cli_time(cold) for _ in range(args.runs)), "ms", "lower")
+    return results
+
+
+def calibration(args):
+    """Szybkość interpretera na tej maszynie (pętla bez kodu programu) - do normalizacji porównań"""
+    return {"calibration/python_loop": metric(rate(lambda: sum(range(100000)), args.seconds), "loops/s", "higher")}
+
+
+BENCHMARKS = {"generate": bench_generate, "strength": bench_strength, "log": bench_log, "startup": bench_startup}
+
+
+def compare(baseline, current, tolerance, normalize=False):
+    """Tabela zmian względem poprzedniego przebiegu; zwraca nazwy metryk z regresją ponad tolerancję.
+    normalize - zmiany liczone po uwzględnieniu różnicy szybkości maszyny (metryka kalibracyjna)"""
+    speed = 1.0
+    if normalize:
+        speed = current[CALIBRATION]["value"] / baseline[CALIBRATION]["value"]
+        print(f"Machine speed relative to the baseline: {speed:.2f}x")
+    regressions = []
+    print(f"{'metric':<40} {'baseline':>14} {'current':>14} {'change':>9}")
+    for name, entry in current.items():
+        previous = baseline.get(name)
+        if previous is None or not previous["value"]:
+            print(f"{name:<40} {'-':>14} {entry['value']:>14.3f} {'new':>9}")
+            continue
+        expected = previous["value"] * speed if entry["better"] == "higher" else previous["value"] / speed
+        change = entry["value"] / expected - 1
+        worse = -change if entry["better"] == "higher" else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40} {previous['value']:>14.3f} {entry['value']:>14.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FortiPass® headless benchmark suite with JSON baselines.")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS), help="Benchmark groups to run.")
+    parser.add_argument("--seconds", type=float, default=0.5, help="Measurement time of each throughput metric.")
+    parser.add_argument("--log-sizes", type=int, nargs="+", default=[10, 100], help="Synthetic log sizes (MB).")
+    parser.add_argument("--runs", type=int, default=5, help="Startup measurements (median).")
+    parser.add_argument("--output", "-o", help="Save the results as a JSON baseline.")
+    parser.add_argument("--compare", help="Baseline JSON to compare the results with.")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed relative slowdown before a metric counts as a regression (default: 0.15).")
+    parser.add_argument("--normalize", action="store_true",
+                        help="Compare after scaling by the calibration loop (baselines from another machine).")
+    args = parser.parse_args()
+
+    results = calibration(args)
+    for group in args.only:
+        start = time.perf_counter()
+        results.update(BENCHMARKS[group](args))
+        print(f"{group}: {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+    if args.output:
+        baseline = {"version": BASELINE_VERSION, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(), "machine": platform.machine(),
+                    "cpus": os.cpu_count(), "metrics": results}
+        Path(args.output).write_text(json.dumps(baseline, indent=1) + "\n", encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if baseline.get("version") != BASELINE_VERSION:
+            sys.exit(f"Unsupported baseline version in {args.compare}.")
+        regressions = compare(baseline["metrics"], results, args.tolerance,
+                              args.normalize and CALIBRATION in baseline["metrics"])
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.tolerance:.0%}.", file=sys.stderr)
+            sys.exit(1)
+    else:
+        for name, entry in results.items():
+            print(f"{name:<40} {entry['value']:>14.3f} {entry['unit']}")
+
+
+if __name__ == "__main__":
+    main()
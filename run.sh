@@ -6,4 +6,4 @@ VENV_PATH="$HOME/Pulpit/FortiPass/venv/bin/activate"
 
 # Włącz środowisko wirtualne i uruchom aplikację
 source "$VENV_PATH"
-python3 "$APP_PATH"
+python3 "$APP_PATH" "$@"
@@ -16,6 +16,7 @@ setup(
         #'pyyaml',
     ],
     extras_require={
+        'fast': ['numpy'],
         #'dev': ['pytest', 'tox'],
         #'docs': ['sphinx'],
     },
@@ -36,6 +37,6 @@ setup(
     #test_suite='tests',
     tests_require=['pytest'],
     package_data={
-        'fortipass': ['data/*.json', 'config/*.yml'],
+        'fortipass': ['data/*.json', 'data/*.txt', 'config/*.yml'],
     },
 )
\ No newline at end of file
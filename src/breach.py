@@ -0,0 +1,175 @@
+# fortipass/breach.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, mmap, heapq, hashlib, tempfile, threading, logging
+from binascii import unhexlify
+from pathlib import Path
+from paths import temp_path
+
+
+RECORD_SIZE = 20  # SHA-1
+RUN_SIZE = 1 << 20  # liczba skrótów sortowanych w pamięci podczas konwersji
+
+# Plik korpusu używany domyślnie przez ocenę siły hasła
+BREACH_FILE_ENV = "FORTIPASS_BREACH_FILE"
+
+
+class BreachChecker:
+    def __init__(self, path):
+        """Wyszukiwanie w posortowanym pliku skrótów SHA-1 (20 bajtów na rekord) przez mmap"""
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size % RECORD_SIZE:
+            self._file.close()
+            raise ValueError("The breach file size is not a multiple of the record size.")
+
+        self.count = size // RECORD_SIZE
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if size and hasattr(mmap, "MADV_RANDOM"):
+            # Dostęp punktowy - bez odczytu z wyprzedzeniem
+            self._map.madvise(mmap.MADV_RANDOM)
+
+    def close(self):
+        """Zamyka mapowanie i plik"""
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _record(self, index):
+        offset = index * RECORD_SIZE
+        return self._map[offset:offset + RECORD_SIZE]
+
+    def contains_digest(self, digest):
+        """Czy skrót SHA-1 występuje w korpusie (wyszukiwanie interpolacyjne + binarne)"""
+        n = self.count
+        if not n:
+            return False
+
+        # SHA-1 ma rozkład jednostajny: pozycja szacowana z pierwszych 8 bajtów
+        guess = (int.from_bytes(digest[:8], "big") * n) >> 64
+        low, high = 0, n
+        step = 64
+        while True:
+            lo = max(guess - step, 0)
+            hi = min(guess + step, n - 1)
+            if self._record(lo) <= digest <= self._record(hi):
+                low, high = lo, hi + 1
+                break
+            if lo == 0 and hi == n - 1:
+                return False
+            step *= 8
+
+        # Wyszukiwanie binarne w wąskim przedziale
+        while low < high:
+            mid = (low + high) // 2
+            record = self._record(mid)
+            if record < digest:
+                low = mid + 1
+            elif record > digest:
+                high = mid
+            else:
+                return True
+        return False
+
+    def contains(self, password):
+        """Czy hasło występuje w korpusie"""
+        return self.contains_digest(hashlib.sha1(password.encode("utf-8", "surrogateescape")).digest())
+
+    def __contains__(self, password):
+        return self.contains(password)
+
+
+def _parse_line(line):
+    """Skrót z linii zrzutu HIBP ('HEX40:LICZBA' lub samo 'HEX40')"""
+    line = line.strip()
+    if not line:
+        return None
+    return unhexlify(line.split(b":", 1)[0])
+
+
+def _write_run(digests, directory):
+    """Zapis posortowanej serii do pliku tymczasowego"""
+    digests.sort()
+    run = tempfile.TemporaryFile(dir=directory)
+    run.write(b"".join(digests))
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    """Strumień rekordów z pliku serii"""
+    read = run.read
+    while True:
+        record = read(RECORD_SIZE)
+        if not record:
+            return
+        yield record
+
+
+def convert_dump(source, target, run_size=RUN_SIZE):
+    """Konwersja tekstowego zrzutu SHA-1 do posortowanego pliku binarnego; zwraca liczbę rekordów"""
+    directory = os.path.dirname(os.path.abspath(target))
+    runs, digests = [], []
+    try:
+        with open(source, "rb") as f:
+            for line in f:
+                digest = _parse_line(line)
+                if digest is None:
+                    continue
+                if len(digest) != RECORD_SIZE:
+                    raise ValueError("The dump contains a hash that is not SHA-1.")
+                digests.append(digest)
+                if len(digests) >= run_size:
+                    runs.append(_write_run(digests, directory))
+                    digests = []
+        if digests:
+            runs.append(_write_run(digests, directory))
+
+        # Scalanie serii (sortowanie zewnętrzne) z pominięciem duplikatów
+        temp_target = temp_path(Path(target))
+        count, previous = 0, None
+        try:
+            with open(temp_target, "wb", buffering=1 << 20) as out:
+                for record in heapq.merge(*(_read_run(run) for run in runs)):
+                    if record != previous:
+                        out.write(record)
+                        count += 1
+                        previous = record
+            os.replace(temp_target, target)
+        except BaseException:
+            temp_target.unlink(missing_ok=True)  # bez niepełnego pliku obok korpusu
+            raise
+        return count
+    finally:
+        for run in runs:
+            run.close()
+
+
+_default_checker = None
+_default_lock = threading.Lock()
+
+
+def default_checker():
+    """Korpus wskazany zmienną FORTIPASS_BREACH_FILE (None, gdy nie skonfigurowano)"""
+    global _default_checker
+    path = os.environ.get(BREACH_FILE_ENV)
+    if not path:
+        return None
+    with _default_lock:
+        if _default_checker is None or _default_checker.path != path:
+            try:
+                _default_checker = BreachChecker(path)
+            except (OSError, ValueError) as e:
+                logging.error("Opening the breach file: %s!", e)
+                return None
+        return _default_checker
@@ -0,0 +1,585 @@
+# fortipass/cli.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import argparse, csv, io, json, os, sys, time
+from generator import get_policy, iter_passwords, generate_password, DEFAULT_LENGTH, DEFAULT_CHUNK_SIZE
+
+
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+
+def format_raw(chunk):
+    """Jedno hasło w każdej linii"""
+    return '\n'.join(chunk) + '\n'
+
+
+def format_jsonl(chunk):
+    """Jeden obiekt JSON w każdej linii"""
+    dumps = json.dumps
+    return ''.join(dumps({"password": p}) + '\n' for p in chunk)
+
+
+def format_csv(chunk):
+    """Plik CSV z jedną kolumną 'password' (nagłówek dopisywany osobno)"""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows((p,) for p in chunk)
+    return buffer.getvalue()
+
+
+FORMATTERS = {
+    "raw": format_raw,
+    "jsonl": format_jsonl,
+    "csv": format_csv,
+}
+
+
+def build_parser():
+    """Parser argumentów wiersza poleceń"""
+    parser = argparse.ArgumentParser(prog="fortipass", description="FortiPass® - password generator.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    gen = subparsers.add_parser("gen", help="Generate passwords in bulk without the GUI.")
+    gen.add_argument("--count", type=int, default=1, help="Number of passwords to generate.")
+    gen.add_argument("--length", type=int, default=DEFAULT_LENGTH, help="Password length.")
+    gen.add_argument("--no-letters", action="store_true", help="Do not use letters.")
+    gen.add_argument("--no-digits", action="store_true", help="Do not use digits.")
+    gen.add_argument("--no-special", action="store_true", help="Do not use special characters.")
+    gen.add_argument("--min-letters", type=int, default=1, help="Minimum number of letters.")
+    gen.add_argument("--min-digits", type=int, default=1, help="Minimum number of digits.")
+    gen.add_argument("--min-special", type=int, default=1, help="Minimum number of special characters.")
+    gen.add_argument("--exclude", default="", help="Characters that must not appear in passwords.")
+    gen.add_argument("--no-ambiguous", action="store_true", help="Exclude look-alike characters (O0l1I).")
+    gen.add_argument("--no-repeat", action="store_true", help="Do not repeat any character within a password.")
+    gen.add_argument("--format", choices=sorted(FORMATTERS), default="raw", help="Output format.")
+    gen.add_argument("--output", "-o", default="-", help="Output file ('-' means stdout).")
+    gen.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Passwords per write.")
+    gen.add_argument("--workers", "-j", type=int, default=1, help="Number of worker processes (0 = all cores).")
+    gen.add_argument("--unordered", action="store_true", help="Stream chunks as workers finish them.")
+    gen.add_argument("--backend", choices=["auto", "python", "numpy"], default="auto",
+                     help="Single-process engine (numpy falls back to python when NumPy is missing).")
+    gen.add_argument("--breach-file", help="Sorted SHA-1 breach corpus; breached passwords are replaced.")
+    gen.add_argument("--unique-store", help="Directory of the persistent Bloom filter of issued passwords.")
+    gen.add_argument("--fp-rate", type=float, default=1e-6, help="False positive rate of a new uniqueness store.")
+    gen.add_argument("--capacity", type=int, default=1_000_000, help="Initial capacity of a new uniqueness store.")
+    gen.add_argument("--quiet", "-q", action="store_true", help="Do not report throughput on stderr.")
+    gen.set_defaults(handler=command_gen)
+
+    audit = subparsers.add_parser("audit", help="Estimate the strength of passwords (one per line).")
+    audit.add_argument("input", nargs="?", default="-", help="Input file ('-' means stdin).")
+    audit.add_argument("--output", "-o", default="-", help="Per-password results file ('-' means stdout).")
+    audit.add_argument("--summary-only", action="store_true", help="Only print the tier summary.")
+    audit.add_argument("--chunk-size", type=int, default=10000, help="Passwords evaluated per batch.")
+    audit.add_argument("--no-patterns", action="store_true", help="Skip dictionary and pattern matching.")
+    audit.add_argument("--breach-file", help="Sorted SHA-1 breach corpus (default: $FORTIPASS_BREACH_FILE).")
+    audit.set_defaults(handler=command_audit)
+
+    breach = subparsers.add_parser("breach", help="Manage the offline breached-password corpus.")
+    breach_actions = breach.add_subparsers(dest="action", required=True)
+    convert = breach_actions.add_parser("convert", help="Convert a text SHA-1 dump (HASH[:COUNT]) to the binary format.")
+    convert.add_argument("input", help="Text dump, e.g. the HIBP SHA-1 password list.")
+    convert.add_argument("output", help="Binary file with sorted 20-byte SHA-1 records.")
+    convert.set_defaults(handler=command_breach_convert)
+
+    serve = subparsers.add_parser("serve", help="Serve /generate and /strength over local HTTP/JSON.")
+    serve.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    serve.add_argument("--port", type=int, default=8765, help="TCP port to listen on (default: 8765).")
+    serve.add_argument("--unix-socket", help="Listen on a Unix socket instead of TCP.")
+    serve.add_argument("--workers", "-j", type=int, default=None, help="Worker processes for heavy batches.")
+    serve.set_defaults(handler=command_serve)
+
+    remote = subparsers.add_parser("remote", help="Send a request to the running FortiPass window.")
+    remote_actions = remote.add_subparsers(dest="action", required=True)
+    remote_actions.add_parser("raise", help="Bring the running window to the front.")
+    remote_generate = remote_actions.add_parser("generate", help="Generate passwords in the running instance.")
+    remote_generate.add_argument("--count", "-n", type=int, default=1, help="Number of passwords.")
+    remote_generate.add_argument("--length", type=int, default=DEFAULT_LENGTH, help="Password length.")
+    remote_generate.add_argument("--classes", default="letters,digits,special",
+                                 help="Comma separated character classes (default: letters,digits,special).")
+    remote_metrics = remote_actions.add_parser("metrics", help="Print operation timings of the running instance.")
+    remote_metrics.add_argument("--format", "-f", choices=("text", "json", "prometheus"), default="text",
+                                help="Output format (default: text).")
+    remote.set_defaults(handler=command_remote)
+
+    log = subparsers.add_parser("log", help="Print event log lines, filtered by level, text and time.")
+    log.add_argument("--level", action="append", type=str.upper, metavar="LEVEL",
+                     help="Only entries of this level (may be repeated).")
+    log.add_argument("--grep", help="Only lines containing this text (case insensitive).")
+    log.add_argument("--since", help="Only entries from this time on (e.g. '2024-11-05 12:00').")
+    log.add_argument("--until", help="Only entries up to this time (e.g. '2024-11-05').")
+    log.add_argument("--count", "-c", action="store_true", help="Only print the number of matching lines.")
+    log.add_argument("--log-file", help="Log file (default: the application log).")
+    log.set_defaults(handler=command_log)
+
+    stats = subparsers.add_parser("stats", help="Summarize the structured (JSONL) event log.")
+    stats.add_argument("--log-file", help="Structured log file (default: the application password_generator.jsonl).")
+    stats.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    stats.set_defaults(handler=command_stats)
+
+    history = subparsers.add_parser("history", help="Read and manage the encrypted password history.")
+    history.add_argument("--file", help="History file (default: ~/.local/share/fortipass/history.fpv).")
+    history_actions = history.add_subparsers(dest="action", required=True)
+    history_list = history_actions.add_parser("list", help="Print the labels of stored passwords.")
+    history_list.add_argument("--last", type=int, help="Only the most recent entries.")
+    history_list.add_argument("--show", action="store_true", help="Print the passwords as well.")
+    history_get = history_actions.add_parser("get", help="Print the password stored under a label.")
+    history_get.add_argument("label")
+    history_add = history_actions.add_parser("add", help="Store a password (read from stdin or generated).")
+    history_add.add_argument("label")
+    history_add.add_argument("--generate", action="store_true", help="Generate a new password and print it.")
+    history_add.add_argument("--length", type=int, default=DEFAULT_LENGTH, help="Length of a generated password.")
+    history_delete = history_actions.add_parser("delete", help="Remove the password stored under a label.")
+    history_delete.add_argument("label")
+    history_actions.add_parser("compact", help="Rewrite the file without deleted and replaced entries.")
+    history.set_defaults(handler=command_history)
+
+    mail = subparsers.add_parser("mail", help="Send new passwords by e-mail in encrypted attachments.")
+    mail_actions = mail.add_subparsers(dest="action", required=True)
+    send = mail_actions.add_parser("send", help="Send every recipient a new password (CSV: email,name,passphrase).")
+    send.add_argument("recipients", help="CSV file with an 'email' column and optional 'name' and 'passphrase'.")
+    send.add_argument("--from", dest="sender", required=True, help="Sender address.")
+    send.add_argument("--subject", default="Your new password", help="Message subject.")
+    send.add_argument("--length", type=int, default=DEFAULT_LENGTH, help="Length of the sent passwords.")
+    send.add_argument("--passwords", required=True,
+                      help="CSV file that receives the sent passwords (email,password), written before sending.")
+    send.add_argument("--passphrases", help="CSV file that receives the generated passphrases (email,passphrase) "
+                                            "of recipients without one; deliver them over another channel.")
+    send.add_argument("--host", default="localhost", help="SMTP server (default: localhost).")
+    send.add_argument("--port", type=int, help="SMTP port (default: 25, 587 with STARTTLS, 465 with SSL).")
+    send.add_argument("--security", choices=("none", "starttls", "ssl"), default="none",
+                      help="Connection security (default: none).")
+    send.add_argument("--user", help="SMTP login; the password is read from $FORTIPASS_SMTP_PASSWORD.")
+    send.add_argument("--connections", "-j", type=int, default=4, help="Parallel SMTP connections (default: 4).")
+    send.add_argument("--per-connection", type=int, default=100,
+                      help="Messages sent over one connection before it is renewed (default: 100).")
+    send.add_argument("--retries", type=int, default=3, help="Retries of temporary failures (default: 3).")
+    send.add_argument("--quiet", "-q", action="store_true", help="Do not report throughput on stderr.")
+    send.set_defaults(handler=command_mail_send)
+    mail_open = mail_actions.add_parser("open", help="Print the password from a received attachment.")
+    mail_open.add_argument("file", help="The attachment (password.fpm).")
+    mail_open.set_defaults(handler=command_mail_open)
+
+    return parser
+
+
+def write_passwords(out, chunks, fmt):
+    """Strumieniowy zapis partii haseł; zwraca liczbę zapisanych haseł"""
+    formatter = FORMATTERS[fmt]
+    if fmt == "csv":
+        out.write("password\n")
+
+    written = 0
+    for chunk in chunks:
+        out.write(formatter(chunk))
+        written += len(chunk)
+    return written
+
+
+def write_blocks(out, blocks, length):
+    """Zapis gotowych buforów formatu 'raw' (bez kopiowania); zwraca liczbę haseł"""
+    written = 0
+    for block in blocks:
+        out.write(block)
+        written += len(block) // (length + 1)
+    return written
+
+
+def select_chunks(args, policy):
+    """Wybór silnika generowania: wieloprocesowy, wektorowy (NumPy) lub w czystym Pythonie"""
+    if args.workers != 1:
+        # Tryb wieloprocesowy (import tylko gdy jest potrzebny)
+        from parallel import iter_passwords_parallel
+        return iter_passwords_parallel(args.count, policy, args.workers or None,
+                                       args.chunk_size, ordered=not args.unordered)
+    if args.backend != "python":
+        from vectorized import iter_passwords_vectorized
+        return iter_passwords_vectorized(args.count, policy, args.chunk_size)
+    return iter_passwords(args.count, policy, args.chunk_size)
+
+
+def open_checker(path):
+    """Korpus haseł z wycieków podany w argumencie albo domyślny (zmienna środowiskowa)"""
+    from breach import BreachChecker, default_checker
+    return BreachChecker(path) if path else default_checker()
+
+
+def replace_breached(chunks, policy, checker):
+    """Zastępuje hasła obecne w korpusie wycieków nowymi (liczba haseł bez zmian)"""
+    contains = checker.contains
+    for chunk in chunks:
+        for index, password in enumerate(chunk):
+            while contains(password):
+                password = chunk[index] = generate_password(policy)
+        yield chunk
+
+
+def command_gen(args):
+    """Obsługa polecenia 'gen'"""
+    policy = get_policy(args.length, not args.no_letters, not args.no_digits, not args.no_special,
+                        args.min_letters, args.min_digits, args.min_special, args.exclude,
+                        args.no_ambiguous, args.no_repeat)
+
+    checker = open_checker(args.breach_file) if args.breach_file else None
+
+    raw_blocks = None
+    filtered = checker is not None or args.unique_store
+    if args.format == "raw" and args.workers == 1 and args.backend != "python" and not filtered:
+        import vectorized
+        if vectorized.supports(policy):
+            raw_blocks = vectorized.iter_raw_blocks(args.count, policy, args.chunk_size)
+
+    start = time.perf_counter()
+    if raw_blocks is not None:
+        # Bufory z macierzy NumPy trafiają do strumienia binarnego bez konwersji na napisy
+        if args.output == "-":
+            sys.stdout.flush()
+            written = write_blocks(sys.stdout.buffer, raw_blocks, policy.length)
+            sys.stdout.buffer.flush()
+        else:
+            with open(args.output, "wb", buffering=OUTPUT_BUFFER_SIZE) as out:
+                written = write_blocks(out, raw_blocks, policy.length)
+    else:
+        chunks = select_chunks(args, policy)
+        if checker is not None:
+            chunks = replace_breached(chunks, policy, checker)
+        store = None
+        if args.unique_store:
+            from uniqueness import UniquenessStore, unique_chunks
+            store = UniquenessStore(args.unique_store, args.capacity, args.fp_rate)
+            chunks = unique_chunks(chunks, store, lambda: generate_password(policy))
+        try:
+            if args.output == "-":
+                written = write_passwords(sys.stdout, chunks, args.format)
+                sys.stdout.flush()
+            else:
+                with open(args.output, "w", encoding="utf-8", newline="", buffering=OUTPUT_BUFFER_SIZE) as out:
+                    written = write_passwords(out, chunks, args.format)
+        finally:
+            if store is not None:
+                store.close()
+    elapsed = time.perf_counter() - start
+
+    if not args.quiet:
+        rate = written / elapsed if elapsed > 0 else float("inf")
+        print(f"Generated {written} passwords in {elapsed:.3f} s ({rate:,.0f} passwords/s).", file=sys.stderr)
+    return 0
+
+
+def iter_lines(stream, chunk_size):
+    """Partie linii wejścia (bez znaku końca linii)"""
+    chunk = []
+    for line in stream:
+        chunk.append(line.rstrip("\r\n"))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def audit_stream(source, out, chunk_size, patterns=True, checker=None):
+    """Ocena haseł partiami; zapisuje 'bity<TAB>poziom' (gdy out) i zwraca liczniki poziomów"""
+    from strength import evaluate_many
+
+    summary = {"weak": 0, "medium": 0, "strong": 0}
+    for chunk in iter_lines(source, chunk_size):
+        results = evaluate_many(chunk, patterns, checker)
+        for _, strength in results:
+            summary[strength] += 1
+        if out is not None:
+            out.write(''.join(f"{bits:.1f}\t{strength}\n" for bits, strength in results))
+    return summary
+
+
+def command_audit(args):
+    """Obsługa polecenia 'audit'"""
+    if args.chunk_size < 1:
+        raise ValueError("The chunk size must be greater than zero.")
+
+    checker = open_checker(args.breach_file)
+    if args.input == "-":
+        source = sys.stdin
+        if hasattr(source, "reconfigure"):
+            # Jak przy pliku: linia z bajtami spoza UTF-8 jest oceniana, a nie przerywa audytu
+            source.reconfigure(errors="surrogateescape")
+    else:
+        source = open(args.input, encoding="utf-8", errors="surrogateescape")
+    try:
+        start = time.perf_counter()
+        if args.summary_only:
+            summary = audit_stream(source, None, args.chunk_size, not args.no_patterns, checker)
+        elif args.output == "-":
+            summary = audit_stream(source, sys.stdout, args.chunk_size, not args.no_patterns, checker)
+            sys.stdout.flush()
+        else:
+            with open(args.output, "w", encoding="utf-8", buffering=OUTPUT_BUFFER_SIZE) as out:
+                summary = audit_stream(source, out, args.chunk_size, not args.no_patterns, checker)
+        elapsed = time.perf_counter() - start
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    total = sum(summary.values())
+    rate = total / elapsed if elapsed > 0 else float("inf")
+    print(f"Evaluated {total} passwords in {elapsed:.3f} s ({rate:,.0f} passwords/s): "
+          f"strong {summary['strong']}, medium {summary['medium']}, weak {summary['weak']}.", file=sys.stderr)
+    return 0
+
+
+def command_breach_convert(args):
+    """Obsługa polecenia 'breach convert'"""
+    from breach import convert_dump
+
+    start = time.perf_counter()
+    count = convert_dump(args.input, args.output)
+    elapsed = time.perf_counter() - start
+    print(f"Converted {count} hashes in {elapsed:.3f} s to {args.output}.", file=sys.stderr)
+    return 0
+
+
+def command_serve(args):
+    """Obsługa polecenia 'serve'"""
+    import asyncio
+    from server import serve
+
+    if args.workers is not None and args.workers < 1:
+        raise ValueError("The number of workers must be greater than zero.")
+
+    def ready(address):
+        print(f"Serving on {address} (Ctrl+C to stop).", file=sys.stderr)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix_socket, args.workers, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.unlink(args.unix_socket)
+    return 0
+
+
+def command_remote(args):
+    """Obsługa polecenia 'remote' - żądanie do działającej instancji przez gniazdo Unix"""
+    from lock import forward_request
+
+    request = {"command": args.action}
+    if args.action == "generate":
+        request.update(count=args.count, length=args.length, classes=args.classes.split(","))
+    response = forward_request(request)
+    if response is None:
+        raise OSError("FortiPass is not running.")
+    if not response.get("ok"):
+        raise ValueError(response.get("error", "The request was rejected."))
+    for password in response.get("passwords", []):
+        sys.stdout.write(password + "\n")
+    if args.action == "metrics":
+        print_metrics(response["metrics"], args.format)
+    return 0
+
+
+def print_metrics(snapshot, fmt):
+    """Histogramy działającej instancji: tabela, migawka JSON lub format tekstowy Prometheus"""
+    from metrics import describe, format_prometheus, METRICS_ENV
+
+    if fmt == "json":
+        print(json.dumps(snapshot, indent=1))
+    elif fmt == "prometheus":
+        sys.stdout.write(format_prometheus(snapshot))
+    else:
+        if not snapshot["enabled"]:
+            print(f"Timings are not recorded (set {METRICS_ENV}=1 or enable them in the Performance window).",
+                  file=sys.stderr)
+        print(f"{'operation':<28} {'count':>8} {'errors':>7} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} "
+              f"{'max ms':>10}")
+        for name, count, errors, mean, p50, p95, peak in describe(snapshot):
+            print(f"{name:<28} {count:>8} {errors:>7} {mean:>10.2f} {p50:>10.2f} {p95:>10.2f} {peak:>10.2f}")
+
+
+def command_log(args):
+    """Obsługa polecenia 'log' - wyszukiwanie przez indeks zapisywany obok indeksu linii"""
+    from logsetup import LOG_FILE
+    from logstore import LogDocument
+    from logsearch import LogSearch, FilteredLines
+
+    log_file = args.log_file or LOG_FILE
+    if not os.path.exists(log_file) and not os.path.exists(f"{log_file}.index.json"):
+        raise OSError(f"The log file {log_file} does not exist.")
+    document = LogDocument(log_file)
+    search = LogSearch(document)
+    try:
+        numbers = search.search(args.level, args.grep, args.since, args.until)
+        if args.count:
+            print(len(numbers))
+            return 0
+        matches = FilteredLines(document, numbers)
+        for start in range(0, len(matches), 1000):
+            sys.stdout.writelines(matches.lines(start, start + 1000))
+    finally:
+        search.close()
+        document.close()
+    return 0
+
+
+def format_histogram(counts, key=None):
+    """Wartości histogramu w jednej linii: 'wartość: liczba, ...'"""
+    return ", ".join(f"{value}: {count}" for value, count in sorted(counts.items(), key=key)) or "-"
+
+
+def command_stats(args):
+    """Obsługa polecenia 'stats' - podsumowanie logu JSONL (segmenty z pamięci podręcznej)"""
+    from logsetup import LOG_FILE, STRUCTURED_ENV, structured_file
+    from logstats import LogStats, DURATION_BUCKETS_MS
+
+    log_file = args.log_file or structured_file(LOG_FILE)
+    if not os.path.exists(log_file) and not os.path.exists(f"{log_file}.index.json"):
+        raise OSError(f"The structured log {log_file} does not exist (enable it with {STRUCTURED_ENV}=1).")
+    report = LogStats(log_file).summary().report()
+    if args.json:
+        print(json.dumps(report, indent=1))
+        return 0
+
+    buckets = [f"<={bound}" for bound in DURATION_BUCKETS_MS] + [f">{DURATION_BUCKETS_MS[-1]}"]
+    print(f"Records: {report['records']} ({report['start']} - {report['end']}), invalid lines: {report['invalid']}")
+    print(f"Events: {format_histogram(report['events'])}")
+    print(f"Levels: {format_histogram(report['levels'])}")
+    rates = ", ".join(f"{event}: {report['errors'][event]} ({rate:.1%})"
+                      for event, rate in sorted(report["error_rates"].items()))
+    print(f"Errors: {rates or '-'}")
+    print(f"Length: {format_histogram(report['lengths'], key=lambda item: int(item[0]))}")
+    print(f"Strength: {format_histogram(report['strengths'])}")
+    print(f"Composition: {format_histogram(report['compositions'])}")
+    if report["duration_mean"] is not None:
+        print(f"Duration (ms): mean {report['duration_mean']:.3f}, max {report['duration_max']:.3f}; "
+              f"{format_histogram(report['durations'], key=lambda item: buckets.index(item[0]))}")
+    return 0
+
+
+def open_history(path):
+    """Historia haseł; hasło szyfrujące z FORTIPASS_HISTORY_PASSPHRASE lub z pytania w terminalu"""
+    from getpass import getpass
+    from history import PasswordHistory, PASSPHRASE_ENV
+
+    passphrase = os.environ.get(PASSPHRASE_ENV)
+    if passphrase is None:
+        passphrase = getpass("History passphrase: ")
+        if not os.path.exists(path) and getpass("Repeat the passphrase: ") != passphrase:
+            raise ValueError("The passphrases do not match.")
+    if not passphrase:
+        raise ValueError("The history passphrase must not be empty.")
+    return PasswordHistory(path, passphrase)
+
+
+def command_history(args):
+    """Obsługa polecenia 'history'"""
+    from history import default_history_file
+
+    path = args.file or default_history_file()
+    if args.action != "add" and not os.path.exists(path):
+        raise OSError(f"The password history {path} does not exist.")
+    with open_history(path) as history:
+        if args.action == "list":
+            entries = list(history.entries())
+            if args.last is not None:
+                entries = entries[-args.last:] if args.last > 0 else []
+            for entry in entries:
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["time"]))
+                line = f"{stamp}\t{entry['label']}"
+                print(f"{line}\t{entry['password']}" if args.show else line)
+        elif args.action == "get":
+            entry = history.get(args.label)
+            if entry is None:
+                raise ValueError(f"No password is stored under '{args.label}'.")
+            print(entry["password"])
+        elif args.action == "add":
+            if args.generate:
+                password = generate_password(get_policy(args.length))
+                print(password)
+            else:
+                password = sys.stdin.readline().rstrip("\r\n")
+                if not password:
+                    raise ValueError("No password was given on stdin.")
+            history.put(args.label, password, length=len(password))
+        elif args.action == "delete":
+            if not history.delete(args.label):
+                raise ValueError(f"No password is stored under '{args.label}'.")
+        else:
+            kept = history.compact()
+            print(f"Compacted the history: {kept} entries.", file=sys.stderr)
+    return 0
+
+
+def open_private(path):
+    """Plik CSV tylko dla właściciela (0600) - hasła i hasła szyfrujące"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)  # istniejący plik mógł mieć szersze uprawnienia
+    return open(fd, "w", newline="", encoding="utf-8")
+
+
+def command_mail_send(args):
+    """Obsługa polecenia 'mail send' - hasła i hasła szyfrujące zapisywane przed wysyłką, wysyłka pulą"""
+    from mailer import MailPool, read_recipients, new_passphrase, password_jobs, SMTP_PASSWORD_ENV
+
+    policy = get_policy(args.length)
+    recipients = read_recipients(args.recipients)
+    missing = [recipient for recipient in recipients if not recipient.passphrase]
+    if missing:
+        if not args.passphrases:
+            raise ValueError(f"{len(missing)} recipients have no passphrase; use --passphrases to generate them.")
+        generated = {recipient.email: new_passphrase() for recipient in missing}
+        recipients = [recipient if recipient.passphrase else recipient._replace(passphrase=generated[recipient.email])
+                      for recipient in recipients]
+        with open_private(args.passphrases) as f:
+            writer = csv.writer(f)
+            writer.writerow(("email", "passphrase"))
+            writer.writerows(generated.items())
+
+    port = args.port or {"none": 25, "starttls": 587, "ssl": 465}[args.security]
+    pool = MailPool(args.host, port, args.security, args.user, os.environ.get(SMTP_PASSWORD_ENV),
+                    args.connections, args.per_connection, args.retries)
+    with open_private(args.passwords) as f:
+        writer = csv.writer(f)
+        writer.writerow(("email", "password"))
+
+        def record(email, password):
+            # Hasło w pliku, zanim wiadomość zostanie zbudowana i wysłana
+            writer.writerow((email, password))
+            f.flush()
+
+        report = pool.deliver(password_jobs(recipients, args.sender, args.subject, policy, record))
+
+    for address, error in report.failed.items():
+        print(f"fortipass: {address}: {error}", file=sys.stderr)
+    if not args.quiet:
+        print(f"Sent {report.sent} of {len(recipients)} messages in {report.elapsed:.3f} s "
+              f"({report.rate:,.1f} messages/s) over {report.connections} connections, "
+              f"{report.retries} retries.", file=sys.stderr)
+    return 1 if report.failed else 0
+
+
+def command_mail_open(args):
+    """Obsługa polecenia 'mail open'"""
+    from getpass import getpass
+    from mailer import unseal
+
+    with open(args.file, "rb") as f:
+        data = f.read()
+    print(unseal(data, getpass("Passphrase: ")))
+    return 0
+
+
+def run_cli(argv=None):
+    """Uruchamia tryb wiersza poleceń; zwraca kod wyjścia"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args)
+    except BrokenPipeError:
+        # Odbiorca zamknął potok (np. 'fortipass gen ... | head')
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
+    except (ValueError, OSError) as e:
+        print(f"fortipass: error: {e}", file=sys.stderr)
+        return 2
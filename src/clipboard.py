@@ -0,0 +1,236 @@
+# fortipass/clipboard.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, shutil, hashlib, logging, subprocess
+
+# pyperclip jest opcjonalny - bez niego dostępne są schowek Tk i polecenia systemowe
+try:
+    import pyperclip
+except ImportError:
+    pyperclip = None
+
+
+# Mechanizm schowka: auto, tk, pyperclip, wl-copy, xclip lub xsel (np. FORTIPASS_CLIPBOARD=wl-copy)
+BACKEND_ENV = "FORTIPASS_CLIPBOARD"
+
+# Czas (s), po którym schowek jest czyszczony, jeśli nadal zawiera skopiowane hasło; 0 - bez czyszczenia
+CLEAR_AFTER_ENV = "FORTIPASS_CLIPBOARD_CLEAR"
+CLEAR_AFTER = 30
+
+COMMAND_TIMEOUT = 2.0  # sekundy oczekiwania na polecenie schowka
+
+# Polecenia systemowe: (zapis, odczyt, czyszczenie - None: zapis pustego tekstu)
+COMMANDS = {
+    "wl-copy": (["wl-copy"], ["wl-paste", "--no-newline"], ["wl-copy", "--clear"]),
+    "xclip": (["xclip", "-selection", "clipboard"], ["xclip", "-selection", "clipboard", "-o"], None),
+    "xsel": (["xsel", "--clipboard", "--input"], ["xsel", "--clipboard", "--output"],
+             ["xsel", "--clipboard", "--delete"]),
+}
+
+
+class TkClipboard:
+    name = "tk"
+    blocking = False  # wywołania w wątku Tk (bez root.update - żądania schowka obsługuje pętla zdarzeń)
+
+    def __init__(self, root):
+        self.root = root
+
+    def copy(self, text):
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
+
+    def paste(self):
+        try:
+            return self.root.clipboard_get()
+        except Exception:  # pusty schowek lub zawartość nie jest tekstem (TclError)
+            return ""
+
+    def clear(self):
+        self.root.clipboard_clear()
+
+
+class CommandClipboard:
+    blocking = True  # podproces - wywołania w wątku roboczym
+
+    def __init__(self, name, copy_command, paste_command, clear_command=None):
+        """Schowek przez polecenie systemowe (wl-copy, xclip, xsel); tekst przekazywany na standardowe wejście"""
+        self.name = name
+        self.copy_command = copy_command
+        self.paste_command = paste_command
+        self.clear_command = clear_command
+
+    def _run(self, command, text=None):
+        # xclip i xsel pozostają w tle, aby udostępniać zawartość - ich wyjście nie może trzymać potoku
+        try:
+            result = subprocess.run(command, input=None if text is None else text.encode("utf-8"),
+                                    stdout=subprocess.DEVNULL if text is not None else subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, timeout=COMMAND_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            raise OSError(f"{command[0]} did not finish in {COMMAND_TIMEOUT:g} s.") from None
+        if result.returncode:
+            raise OSError(f"{command[0]} exited with status {result.returncode}.")
+        return result.stdout
+
+    def copy(self, text):
+        self._run(self.copy_command, text)
+
+    def paste(self):
+        return self._run(self.paste_command).decode("utf-8", "replace")
+
+    def clear(self):
+        if self.clear_command is None:
+            self._run(self.copy_command, "")
+        else:
+            self._run(self.clear_command)
+
+
+class PyperclipClipboard:
+    name = "pyperclip"
+    blocking = True  # pyperclip uruchamia polecenia systemowe
+
+    def copy(self, text):
+        pyperclip.copy(text)
+
+    def paste(self):
+        return pyperclip.paste() or ""
+
+    def clear(self):
+        pyperclip.copy("")
+
+
+def available_backends():
+    """Nazwy mechanizmów dostępnych w systemie (bez tk, który wymaga okna)"""
+    names = [name for name, commands in COMMANDS.items() if shutil.which(commands[0][0])]
+    if pyperclip is not None:
+        names.append("pyperclip")
+    return names
+
+
+def select_backend(root=None, name=None):
+    """Mechanizm schowka według nazwy (argument lub FORTIPASS_CLIPBOARD); auto - schowek Tk w oknie,
+    bez okna - wl-copy w sesji Wayland, xclip, xsel lub pyperclip"""
+    name = (name or os.environ.get(BACKEND_ENV) or "auto").lower()
+    if name == "auto":
+        if root is not None:
+            return TkClipboard(root)
+        candidates = [candidate for candidate in available_backends()
+                      if candidate != "wl-copy" or os.environ.get("WAYLAND_DISPLAY")]
+        if not candidates:
+            raise ValueError("No clipboard tool was found (install wl-clipboard, xclip or xsel).")
+        name = candidates[0]
+    if name == "tk":
+        if root is None:
+            raise ValueError("The Tk clipboard requires the application window.")
+        return TkClipboard(root)
+    if name == "pyperclip":
+        if pyperclip is None:
+            raise ValueError("The pyperclip package is not installed.")
+        return PyperclipClipboard()
+    if name not in COMMANDS:
+        raise ValueError(f"Unknown clipboard backend: {name} (choose from auto, tk, pyperclip, "
+                         f"{', '.join(COMMANDS)}).")
+    if shutil.which(COMMANDS[name][0][0]) is None:
+        raise ValueError(f"The {name} command was not found.")
+    return CommandClipboard(name, *COMMANDS[name])
+
+
+def clear_after_setting():
+    """Czas automatycznego czyszczenia (s) ze zmiennej FORTIPASS_CLIPBOARD_CLEAR lub domyślny"""
+    try:
+        seconds = float(os.environ.get(CLEAR_AFTER_ENV, CLEAR_AFTER))
+    except ValueError:
+        raise ValueError(f"{CLEAR_AFTER_ENV} must be a number of seconds.") from None
+    return max(0.0, seconds)
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class ClipboardService:
+    def __init__(self, backend, tasks, clear_after=CLEAR_AFTER, on_cleared=None):
+        """Kopiowanie bez blokowania wątku Tk (polecenia systemowe w puli zadań) i czyszczenie schowka po
+        clear_after s, jeśli nadal zawiera skopiowany tekst (przechowywany jest tylko jego skrót)"""
+        self.backend = backend
+        self.tasks = tasks
+        self.clear_after = clear_after
+        self.on_cleared = on_cleared
+        self.copied = None  # skrót ostatnio skopiowanego tekstu
+        self.clear_job = None
+
+    def _call(self, function, *args, on_done=None, on_error=None):
+        """Wywołanie mechanizmu: w wątku Tk (Tk) lub w wątku roboczym (zwraca zadanie); wyniki w wątku Tk"""
+        if not self.backend.blocking:
+            try:
+                result = function(*args)
+            except Exception as e:
+                if on_error is not None:
+                    on_error(e)
+                return None
+            if on_done is not None:
+                on_done(result)
+            return None
+        return self.tasks.submit(lambda task: function(*args), on_done=on_done, on_error=on_error)
+
+    def copy(self, text, on_done=None, on_error=None):
+        """Zapisuje text do schowka; on_done() / on_error(wyjątek) po zakończeniu (wątek Tk)"""
+        digest = _digest(text)
+
+        def copied(result):
+            self.copied = digest
+            self.schedule_clear()
+            if on_done is not None:
+                on_done()
+
+        return self._call(self.backend.copy, text, on_done=copied, on_error=on_error)
+
+    def schedule_clear(self):
+        root = self.tasks.root
+        if root is None:
+            return
+        if self.clear_job is not None:
+            root.after_cancel(self.clear_job)
+            self.clear_job = None
+        if self.clear_after > 0:
+            self.clear_job = root.after(int(self.clear_after * 1000), self.expire)
+
+    def expire(self):
+        """Czyści schowek, jeśli nadal zawiera skopiowany tekst (zmiana zawartości przez użytkownika - bez zmian)"""
+        self.clear_job = None
+        digest = self.copied
+        if digest is None:
+            return None
+
+        def clear_if_ours():
+            if _digest(self.backend.paste()) != digest:
+                return False
+            self.backend.clear()
+            return True
+
+        def finished(cleared):
+            if self.copied == digest:
+                self.copied = None
+            if cleared:
+                logging.info("The clipboard was cleared after %s s.", f"{self.clear_after:g}")
+                if self.on_cleared is not None:
+                    self.on_cleared()
+
+        return self._call(clear_if_ours, on_done=finished,
+                          on_error=lambda e: logging.error("Clearing the clipboard: %s!", e))
+
+    def close(self):
+        """Przy zamykaniu programu: usuwa ze schowka skopiowane hasło (polecenia systemowe działają dalej)"""
+        if self.clear_job is not None and self.tasks.root is not None:
+            self.tasks.root.after_cancel(self.clear_job)
+            self.clear_job = None
+        if self.copied is None:
+            return
+        try:
+            if _digest(self.backend.paste()) == self.copied:
+                self.backend.clear()
+        except Exception as e:
+            logging.error("Clearing the clipboard: %s!", e)
+        self.copied = None
@@ -0,0 +1,60 @@
+# fortipass/crypto.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, hmac, hashlib
+
+
+# Parametry scrypt nowych kluczy (ok. 32 MiB pamięci, ~0,1 s na klucz)
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 1 << 15, 8, 1
+
+# Szyfrowanie z uwierzytelnianiem (encrypt-then-MAC) na BLAKE2b z biblioteki standardowej:
+#   blok strumienia i = BLAKE2b-512(nonce || i (8 bajtów LE), klucz szyfrowania), szyfrogram = tekst XOR strumień
+#   znacznik = BLAKE2b-128(długość danych powiązanych (8 bajtów LE) || dane powiązane || nonce || szyfrogram,
+#              klucz uwierzytelniania)
+#   wynik = nonce (16 losowych bajtów) || szyfrogram || znacznik
+# Klucze niezależne (scrypt), znacznik porównywany w stałym czasie; dane powiązane są uwierzytelniane, ale nie
+# szyfrowane. Wektory testowe (BLAKE2b, scrypt i cała konstrukcja) - tests/crypto_test.py
+NONCE_SIZE = 16
+MAC_SIZE = 16
+
+
+def derive_keys(passphrase, salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """Klucze szyfrowania, uwierzytelniania i znaczników (po 32 bajty) z hasła (scrypt)"""
+    material = hashlib.scrypt(passphrase.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * r * (n + p + 2), dklen=96)
+    return material[:32], material[32:64], material[64:]
+
+
+def keystream_xor(key, nonce, data):
+    """Szyfrowanie i odszyfrowanie: XOR ze strumieniem klucza BLAKE2b(nonce + licznik)"""
+    stream = b"".join(hashlib.blake2b(nonce + counter.to_bytes(8, "little"), key=key).digest()
+                      for counter in range((len(data) + 63) // 64))
+    size = len(data)
+    return (int.from_bytes(data, "little") ^ int.from_bytes(stream[:size], "little")).to_bytes(size, "little")
+
+
+def authenticate(mac_key, associated, data):
+    """Znacznik danych i danych powiązanych (BLAKE2b z kluczem, długość danych powiązanych na początku)"""
+    return hashlib.blake2b(len(associated).to_bytes(8, "little") + associated + data, key=mac_key,
+                           digest_size=MAC_SIZE).digest()
+
+
+def encrypt(key, mac_key, plaintext, associated=b"", nonce=None):
+    """Nonce + szyfrogram + znacznik; nonce losowy (podawany tylko w wektorach testowych)"""
+    if nonce is None:
+        nonce = os.urandom(NONCE_SIZE)
+    body = nonce + keystream_xor(key, nonce, plaintext)
+    return body + authenticate(mac_key, associated, body)
+
+
+def decrypt(key, mac_key, sealed, associated=b""):
+    """Tekst zaszyfrowany przez encrypt albo None (zły klucz, zmienione dane lub dane powiązane)"""
+    if len(sealed) < NONCE_SIZE + MAC_SIZE:
+        return None
+    body, mac = sealed[:-MAC_SIZE], sealed[-MAC_SIZE:]
+    if not hmac.compare_digest(mac, authenticate(mac_key, associated, body)):
+        return None
+    return keystream_xor(key, body[:NONCE_SIZE], body[NONCE_SIZE:])
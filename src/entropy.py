@@ -0,0 +1,131 @@
+# fortipass/entropy.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, threading, weakref
+
+
+DEFAULT_BLOCK_SIZE = 4096
+
+# Wszystkie utworzone pule (czyszczone w procesie potomnym po fork())
+_pools = weakref.WeakSet()
+_local = threading.local()
+
+
+class EntropyPool:
+    def __init__(self, block_size=DEFAULT_BLOCK_SIZE):
+        """Bufor losowości pobieranej z os.urandom w dużych blokach"""
+        if block_size < 1:
+            raise ValueError("The entropy block size must be greater than zero.")
+        self.block_size = block_size
+        self._buffer = b""
+        self._pos = 0
+        self._tables = {}
+        _pools.add(self)
+
+    def reset(self):
+        """Odrzuca niewykorzystane bajty (np. po fork(), aby procesy nie współdzieliły losowości)"""
+        self._buffer = b""
+        self._pos = 0
+
+    def randbytes(self, n):
+        """Zwraca n losowych bajtów z bufora, dociągając kolejne bloki z os.urandom"""
+        buffer, pos = self._buffer, self._pos
+        if pos + n <= len(buffer):
+            self._pos = pos + n
+            return buffer[pos:pos + n]
+
+        # Reszta bieżącego bloku + nowy blok (jedno wywołanie systemowe)
+        head = buffer[pos:]
+        need = n - len(head)
+        block = os.urandom(max(self.block_size, need))
+        self._buffer = block
+        self._pos = need
+        return head + block[:need]
+
+    def randbelow(self, n):
+        """Losowa liczba z przedziału [0, n) - próbkowanie z odrzucaniem (bez obciążenia)"""
+        if n <= 0:
+            raise ValueError("The upper bound must be greater than zero.")
+        if n <= 256:
+            limit = 256 - 256 % n
+            while True:
+                byte = self.randbytes(1)[0]
+                if byte < limit:
+                    return byte % n
+
+        size = (n.bit_length() + 7) // 8
+        span = 1 << (8 * size)
+        limit = span - span % n
+        while True:
+            value = int.from_bytes(self.randbytes(size), "big")
+            if value < limit:
+                return value % n
+
+    def choice(self, seq):
+        """Losowy element niepustej sekwencji"""
+        if not seq:
+            raise IndexError("Cannot choose from an empty sequence.")
+        return seq[self.randbelow(len(seq))]
+
+    def shuffle(self, x):
+        """Tasowanie Fishera-Yatesa w miejscu, z użyciem CSPRNG"""
+        randbelow = self.randbelow
+        for i in range(len(x) - 1, 0, -1):
+            j = randbelow(i + 1)
+            x[i], x[j] = x[j], x[i]
+
+    def sample(self, population, k):
+        """Lista k różnych elementów populacji (częściowe tasowanie Fishera-Yatesa)"""
+        pool = list(population)
+        n = len(pool)
+        if not 0 <= k <= n:
+            raise ValueError("Sample larger than population or is negative.")
+        randbelow = self.randbelow
+        for i in range(k):
+            j = i + randbelow(n - i)
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
+
+    def _translation(self, alphabet):
+        """Tablica bajt -> znak oraz zbiór bajtów odrzucanych dla danego alfabetu (cache)"""
+        table = self._tables.get(alphabet)
+        if table is None:
+            n = len(alphabet)
+            if not 0 < n <= 256:
+                raise ValueError("The alphabet must contain between 1 and 256 characters.")
+            limit = 256 - 256 % n
+            encoded = alphabet.encode("latin-1")
+            mapping = bytes(encoded[b % n] if b < limit else 0 for b in range(256))
+            rejected = bytes(range(limit, 256))
+            table = self._tables[alphabet] = (mapping, rejected)
+        return table
+
+    def sample_chars(self, alphabet, k):
+        """Zwraca napis k znaków wylosowanych niezależnie i jednostajnie z alfabetu"""
+        mapping, rejected = self._translation(alphabet)
+        result = b""
+        while len(result) < k:
+            # Bajty spoza zakresu bez obciążenia są usuwane w całości (odrzucenie)
+            result += self.randbytes(k - len(result)).translate(mapping, rejected)
+        return result.decode("latin-1")
+
+
+def default_pool():
+    """Pula losowości przypisana do bieżącego wątku"""
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = EntropyPool()
+    return pool
+
+
+def _reset_after_fork():
+    """Proces potomny nie może ponownie użyć bajtów zbuforowanych przez rodzica"""
+    for pool in list(_pools):
+        pool.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
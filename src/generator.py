@@ -0,0 +1,141 @@
+# fortipass/generator.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import string
+from functools import lru_cache
+from entropy import default_pool
+
+
+MIN_LENGTH = 4
+MAX_LENGTH = 128
+DEFAULT_LENGTH = 12
+DEFAULT_CHUNK_SIZE = 1000
+
+# Znaki łatwe do pomylenia przy przepisywaniu hasła
+AMBIGUOUS_CHARS = "O0l1I"
+
+
+class Policy:
+    def __init__(self, length=DEFAULT_LENGTH, use_letters=True, use_numbers=True, use_special=True,
+                 min_letters=1, min_numbers=1, min_special=1, exclude="", exclude_ambiguous=False,
+                 no_repeat=False):
+        """Polityka generowania hasła kompilowana jednorazowo do tablic znaków"""
+        if length < MIN_LENGTH:
+            raise ValueError("Password length must be at least 4 characters.")
+        if length > MAX_LENGTH:
+            raise ValueError("Password length must be no more than 128 characters.")
+        if not any([use_letters, use_numbers, use_special]):
+            raise ValueError("You must select at least one option!")
+        if min(min_letters, min_numbers, min_special) < 0:
+            raise ValueError("The minimum number of characters cannot be negative.")
+
+        self.length = length
+        self.use_letters = use_letters
+        self.use_numbers = use_numbers
+        self.use_special = use_special
+        self.exclude_ambiguous = exclude_ambiguous
+        self.no_repeat = no_repeat
+
+        # Zbiór znaków wykluczonych (w tym niejednoznacznych, jeśli wybrano)
+        excluded = set(exclude)
+        if exclude_ambiguous:
+            excluded.update(AMBIGUOUS_CHARS)
+        self.exclude = ''.join(sorted(excluded))
+
+        # Kompilacja klas: (nazwa, alfabet po wykluczeniach, minimalna liczba znaków)
+        selected = [
+            ("letters", string.ascii_letters, use_letters, min_letters),
+            ("numbers", string.digits, use_numbers, min_numbers),
+            ("special characters", string.punctuation, use_special, min_special),
+        ]
+        classes = []
+        for name, alphabet, enabled, minimum in selected:
+            if not enabled:
+                continue
+            alphabet = ''.join(c for c in alphabet if c not in excluded)
+            if not alphabet:
+                raise ValueError(f"All {name} are excluded from the password.")
+            if no_repeat and minimum > len(alphabet):
+                raise ValueError(f"Not enough distinct {name} for the required minimum.")
+            classes.append((name, alphabet, minimum))
+
+        self.classes = tuple(classes)
+        self.characters = ''.join(alphabet for _, alphabet, _ in classes)
+        self.required = tuple((alphabet, minimum) for _, alphabet, minimum in classes if minimum)
+        self.required_count = sum(minimum for _, minimum in self.required)
+
+        if self.required_count > length:
+            raise ValueError("The minimum character counts exceed the password length.")
+        if no_repeat and length > len(self.characters):
+            raise ValueError("The password is longer than the number of distinct characters available.")
+
+    def composition(self):
+        """Zwraca nazwy składników hasła (do logowania)"""
+        return [name for name, _, _ in self.classes]
+
+
+@lru_cache(maxsize=128)
+def get_policy(length=DEFAULT_LENGTH, use_letters=True, use_numbers=True, use_special=True,
+               min_letters=1, min_numbers=1, min_special=1, exclude="", exclude_ambiguous=False,
+               no_repeat=False):
+    """Skompilowana polityka zapamiętywana według parametrów (wspólna dla GUI i trybu wsadowego)"""
+    return Policy(length, use_letters, use_numbers, use_special, min_letters, min_numbers, min_special,
+                  exclude, exclude_ambiguous, no_repeat)
+
+
+def _sample_distinct(policy, rng):
+    """Losowanie bez powtórzeń: minimum z każdej klasy, reszta z pozostałych znaków"""
+    password = []
+    for alphabet, minimum in policy.required:
+        password += rng.sample(alphabet, minimum)
+
+    chosen = set(password)
+    rest = [c for c in policy.characters if c not in chosen]
+    password += rng.sample(rest, policy.length - len(password))
+    return password
+
+
+def generate_password(policy, rng=None):
+    """Generuje jedno hasło zgodne z podaną polityką (rng: własna pula EntropyPool)"""
+    rng = rng or default_pool()
+
+    if policy.no_repeat:
+        password = _sample_distinct(policy, rng)
+    else:
+        # Konstrukcyjne spełnienie minimów każdej klasy (bez ponawiania losowania)
+        password = []
+        for alphabet, minimum in policy.required:
+            password += rng.sample_chars(alphabet, minimum)
+
+        # Wypełnianie reszty hasła losowymi znakami z dostępnej puli (jeden odczyt bufora)
+        password += rng.sample_chars(policy.characters, policy.length - policy.required_count)
+
+    # Mieszanie znaków w haśle (Fisher-Yates na CSPRNG)
+    rng.shuffle(password)
+    return ''.join(password)
+
+
+def iter_passwords(n, policy, chunk_size=DEFAULT_CHUNK_SIZE, rng=None):
+    """Generator zwracający hasła partiami (listy o długości chunk_size)"""
+    if n < 0:
+        raise ValueError("The number of passwords cannot be negative.")
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be greater than zero.")
+
+    rng = rng or default_pool()
+    remaining = n
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        yield [generate_password(policy, rng) for _ in range(size)]
+        remaining -= size
+
+
+def generate_many(n, policy):
+    """Generuje listę n haseł z jedną, wcześniej zbudowaną pulą znaków"""
+    passwords = []
+    for chunk in iter_passwords(n, policy):
+        passwords.extend(chunk)
+    return passwords
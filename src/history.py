@@ -0,0 +1,565 @@
+# fortipass/history.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, hmac, json, mmap, time, zlib, fcntl, struct, hashlib, logging, threading
+from contextlib import contextmanager
+from pathlib import Path
+from paths import temp_path
+from crypto import derive_keys, keystream_xor, decrypt, authenticate, NONCE_SIZE, MAC_SIZE, SCRYPT_N, SCRYPT_R, SCRYPT_P
+
+
+# Plik danych: nagłówek + rekordy dopisywane na końcu (nigdy nie nadpisywane, usuwane tylko przez kompaktowanie)
+MAGIC = b"FPHIST01"
+HEADER = struct.Struct("<8s16s16sIII16s")  # magic, identyfikator pliku, sól, parametry scrypt (n, r, p), test klucza
+
+# Rekord: długość treści, CRC32 (rodzaj + znacznik + treść), rodzaj, znacznik etykiety (kluczowany BLAKE2b)
+RECORD = struct.Struct("<IIB16s")
+PUT, DELETE = 1, 2
+
+# Treść PUT: nonce + szyfrogram (JSON) + MAC (crypto.encrypt); treść DELETE: MAC. Dane powiązane MAC:
+# identyfikator pliku, pozycja rekordu, rodzaj i znacznik - rekordu nie da się przenieść w inne miejsce ani plik
+MAX_RECORD = 1 << 20
+
+# Indeks: tablica mieszająca z adresowaniem otwartym (mmap) + słownik zmian od jej zapisu
+INDEX_MAGIC = b"FPHIDX01"
+INDEX_HEADER = struct.Struct("<8s16sQQQQQ")  # magic, identyfikator pliku danych, pokryte bajty, szczeliny,
+                                            # wpisy, szczeliny usunięte, martwe bajty
+SLOT = struct.Struct("<16sQ")  # znacznik, pozycja rekordu (0 - pusta, 1 - usunięta)
+EMPTY, REMOVED = 0, 1
+MIN_SLOTS = 1024
+MAX_LOAD = 0.5  # przy większym zapełnieniu (z usuniętymi) tablica budowana od nowa, 2x większa
+INDEX_EVERY = 100_000  # zmiany w pamięci, po których indeks jest zapisywany (ogranicza odtwarzanie po awarii)
+
+# Kompaktowanie, gdy martwe rekordy zajmują ponad połowę pliku (i plik ma co najmniej 1 MiB)
+COMPACT_RATIO = 0.5
+COMPACT_MIN_BYTES = 1 << 20
+
+# Historia włączana zmienną środowiskową; hasło szyfrujące z FORTIPASS_HISTORY_PASSPHRASE lub z pytania
+HISTORY_ENV = "FORTIPASS_HISTORY"
+PASSPHRASE_ENV = "FORTIPASS_HISTORY_PASSPHRASE"
+
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def default_history_file():
+    """Plik historii w katalogu danych użytkownika (XDG_DATA_HOME)"""
+    base = os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share"
+    return Path(base) / "fortipass" / "history.fpv"
+
+
+def history_enabled():
+    return os.environ.get(HISTORY_ENV, "").lower() in ("1", "true", "yes", "on")
+
+
+def _key_check(mac_key):
+    """Wartość testowa klucza zapisywana w nagłówku (rozpoznanie złego hasła przed odczytem rekordów)"""
+    return hashlib.blake2b(b"fortipass-history", key=mac_key, digest_size=16).digest()
+
+
+def _associated(file_id, offset, kind, tag):
+    return file_id + offset.to_bytes(8, "little") + bytes((kind,)) + tag
+
+
+def _fsync_directory(path):
+    fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_file(path, chunks):
+    """Zapis atomowy z fsync (plik tymczasowy + os.replace)"""
+    temp = temp_path(path)
+    try:
+        with open(temp, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+    _fsync_directory(path)
+
+
+class PasswordHistory:
+    def __init__(self, path, passphrase, kdf=(SCRYPT_N, SCRYPT_R, SCRYPT_P)):
+        """Szyfrowana historia haseł: rekordy dopisywane do pliku, wyszukiwanie po etykiecie w O(1).
+        kdf - parametry scrypt dla nowego pliku (istniejący zapisuje własne w nagłówku)"""
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".index")
+        self.lock = threading.RLock()  # indeks, bufor i deskryptor pliku
+        self.commit_lock = threading.Lock()  # jeden zapis z fsync naraz (pozostałe dołączają do niego)
+        self.compact_lock = threading.RLock()  # kompaktowanie i zapis indeksu
+        self.pending = bytearray()  # rekordy dopisane, jeszcze niezapisane do pliku
+        self.overlay = {}  # znacznik -> pozycja rekordu (ujemna - usunięcie) od zapisu indeksu
+        self.base = None  # zapisany indeks (mmap) albo None
+        self.base_mask = 0
+        self.batch_depth = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            self._create(passphrase, *kdf)
+        self.fd = self._open()
+        try:
+            for stale in self.path.parent.glob(f"{self.path.name}*.tmp"):
+                stale.unlink(missing_ok=True)  # pozostałość przerwanego zapisu lub kompaktowania
+            header = os.pread(self.fd, HEADER.size, 0)
+            if len(header) != HEADER.size or header[:8] != MAGIC:
+                raise ValueError(f"{self.path} is not a FortiPass password history.")
+            _, self.file_id, self.salt, n, r, p, check = HEADER.unpack(header)
+            self.kdf = n, r, p
+            self.key, self.mac_key, self.tag_key = derive_keys(passphrase, self.salt, n, r, p)
+            if not hmac.compare_digest(check, _key_check(self.mac_key)):
+                raise ValueError("Wrong passphrase for the password history.")
+            self.check = check
+            covered = self._load_index()
+            self.written = self.durable = self._scan(covered)
+        except BaseException:
+            self.close(save=False)
+            raise
+        if len(self.overlay) >= INDEX_EVERY:
+            self.save_index()
+
+    def _create(self, passphrase, n, r, p):
+        salt = os.urandom(16)
+        _, mac_key, _ = derive_keys(passphrase, salt, n, r, p)
+        _write_file(self.path, [HEADER.pack(MAGIC, os.urandom(16), salt, n, r, p, _key_check(mac_key))])
+
+    def _open(self):
+        """Deskryptor pliku danych z blokadą wyłączną (okno i wiersz poleceń nie piszą jednocześnie)"""
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                raise OSError(f"The password history {self.path} is used by another process.") from None
+            if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                return fd
+            os.close(fd)  # plik zastąpiony przez kompaktowanie przed uzyskaniem blokady
+
+    def close(self, save=True):
+        """Zapisuje zaległe rekordy i indeks (następne otwarcie bez przeglądania pliku)"""
+        if getattr(self, "fd", None) is None:
+            return
+        with self.compact_lock:  # trwające kompaktowanie kończy się przed zamknięciem
+            if save:
+                self.commit()
+                if self.overlay or self.base is None:
+                    self.save_index()
+            self._close_base()
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, label):
+        with self.lock:
+            return self._lookup(self._tag(label)) is not None
+
+    # Szyfrowanie z uwierzytelnianiem (crypto.encrypt w dwóch krokach: szyfrogram poza blokadą, MAC po
+    # przydzieleniu pozycji rekordu)
+
+    def _tag(self, label):
+        return hashlib.blake2b(label.encode("utf-8"), key=self.tag_key, digest_size=16).digest()
+
+    def _cipher(self, payload):
+        """Nonce i szyfrogram treści PUT"""
+        if len(payload) > MAX_RECORD - NONCE_SIZE - MAC_SIZE:
+            raise ValueError("The history entry is too large.")
+        nonce = os.urandom(NONCE_SIZE)
+        return nonce + keystream_xor(self.key, nonce, payload)
+
+    def _record(self, offset, kind, tag, body=b"", file_id=None):
+        """Rekord z MAC związanym z plikiem i pozycją offset"""
+        body += authenticate(self.mac_key, _associated(file_id or self.file_id, offset, kind, tag), body)
+        crc = zlib.crc32(body, zlib.crc32(bytes((kind,)) + tag))
+        return RECORD.pack(len(body), crc, kind, tag) + body
+
+    def _verified(self, offset, record):
+        """Treść rekordu z pozycji offset bez MAC; błąd, gdy MAC się nie zgadza"""
+        length, _, kind, tag = RECORD.unpack_from(record)
+        end = RECORD.size + length - MAC_SIZE
+        body, mac = record[RECORD.size:end], record[end:RECORD.size + length]
+        if not hmac.compare_digest(mac, authenticate(self.mac_key, _associated(self.file_id, offset, kind, tag),
+                                                     body)):
+            raise ValueError("A password history record failed authentication (the file was modified).")
+        return kind, tag, body
+
+    def _moved(self, offset, record, file_id, position):
+        """Rekord z pozycji offset przeniesiony do pozycji position pliku file_id (MAC sprawdzany i liczony od nowa)"""
+        kind, tag, body = self._verified(offset, record)
+        return self._record(position, kind, tag, body, file_id)
+
+    def _decrypt(self, offset, record):
+        length, _, kind, tag = RECORD.unpack_from(record)
+        payload = decrypt(self.key, self.mac_key, record[RECORD.size:RECORD.size + length],
+                          _associated(self.file_id, offset, kind, tag))
+        if payload is None:
+            raise ValueError("A password history record failed authentication (the file was modified).")
+        return json.loads(payload)
+
+    # Indeks: zapisana tablica mieszająca (mmap) + słownik zmian
+
+    def _probe(self, table, mask, tag):
+        """Pozycja szczeliny znacznika albo (None, pierwsza wolna lub usunięta szczelina)"""
+        i = int.from_bytes(tag[:8], "little") & mask
+        free = None
+        while True:
+            position = INDEX_HEADER.size + i * SLOT.size
+            slot_tag, offset = SLOT.unpack_from(table, position)
+            if offset == EMPTY:
+                return None, free if free is not None else position
+            if offset == REMOVED:
+                if free is None:
+                    free = position
+            elif slot_tag == tag:
+                return position, None
+            i = (i + 1) & mask
+
+    def _lookup(self, tag):
+        """Pozycja aktualnego rekordu etykiety (None - brak lub usunięta)"""
+        offset = self.overlay.get(tag)
+        if offset is None and self.base is not None and tag not in self.overlay:
+            position, _ = self._probe(self.base, self.base_mask, tag)
+            if position is not None:
+                offset = SLOT.unpack_from(self.base, position)[1]
+        return offset if offset is not None and offset > 0 else None
+
+    def _load_index(self):
+        """Zapisany indeks, jeśli opisuje ten plik danych; zwraca pozycję, od której trzeba przejrzeć rekordy"""
+        self.count = self.removed = self.dead = self.base_used = 0
+        size = os.fstat(self.fd).st_size
+        try:
+            f = open(self.index_path, "rb")
+        except FileNotFoundError:
+            return HEADER.size
+        with f:
+            header = f.read(INDEX_HEADER.size)
+            if len(header) == INDEX_HEADER.size:
+                magic, file_id, covered, slots, count, removed, dead = INDEX_HEADER.unpack(header)
+                if (magic == INDEX_MAGIC and file_id == self.file_id and HEADER.size <= covered <= size
+                        and os.fstat(f.fileno()).st_size == INDEX_HEADER.size + slots * SLOT.size):
+                    self.base = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self.base_mask = slots - 1
+                    self.count, self.removed, self.dead = count, removed, dead
+                    self.base_used = count + removed  # zajęte szczeliny (wpisy i usunięte)
+                    return covered
+        logging.warning("The password history index is outdated and will be rebuilt.")
+        return HEADER.size
+
+    def _close_base(self):
+        if self.base is not None:
+            self.base.close()
+            self.base = None
+
+    def _read(self, offset, size):
+        """Bajty pliku danych lub bufora zapisu (wywołanie pod self.lock)"""
+        if offset >= self.written:
+            start = offset - self.written
+            return bytes(self.pending[start:start + size])
+        return os.pread(self.fd, size, offset)
+
+    def _record_size(self, offset):
+        return RECORD.size + RECORD.unpack(self._read(offset, RECORD.size))[0]
+
+    def _apply(self, offset, kind, tag, size):
+        """Uwzględnia rekord w indeksie (liczba wpisów i bajty zastąpionych rekordów)"""
+        previous = self._lookup(tag)
+        if previous is not None:
+            self.dead += self._record_size(previous)
+        if kind == PUT:
+            self.overlay[tag] = offset
+            if previous is None:
+                self.count += 1
+        else:
+            self.overlay[tag] = -offset
+            self.dead += size
+            if previous is not None:
+                self.count -= 1
+
+    def _scan(self, start):
+        """Rekordy za zapisanym indeksem; niepełny lub uszkodzony koniec (przerwany zapis) jest obcinany"""
+        size = os.fstat(self.fd).st_size
+        self.written = size  # odczyt zastępowanych rekordów z pliku
+        position = start
+        if size > start:
+            with mmap.mmap(self.fd, size, access=mmap.ACCESS_READ) as data:
+                unpack, crc32 = RECORD.unpack_from, zlib.crc32
+                while position + RECORD.size <= size:
+                    length, crc, kind, tag = unpack(data, position)
+                    end = position + RECORD.size + length
+                    if (kind not in (PUT, DELETE) or length < MAC_SIZE or end > size
+                            or crc32(data[position + 8:end]) != crc):
+                        break
+                    if kind == DELETE and not hmac.compare_digest(
+                            data[end - MAC_SIZE:end],
+                            authenticate(self.mac_key, _associated(self.file_id, position, kind, tag), b"")):
+                        break
+                    self._apply(position, kind, tag, end - position)
+                    position = end
+        if position < size:
+            logging.warning("The password history ends with an incomplete record (%s bytes were discarded).",
+                            size - position)
+            os.ftruncate(self.fd, position)
+            os.fsync(self.fd)
+        return position
+
+    # Zapis: rekordy do bufora, fsync grupowy
+
+    def _put_record(self, label, password, fields, now):
+        entry = dict(fields, label=label, password=password)
+        entry.setdefault("time", now)
+        tag = self._tag(label)
+        return tag, self._cipher(_encode(entry).encode("utf-8"))
+
+    def _check_open(self):
+        if self.fd is None:
+            raise ValueError("The password history is closed.")
+
+    def _append(self, records):
+        """Dopisuje rekordy PUT (znacznik, szyfrogram) do bufora i indeksu (jedno zajęcie blokady)"""
+        with self.lock:
+            self._check_open()
+            for tag, body in records:
+                offset = self.written + len(self.pending)
+                record = self._record(offset, PUT, tag, body)
+                self.pending += record
+                self._apply(offset, PUT, tag, len(record))
+
+    def put(self, label, password, sync=True, **fields):
+        """Zapisuje hasło pod etykietą (zastępuje poprzednie); sync=False - bez fsync (patrz commit, batch)"""
+        self._append([self._put_record(label, password, fields, time.time())])
+        if sync and not self.batch_depth:
+            self.commit()
+
+    def put_many(self, entries):
+        """Zapis wielu wpisów (etykieta, hasło[, pola]) z jednym fsync; szyfrowanie poza blokadą"""
+        now = time.time()
+        self._append([self._put_record(entry[0], entry[1], entry[2] if len(entry) > 2 else {}, now)
+                      for entry in entries])
+        if not self.batch_depth:
+            self.commit()
+
+    def delete(self, label, sync=True):
+        """Usuwa wpis (rekord usunięcia; miejsce zwalnia kompaktowanie); False, gdy etykiety nie ma"""
+        tag = self._tag(label)
+        with self.lock:
+            self._check_open()
+            if self._lookup(tag) is None:
+                return False
+            offset = self.written + len(self.pending)
+            record = self._record(offset, DELETE, tag)
+            self.pending += record
+            self._apply(offset, DELETE, tag, len(record))
+        if sync and not self.batch_depth:
+            self.commit()
+        return True
+
+    @contextmanager
+    def batch(self):
+        """Zapisy w bloku utrwalane jednym fsync na jego końcu"""
+        with self.lock:
+            self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.batch_depth -= 1
+                last = not self.batch_depth
+            if last:
+                self.commit()
+
+    def commit(self):
+        """Zapis bufora i fsync; wątki czekające na trwający zapis dołączają do niego (group commit)"""
+        with self.lock:
+            target = self.written + len(self.pending)
+        with self.commit_lock:
+            if self.durable >= target:
+                return  # rekordy utrwalone przez fsync innego wątku
+            # Zapis poza self.lock: odczyty i kolejne rekordy nie czekają na fsync
+            self._flush()
+            with self.lock:
+                save = len(self.overlay) >= INDEX_EVERY
+        if save:
+            self.save_index()
+
+    def _flush(self):
+        """Zapis bufora i fsync (wywołanie pod commit_lock)"""
+        with self.lock:
+            chunk = bytes(self.pending)
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(self.fd, view):]
+        os.fsync(self.fd)
+        with self.lock:
+            del self.pending[:len(chunk)]
+            self.written += len(chunk)
+            self.durable = self.written
+
+    # Odczyt
+
+    def get(self, label):
+        """Wpis (słownik z polami label, password, time, ...) albo None"""
+        with self.lock:
+            offset = self._lookup(self._tag(label))
+            if offset is None:
+                return None
+            size = self._record_size(offset)
+            record = self._read(offset, size)
+        entry = self._decrypt(offset, record)
+        if entry.get("label") != label:
+            raise ValueError("A password history record does not match its label.")
+        return entry
+
+    def entries(self):
+        """Wszystkie wpisy w kolejności zapisu (odszyfrowywane kolejno)"""
+        for offset, tag in self._live():
+            with self.lock:
+                if self._lookup(tag) != offset:
+                    continue  # zastąpiony lub usunięty w trakcie przeglądania
+                record = self._read(offset, self._record_size(offset))
+            yield self._decrypt(offset, record)
+
+    # Indeks i kompaktowanie
+
+    def _build_table(self, items, count):
+        """Nowa tablica mieszająca dla par (znacznik, pozycja)"""
+        slots = MIN_SLOTS
+        while slots * MAX_LOAD < count:
+            slots *= 2
+        table = bytearray(INDEX_HEADER.size + slots * SLOT.size)
+        mask = slots - 1
+        for tag, offset in items:
+            _, free = self._probe(table, mask, tag)
+            SLOT.pack_into(table, free, tag, offset)
+        return table, slots, 0
+
+    def _updated_table(self):
+        """Zapisana tablica z naniesionymi zmianami; przy zbyt dużym zapełnieniu - zbudowana od nowa"""
+        if self.base is not None:
+            slots = self.base_mask + 1
+            removed = self.removed
+            if self.base_used + sum(offset > 0 for offset in self.overlay.values()) <= slots * MAX_LOAD:
+                table = bytearray(self.base)
+                for tag, offset in self.overlay.items():
+                    position, free = self._probe(table, self.base_mask, tag)
+                    if offset > 0:
+                        if position is None:
+                            if SLOT.unpack_from(table, free)[1] == REMOVED:
+                                removed -= 1
+                            position = free
+                        SLOT.pack_into(table, position, tag, offset)
+                    elif position is not None:
+                        SLOT.pack_into(table, position, tag, REMOVED)
+                        removed += 1
+                return table, slots, removed
+        items = [(tag, offset) for offset, tag in self._live_entries(self.overlay)]
+        return self._build_table(items, self.count)
+
+    def _live_entries(self, overlay, limit=None):
+        """Pozycje i znaczniki aktualnych rekordów w kolejności zapisu (limit - tylko rekordy przed tą pozycją)"""
+        live = []
+        if self.base is not None:
+            for tag, offset in SLOT.iter_unpack(memoryview(self.base)[INDEX_HEADER.size:]):
+                if offset > REMOVED and tag not in overlay:
+                    live.append((offset, tag))
+        live += [(offset, tag) for tag, offset in overlay.items() if 0 < offset and (limit is None or offset < limit)]
+        live.sort()
+        return live
+
+    def _live(self, limit=None):
+        # Zapisana tablica zmienia się tylko przy zapisie indeksu i kompaktowaniu (compact_lock)
+        with self.compact_lock:
+            with self.lock:
+                overlay = dict(self.overlay)
+            return self._live_entries(overlay, limit)
+
+    def save_index(self):
+        """Zapis indeksu całego pliku (zapisy innych wątków czekają do jego końca)"""
+        with self.compact_lock, self.commit_lock, self.lock:
+            self._flush()
+            table, slots, removed = self._updated_table()
+            INDEX_HEADER.pack_into(table, 0, INDEX_MAGIC, self.file_id, self.written, slots, self.count, removed,
+                                   self.dead)
+            _write_file(self.index_path, [table])
+            self._close_base()
+            self.overlay = {}
+            self._load_index()
+
+    def needs_compaction(self):
+        with self.lock:
+            size = self.written + len(self.pending)
+            return size >= COMPACT_MIN_BYTES and self.dead > size * COMPACT_RATIO
+
+    def compact(self):
+        """Przepisuje aktualne rekordy do nowego pliku (bez usuniętych i zastąpionych); zapisy w trakcie
+        kompaktowania dopisywane są do starego pliku i przenoszone na końcu"""
+        with self.compact_lock:
+            self.commit()
+            with self.lock:
+                start = self.written
+            live = self._live(start)
+            file_id = os.urandom(16)
+            compacted = temp_path(self.path)
+            items = []
+            try:
+                with open(compacted, "wb") as f:
+                    f.write(HEADER.pack(MAGIC, file_id, self.salt, *self.kdf, self.check))
+                    position = HEADER.size
+                    for offset, tag in live:
+                        with self.lock:
+                            record = self._read(offset, self._record_size(offset))
+                        f.write(self._moved(offset, record, file_id, position))
+                        items.append((tag, position))
+                        position += len(record)
+                    table, slots, removed = self._build_table(items, len(items))
+                    INDEX_HEADER.pack_into(table, 0, INDEX_MAGIC, file_id, position, slots, len(items), removed, 0)
+
+                    with self.commit_lock, self.lock:
+                        # Rekordy dopisane w trakcie kopiowania - na koniec nowego pliku
+                        offset, end = start, self.written + len(self.pending)
+                        while offset < end:
+                            record = self._read(offset, self._record_size(offset))
+                            f.write(self._moved(offset, record, file_id, position))
+                            offset += len(record)
+                            position += len(record)
+                        f.flush()
+                        os.fsync(f.fileno())
+                        _write_file(self.index_path, [table])
+                        # Nowy plik zablokowany przed podmianą - inny proces nie otworzy go w tym czasie
+                        fd = os.open(compacted, os.O_RDWR | os.O_APPEND)
+                        try:
+                            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                            os.replace(compacted, self.path)
+                        except BaseException:
+                            os.close(fd)
+                            raise
+                        os.close(self.fd)
+                        self.fd = fd
+                        _fsync_directory(self.path)
+                        self.file_id = file_id
+                        self.pending.clear()
+                        self.overlay = {}
+                        self._close_base()
+                        covered = self._load_index()
+                        self.written = self.durable = self._scan(covered)
+            except BaseException:
+                compacted.unlink(missing_ok=True)
+                raise
+        logging.info("The password history was compacted (%s entries).", len(items))
+        return len(items)
@@ -4,38 +4,49 @@
 # Licensed under the MIT License. See LICENSE file in the project root for details.
 
 
-import os, sys, fcntl, logging
-from pathlib import Path
+import os, sys, json, socket, struct, fcntl, logging, threading
+
+
+FORWARD_TIMEOUT = 2.0  # sekundy oczekiwania na odpowiedź działającej instancji
+MAX_MESSAGE = 1 << 16
+
+
+def default_socket_path():
+    """Gniazdo Unix użytkownika (XDG_RUNTIME_DIR lub /tmp z UID w nazwie)"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "fortipass.sock")
+    return f"/tmp/fortipass-{os.getuid()}.sock"
+
+
+def forward_request(request, socket_path=None, timeout=FORWARD_TIMEOUT):
+    """Przekazuje żądanie działającej instancji; zwraca odpowiedź lub None, gdy nikt nie nasłuchuje"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path or default_socket_path())
+            client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with client.makefile("rb") as reply:
+                line = reply.readline(MAX_MESSAGE)
+    except OSError:
+        return None
+    return json.loads(line) if line else None
+
+
+def _peer_uid(connection):
+    """UID procesu po drugiej stronie gniazda (SO_PEERCRED; None, gdy niedostępne)"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", credentials)[1]
 
 
 class AppLocker:
-    def __init__(self, lock_file="/tmp/fortipass.lock"):
+    def __init__(self, lock_file="/tmp/fortipass.lock", socket_path=None):
         self.lock_file = lock_file
         self.lock = None
-
-        """Ustawienia logowania zdarzeń w programie"""
-        try:
-            # Pobranie katalogu nadrzędnego i utworzenie katalogu "logs
-            parent_dir = Path(__file__).resolve().parent.parent
-            log_dir = parent_dir / "logs"
-            log_dir.mkdir(exist_ok=True)
-            log_file = log_dir / "password_generator.log"
-            self.log_file = log_file
-
-            # Sprawdź, czy plik dziennika istnieje, utwórz go, jeśli nie
-            if not log_file.exists():
-                log_file.touch()
-
-            # Konfiguracja rejestrowania
-            logging.basicConfig(
-                filename=log_file,
-                level=logging.DEBUG,
-                format="%(asctime)s - %(levelname)s - %(message)s"
-            )
-
-        except Exception as e:
-            print(f"Error setting up logging [in_LOCK]: {e}!")
-            sys.exit(1)
+        self.socket_path = socket_path or default_socket_path()
+        self.listener = None
 
     def lock_instance(self):
         # Sprawdź, czy aplikacja jest już uruchomiona
@@ -51,15 +62,75 @@ class AppLocker:
 
 
 
-            logging.info(f"A unique process PID: {pid} has been assigned in the operating system.")
+            logging.info("A unique process PID: %s has been assigned in the operating system.", pid)
         except IOError:
-            # Blokada jest już w posiadaniu innej instancji, odczytaj jej PID
-            with open(self.lock_file, 'r') as f:
-                existing_pid = f.read().strip()
-            logging.error(f"The program is already running. Multiple instances are not allowed!")
+            # Blokada jest już w posiadaniu innej instancji - przekaż jej prośbę o pokazanie okna
+            if forward_request({"command": "raise"}, self.socket_path) is not None:
+                logging.info("The program is already running. The request was forwarded to the running instance.")
+                sys.exit(0)
+            logging.error("The program is already running. Multiple instances are not allowed!")
             sys.exit(1)
 
+    def listen(self, handlers):
+        """Nasłuchuje na gnieździe Unix i obsługuje żądania kolejnych uruchomień (w osobnym wątku)"""
+        # Gniazdo pozostawione przez przerwaną instancję - blokada należy już do nas
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        previous_umask = os.umask(0o177)
+        try:
+            self.listener.bind(self.socket_path)
+        finally:
+            os.umask(previous_umask)
+        self.listener.listen()
+        threading.Thread(target=self._accept_loop, args=(self.listener, handlers), daemon=True).start()
+        logging.info("The instance is listening for requests from subsequent launches.")
+
+    def _accept_loop(self, listener, handlers):
+        while True:
+            try:
+                connection, _ = listener.accept()
+            except OSError:
+                return  # Gniazdo zamknięte przy zwalnianiu blokady
+            with connection:
+                connection.settimeout(FORWARD_TIMEOUT)
+                try:
+                    if _peer_uid(connection) not in (None, os.getuid()):
+                        continue
+                    with connection.makefile("rb") as reader:
+                        request = json.loads(reader.readline(MAX_MESSAGE))
+                    response = self._dispatch(handlers, request)
+                    connection.sendall(json.dumps(response).encode("utf-8") + b"\n")
+                except Exception as e:
+                    # Żaden błąd pojedynczego żądania nie kończy wątku nasłuchu
+                    logging.error("Handling a forwarded request: %s!", e)
+
+    @staticmethod
+    def _dispatch(handlers, request):
+        """Wywołuje obsługę polecenia; błędy zwraca w odpowiedzi zamiast przerywać nasłuch"""
+        command = request.get("command") if isinstance(request, dict) else None
+        handler = handlers.get(command)
+        if handler is None:
+            return {"ok": False, "error": f"Unknown command: {command}."}
+        try:
+            return {"ok": True, **(handler(request) or {})}
+        except Exception as e:
+            logging.error("Handling the forwarded command %s: %s!", command, e)
+            return {"ok": False, "error": str(e) or type(e).__name__}
+
+    def stop_listening(self):
+        """Zamyka gniazdo i usuwa jego plik"""
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+
     def unlock_instance(self):
+        self.stop_listening()
         if self.lock:
             try:
                 # Zwolnij blokadę i zamknij plik
@@ -78,5 +149,5 @@ class AppLocker:
 
             except (OSError, FileNotFoundError) as e:
                 # Obsługuje przypadek, gdy nie udało się usunąć pliku lub plik nadal istnieje
-                logging.error(f"Error during unlocking: {str(e)}!")
+                logging.error("Error during unlocking: %s!", e)
                 sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,325 @@
+# fortipass/logsearch.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, re, heapq, marshal, hashlib, logging
+from array import array
+from bisect import bisect_left
+from paths import temp_path
+from logstore import parse_line, LEVELS, TIMESTAMP_SIZE, SEPARATOR, TAIL_SIZE
+
+
+# Trwały indeks wyszukiwania (plik obok indeksu linii, np. active.search)
+SEARCH_VERSION = 1
+
+# Słowa indeksowane: ciągi liter i cyfr (bez rozróżniania wielkości liter)
+TOKEN = re.compile(r"[^\W_]+")
+
+# Gdy kandydaci z indeksu obejmują więcej niż 1/SCAN_RATIO linii, tekst szukany jest skanem pliku
+SCAN_RATIO = 8
+
+# Początek treści wpisu (poziom i komunikat, bez znacznika czasu)
+MESSAGE_OFFSET = TIMESTAMP_SIZE + len(SEPARATOR)
+
+
+def message_of(line):
+    """Część linii przeszukiwana tekstowo: poziom i komunikat (kontynuacje - cała linia)"""
+    return line[MESSAGE_OFFSET:] if parse_line(line)[0] else line
+
+
+def _union(postings):
+    """Posortowana suma list numerów linii"""
+    if len(postings) == 1:
+        return postings[0]
+    return array("I", sorted(set().union(*postings)))
+
+
+def _membership(postings, probes):
+    """Test przynależności do sumy list: wyszukiwanie binarne dla niewielu zapytań, inaczej zbiór"""
+    if probes * 16 < sum(map(len, postings)):
+        def contains(n):
+            for posting in postings:
+                i = bisect_left(posting, n)
+                if i < len(posting) and posting[i] == n:
+                    return True
+            return False
+        return contains
+    members = set().union(*postings)
+    return members.__contains__
+
+
+class SearchIndex:
+    def __init__(self, lines, path=None):
+        """Indeks odwrócony jednego pliku: poziom -> linie i słowo -> linie; uzupełniany o dopisane linie"""
+        self.lines = lines
+        self.path = path
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.identity = self.lines.identity
+        self.count = 0  # liczba zindeksowanych (zakończonych) linii
+        self.size = 0  # bajt końca ostatniej zindeksowanej linii
+        self.tail = None
+        self.level = None  # poziom ostatniego wpisu (dziedziczą go linie kontynuacji)
+        self.levels = {}
+        self.tokens = {}
+        self._dirty = True
+
+    def _load(self):
+        """Wczytuje zapisany indeks, jeśli odpowiada bieżącej zawartości pliku"""
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                data = marshal.load(f)
+            if data["version"] != SEARCH_VERSION:
+                return
+            identity, count, size, tail = tuple(data["identity"]), data["count"], data["size"], data["tail"]
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            return
+        if identity != self.lines.identity or not self._valid(count, size, tail):
+            return
+        self.identity, self.count, self.size, self.tail, self.level = identity, count, size, tail, data["level"]
+        self.levels = {name: array("I", raw) for name, raw in data["levels"].items()}
+        self.tokens = {token: array("I", raw) for token, raw in data["tokens"].items()}
+        self._dirty = False
+
+    def _tail_digest(self, size):
+        with open(self.lines.path, "rb") as f:
+            n = min(TAIL_SIZE, size)
+            return hashlib.blake2b(os.pread(f.fileno(), n, size - n), digest_size=16).digest()
+
+    def _valid(self, count, size, tail):
+        """Czy zindeksowane linie nadal są początkiem pliku (bez skrócenia i nadpisania)"""
+        starts = self.lines.starts
+        if count >= len(starts) or starts[count] != size:
+            return False
+        try:
+            return self._tail_digest(size) == tail
+        except OSError:
+            return False
+
+    def save(self):
+        """Zapis atomowy (tylko po zmianach)"""
+        if self.path is None or not self._dirty or self.identity is None:
+            return
+        data = {"version": SEARCH_VERSION, "identity": self.identity, "count": self.count, "size": self.size,
+                "tail": self.tail, "level": self.level,
+                "levels": {name: posting.tobytes() for name, posting in self.levels.items()},
+                "tokens": {token: posting.tobytes() for token, posting in self.tokens.items()}}
+        temp = temp_path(self.path)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp, "wb") as f:
+                marshal.dump(data, f)
+            os.replace(temp, self.path)
+            self._dirty = False
+        except OSError as e:
+            logging.warning("The log search index could not be saved: %s.", e)
+
+    def refresh(self):
+        """Indeksuje linie dopisane od ostatniego wywołania (po podmianie lub skróceniu pliku - od nowa)"""
+        lines = self.lines
+        if lines.identity != self.identity or (self.count and not self._valid(self.count, self.size, self.tail)):
+            self._reset()
+        # Niedokończona ostatnia linia czeka na znak nowej linii
+        complete = len(lines) - (1 if lines.partial else 0)
+        if complete <= self.count:
+            return False
+
+        levels, tokens, level = self.levels, self.tokens, self.level
+        findall = TOKEN.findall
+        for number, line in enumerate(lines.lines(self.count, complete), self.count):
+            timestamp, entry_level = parse_line(line)
+            if timestamp is not None:
+                level = entry_level
+                line = line[MESSAGE_OFFSET:]
+            if level:
+                levels.setdefault(level, array("I")).append(number)
+            for token in set(findall(line.lower())):
+                if token.isdigit():
+                    continue  # liczby (długości, identyfikatory) rozdęłyby słownik - sprawdza je skan
+                posting = tokens.get(token)
+                if posting is None:
+                    posting = tokens[token] = array("I")
+                posting.append(number)
+        self.level, self.count = level, complete
+        self.size = lines.starts[complete]
+        self.tail = self._tail_digest(self.size)
+        self._dirty = True
+        return True
+
+    def level_lines(self, levels):
+        """Numery linii wpisów o podanych poziomach (z liniami kontynuacji), rosnąco"""
+        postings = [self.levels[level] for level in levels if level in self.levels]
+        if len(postings) == 1:
+            return postings[0]
+        return array("I", heapq.merge(*postings))
+
+    def _token_postings(self, token, prefix_open, suffix_open):
+        """Listy linii słów pasujących do fragmentu zapytania (na brzegach zapytania słowo może być ucięte)"""
+        if not prefix_open and not suffix_open:
+            words = [token] if token in self.tokens else []
+        elif prefix_open and suffix_open:
+            words = [word for word in self.tokens if token in word]
+        elif prefix_open:
+            words = [word for word in self.tokens if word.endswith(token)]
+        else:
+            words = [word for word in self.tokens if word.startswith(token)]
+        return [self.tokens[word] for word in words]
+
+    def candidates(self, text, within=None):
+        """Linie (z within, jeśli podano) zawierające wszystkie słowa zapytania;
+        None - zapytanie bez słów, trzeba sprawdzić wszystkie"""
+        query = text.lower()
+        matches = [m for m in TOKEN.finditer(query) if not m.group().isdigit()]
+        if not matches:
+            return within
+        groups = [self._token_postings(m.group(), m.start() == 0, m.end() == len(query)) for m in matches]
+        groups.sort(key=lambda postings: sum(map(len, postings)))
+        if within is None:
+            within = _union(groups.pop(0))
+        tests = [_membership(postings, len(within)) for postings in groups]
+        return array("I", (n for n in within if all(contains(n) for contains in tests)))
+
+    def search(self, levels=None, text=None):
+        """Linie spełniające filtry; tekst: podciąg poziomu i komunikatu (bez rozróżniania wielkości liter)"""
+        self.refresh()
+        if not levels and not text:
+            return array("I", range(self.count))
+        result = self.level_lines(levels) if levels else None
+        if not text:
+            return result
+        query = text.lower()
+        candidates = self.candidates(text, result)
+        if (candidates is None or len(candidates) > self.count // SCAN_RATIO) and query.isascii():
+            # Zapytanie bez słów lub pasujące do dużej części linii - szybszy jest skan pliku
+            return self._scan(query, result)
+        return self._verify(query, range(self.count) if candidates is None else candidates)
+
+    def _verify(self, query, candidates):
+        """Kandydaci z indeksu, których linie rzeczywiście zawierają zapytanie"""
+        candidates = list(candidates)
+        found = self.lines.select(candidates)
+        return array("I", (n for n, line in zip(candidates, found) if query in message_of(line).lower()))
+
+    def _scan(self, query, allowed=None):
+        """Skan całego pliku; dopasowania na początku linii (znacznik czasu) sprawdzane w treści wpisu"""
+        allowed = set(allowed) if allowed is not None else None
+        found = array("I")
+        for number, column in self.lines.matching(query.encode()):
+            if number >= self.count:
+                break
+            if allowed is not None and number not in allowed:
+                continue
+            if column < MESSAGE_OFFSET and not self._verify(query, [number]):
+                continue
+            found.append(number)
+        return found
+
+
+def _entry_timestamp(lines, number):
+    """Znacznik czasu wpisu obejmującego linię (kontynuacje - wpis poprzedzający)"""
+    while number >= 0:
+        line = lines.lines(number, number + 1)
+        timestamp = parse_line(line[0])[0] if line else None
+        if timestamp is not None:
+            return timestamp
+        number -= 1
+    return ""
+
+
+def time_bounds(lines, count, since=None, until=None):
+    """Zakres [lo, hi) linii z wpisami od since do until (wyszukiwanie binarne - czas w logu rośnie)"""
+    def first(predicate):
+        lo, hi = 0, count
+        while lo < hi:
+            middle = (lo + hi) // 2
+            if predicate(_entry_timestamp(lines, middle)):
+                hi = middle
+            else:
+                lo = middle + 1
+        return lo
+
+    lo = first(lambda timestamp: timestamp >= since) if since else 0
+    # Koniec zakresu porównywany z dokładnością podanej wartości (np. cały dzień dla '2024-11-05')
+    hi = first(lambda timestamp: timestamp[:len(until)] > until) if until else count
+    return lo, max(lo, hi)
+
+
+class LogSearch:
+    def __init__(self, document):
+        """Wyszukiwanie w całym logu (segmenty i aktywny plik); indeksy w katalogu pamięci podręcznej"""
+        self.document = document
+        self.indexes = {}
+
+    def _index(self, key, lines):
+        index = self.indexes.get(key)
+        if index is None or index.lines is not lines:
+            path = lines.index_path.with_suffix(".search") if lines.index_path else None
+            index = self.indexes[key] = SearchIndex(lines, path)
+        return index
+
+    def search(self, levels=None, text=None, since=None, until=None, progress=None):
+        """Numery linii całego dokumentu (rosnąco) spełniających filtry poziomu, tekstu i czasu;
+        progress(zrobione, wszystkie) - po każdym przeszukanym pliku"""
+        document = self.document
+        levels = [level.upper() for level in levels or ()]
+        for level in levels:
+            if level not in LEVELS:
+                raise ValueError(f"Unknown logging level: {level}.")
+        current = {segment["number"] for segment in document.segments}
+        for key in [key for key in self.indexes if key != "active" and key not in current]:
+            del self.indexes[key]
+
+        parts = []
+        for position, segment in enumerate(document.segments):
+            # Segmenty spoza zakresu czasu i bez szukanych poziomów pomijane bez rozpakowania
+            if since and segment["end"] and segment["end"] < since:
+                continue
+            if until and segment["start"] and segment["start"][:len(until)] > until:
+                continue
+            if levels and not any(segment["levels"].get(level) for level in levels):
+                continue
+            parts.append((segment["number"], position))
+        parts.append(("active", None))
+
+        result = array("I")
+        for done, (key, position) in enumerate(parts):
+            if progress is not None:
+                progress(done, len(parts))
+            lines = document.active if position is None else document.segment_index(position)
+            index = self._index(key, lines)
+            found = index.search(levels, text)
+            if since or until:
+                lo, hi = time_bounds(lines, index.count, since, until)
+                found = found[bisect_left(found, lo):bisect_left(found, hi)]
+            # Podstawa liczona po rozpakowaniu (liczba linii segmentu mogła zostać poprawiona)
+            base = document.segment_lines if position is None else document.bases[position]
+            result.extend(n + base for n in found)
+        return result
+
+    def save(self):
+        for index in self.indexes.values():
+            index.save()
+
+    def close(self):
+        self.save()
+        self.indexes.clear()
+
+
+class FilteredLines:
+    def __init__(self, document, numbers):
+        """Wyniki wyszukiwania jako ciąg linii (interfejs len/lines jak LogDocument)"""
+        self.document = document
+        self.numbers = numbers
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def lines(self, start, stop):
+        document = self.document
+        return [line for number in self.numbers[start:stop] for line in document.lines(number, number + 1)]
@@ -0,0 +1,179 @@
+# fortipass/logsetup.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, sys, queue, atexit, logging, sysconfig, threading
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from logstore import RotatingLogHandler, MAX_SEGMENT_BYTES, KEEP_SEGMENTS, KEEP_DAYS
+
+
+LOG_DIR = Path(__file__).resolve().parent.parent / "logs"
+LOG_FILE = LOG_DIR / "password_generator.log"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Opcjonalny zapis strukturalny (JSONL) obok logu tekstowego, np. FORTIPASS_LOG_JSONL=1
+STRUCTURED_ENV = "FORTIPASS_LOG_JSONL"
+
+# Poziom rejestrowania (np. FORTIPASS_LOG_LEVEL=DEBUG przy diagnozowaniu)
+LOG_LEVEL_ENV = "FORTIPASS_LOG_LEVEL"
+DEFAULT_LEVEL = logging.INFO
+
+# Rotacja i przechowywanie segmentów (nadpisywane zmiennymi środowiskowymi)
+MAX_BYTES_ENV = "FORTIPASS_LOG_MAX_BYTES"
+KEEP_SEGMENTS_ENV = "FORTIPASS_LOG_KEEP_SEGMENTS"
+KEEP_DAYS_ENV = "FORTIPASS_LOG_KEEP_DAYS"
+
+# Maksymalna liczba wpisów zapisanych bez opróżnienia bufora pliku
+FLUSH_EVERY = 64
+
+_listener = None
+_queue_handler = None
+_log_file = None
+_setup_lock = threading.Lock()
+
+
+class BatchingFileHandler(RotatingLogHandler):
+    def __init__(self, filename, flush_every=FLUSH_EVERY, **rotation):
+        """Zapis do pliku bez opróżniania bufora po każdym wpisie (opróżnia go wątek zapisu)"""
+        super().__init__(filename, **rotation)
+        self.flush_every = flush_every
+        self.pending = 0
+
+    def emit(self, record):
+        try:
+            self.write(self.format(record) + self.terminator)
+            self.pending += 1
+            # Błędy trafiają na dysk od razu - program może zaraz zakończyć działanie
+            if self.pending >= self.flush_every or record.levelno >= logging.ERROR:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self.pending = 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    def prepare(self, record):
+        """Rekord trafia do kolejki bez formatowania - komunikat składa dopiero wątek zapisu"""
+        return record
+
+
+class BatchingQueueListener(QueueListener):
+    def dequeue(self, block):
+        """Pobiera rekord; gdy kolejka jest pusta, najpierw opróżnia bufory (zapis partiami)"""
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            if not block:
+                raise
+        for handler in self.handlers:
+            handler.flush()
+        return self.queue.get()
+
+    def stop(self):
+        super().stop()
+        for handler in self.handlers:
+            handler.flush()
+
+
+def event(name, **fields):
+    """Argument extra wpisu: typ zdarzenia i pola zapisywane w logu strukturalnym (tekstowy ich nie zawiera)"""
+    return {"event": name, "fields": fields}
+
+
+def structured_file(log_file):
+    """Plik logu strukturalnego obok logu tekstowego (password_generator.jsonl)"""
+    return Path(log_file).with_suffix(".jsonl")
+
+
+def structured_enabled():
+    return os.environ.get(STRUCTURED_ENV, "").lower() in ("1", "true", "yes", "on")
+
+
+def resolve_level(level=None):
+    """Poziom z argumentu, zmiennej FORTIPASS_LOG_LEVEL lub domyślny (INFO)"""
+    level = level or os.environ.get(LOG_LEVEL_ENV) or DEFAULT_LEVEL
+    if isinstance(level, str):
+        value = logging.getLevelName(level.upper())
+        if not isinstance(value, int):
+            raise ValueError(f"Unknown logging level: {level}.")
+        return value
+    return level
+
+
+def rotation_settings():
+    """Limity rotacji i przechowywania ze zmiennych środowiskowych lub domyślne"""
+    settings = {}
+    for key, env, default in (("max_bytes", MAX_BYTES_ENV, MAX_SEGMENT_BYTES),
+                              ("keep_segments", KEEP_SEGMENTS_ENV, KEEP_SEGMENTS),
+                              ("keep_days", KEEP_DAYS_ENV, KEEP_DAYS)):
+        try:
+            settings[key] = int(os.environ.get(env, default))
+        except ValueError:
+            raise ValueError(f"{env} must be an integer.") from None
+    return settings
+
+
+def create_pipeline(handler, level=None, structured=None):
+    """Para (uchwyt kolejki, wątek zapisu) przekazująca rekordy do handler (i structured - JSONL) w tle"""
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handlers = [handler]
+    if structured is not None:
+        from logstats import JsonLinesFormatter
+        structured.setFormatter(JsonLinesFormatter())
+        handlers.append(structured)
+    records = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(records)
+    queue_handler.setLevel(resolve_level(level))
+    return queue_handler, BatchingQueueListener(records, *handlers, respect_handler_level=True)
+
+
+def _check_stdlib_logging():
+    """Ostrzega, gdy moduł logging pochodzi spoza biblioteki standardowej (np. pakiet 'logging' z PyPI)"""
+    stdlib = Path(sysconfig.get_paths()["stdlib"]).resolve()
+    if stdlib not in Path(logging.__file__).resolve().parents:
+        print(f"Warning: the logging module is loaded from {logging.__file__} instead of the standard library. "
+              f"Uninstall the 'logging' package from the environment.", file=sys.stderr)
+
+
+def setup_logging(level=None, log_file=LOG_FILE, structured=None):
+    """Jedyna konfiguracja rejestrowania programu: kolejka + wątek zapisu; zwraca ścieżkę pliku.
+    structured - dodatkowy log JSONL (domyślnie według FORTIPASS_LOG_JSONL)"""
+    global _listener, _queue_handler, _log_file
+    with _setup_lock:
+        if _listener is not None:
+            return _log_file
+        _check_stdlib_logging()
+        log_file = Path(log_file)
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+
+        rotation = rotation_settings()
+        sink = None
+        if structured_enabled() if structured is None else structured:
+            from logstats import parse_record
+            sink = BatchingFileHandler(structured_file(log_file), parse=parse_record, **rotation)
+        queue_handler, listener = create_pipeline(BatchingFileHandler(log_file, **rotation), level, sink)
+        root = logging.getLogger()
+        root.addHandler(queue_handler)
+        root.setLevel(queue_handler.level)
+        listener.start()
+        atexit.register(stop_logging)
+        _listener, _queue_handler, _log_file = listener, queue_handler, log_file
+        return log_file
+
+
+def stop_logging():
+    """Zapisuje zaległe wpisy i zatrzymuje wątek zapisu"""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is not None:
+            logging.getLogger().removeHandler(_queue_handler)
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = _queue_handler = None
@@ -0,0 +1,234 @@
+# fortipass/logstats.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, gzip, json, hashlib, logging
+from collections import Counter
+from pathlib import Path
+from logstore import LogStore
+from paths import default_cache_dir, temp_path
+
+
+# Wpis strukturalny: {"time": "2024-11-05 12:00:00,123", "level": "INFO", "event": "generate", "message": ...,
+#                     "length": 16, "composition": [...], "strength": "strong", "duration_ms": 0.4}
+STATS_VERSION = 1
+
+# Górne granice przedziałów histogramu czasu trwania (ms); ostatni przedział - powyżej
+DURATION_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+READ_BLOCK = 1 << 20
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        """Jeden obiekt JSON w linii: czas, poziom, zdarzenie, komunikat i pola zdarzenia"""
+        entry = {"time": self.formatTime(record), "level": record.levelname,
+                 "event": getattr(record, "event", None), "message": record.getMessage()}
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def parse_record(line):
+    """Para (znacznik czasu, poziom) z linii JSONL - odpowiednik parse_line dla indeksu segmentów"""
+    try:
+        entry = json.loads(line)
+        return entry["time"], entry["level"]
+    except (ValueError, KeyError, TypeError):
+        return None, None
+
+
+def _bucket(duration_ms):
+    for bound in DURATION_BUCKETS_MS:
+        if duration_ms <= bound:
+            return f"<={bound}"
+    return f">{DURATION_BUCKETS_MS[-1]}"
+
+
+class Summary:
+    def __init__(self):
+        """Liczniki i histogramy zbioru wpisów (pamięć zależna od liczby różnych wartości, nie wpisów)"""
+        self.records = 0
+        self.invalid = 0
+        self.start = self.end = None
+        self.events = Counter()
+        self.levels = Counter()
+        self.errors = Counter()  # wpisy ERROR i CRITICAL według zdarzenia
+        self.lengths = Counter()
+        self.strengths = Counter()
+        self.compositions = Counter()
+        self.durations = Counter()
+        self.duration_total = 0.0
+        self.duration_max = 0.0
+
+    def add(self, entry):
+        self.records += 1
+        timestamp = entry.get("time")
+        if timestamp:
+            self.start = min(self.start, timestamp) if self.start else timestamp
+            self.end = max(self.end, timestamp) if self.end else timestamp
+        event = entry.get("event") or "message"
+        level = entry.get("level") or "UNKNOWN"
+        self.events[event] += 1
+        self.levels[level] += 1
+        if level in ("ERROR", "CRITICAL"):
+            self.errors[event] += 1
+        if "length" in entry:
+            self.lengths[str(entry["length"])] += 1
+        if "strength" in entry:
+            self.strengths[entry["strength"]] += 1
+        composition = entry.get("composition")
+        if composition:
+            self.compositions[composition if isinstance(composition, str) else ", ".join(composition)] += 1
+        duration = entry.get("duration_ms")
+        if isinstance(duration, (int, float)):
+            self.durations[_bucket(duration)] += 1
+            self.duration_total += duration
+            self.duration_max = max(self.duration_max, duration)
+
+    def feed(self, lines):
+        """Jeden przebieg po liniach JSONL (uszkodzone linie tylko zliczane)"""
+        add, loads = self.add, json.loads
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                entry = loads(line)
+            except ValueError:
+                self.invalid += 1
+                continue
+            if isinstance(entry, dict):
+                add(entry)
+            else:
+                self.invalid += 1
+        return self
+
+    def merge(self, other):
+        """Dołącza podsumowanie innego zbioru (np. kolejnego segmentu)"""
+        self.records += other.records
+        self.invalid += other.invalid
+        for value in (other.start, other.end):
+            if value:
+                self.start = min(self.start, value) if self.start else value
+                self.end = max(self.end, value) if self.end else value
+        for name in ("events", "levels", "errors", "lengths", "strengths", "compositions", "durations"):
+            getattr(self, name).update(getattr(other, name))
+        self.duration_total += other.duration_total
+        self.duration_max = max(self.duration_max, other.duration_max)
+        return self
+
+    def error_rates(self):
+        """Udział wpisów z błędem wśród wpisów każdego zdarzenia"""
+        return {event: self.errors[event] / count for event, count in self.events.items() if self.errors[event]}
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in ("records", "invalid", "start", "end",
+                                                       "duration_total", "duration_max")}
+        for name in ("events", "levels", "errors", "lengths", "strengths", "compositions", "durations"):
+            data[name] = dict(getattr(self, name))
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls()
+        for name, value in data.items():
+            setattr(summary, name, Counter(value) if isinstance(value, dict) else value)
+        return summary
+
+    def report(self):
+        """Podsumowanie do wyświetlenia lub zapisu JSON"""
+        report = self.to_dict()
+        report["error_rates"] = self.error_rates()
+        count = sum(self.durations.values())
+        report["duration_mean"] = self.duration_total / count if count else None
+        return report
+
+
+class LogStats:
+    def __init__(self, log_file, cache_dir=None):
+        """Podsumowanie logu JSONL: segmenty liczone raz, aktywny plik od ostatnio przeczytanej pozycji"""
+        self.store = LogStore(log_file, parse=parse_record)
+        key = hashlib.blake2b(str(self.store.log_file.resolve()).encode(), digest_size=8).hexdigest()
+        self.cache_dir = Path(cache_dir or default_cache_dir()) / f"stats-{key}"
+
+    def _load(self, name):
+        try:
+            with open(self.cache_dir / name, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data if data.get("version") == STATS_VERSION else None
+
+    def _save(self, name, data):
+        """Zapis atomowy wpisu pamięci podręcznej (błąd zapisu nie przerywa raportu)"""
+        path = self.cache_dir / name
+        temp = temp_path(path)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(temp, "w", encoding="utf-8") as f:
+                json.dump(dict(data, version=STATS_VERSION), f)
+            os.replace(temp, path)
+        except OSError as e:
+            temp.unlink(missing_ok=True)
+            logging.warning("The log statistics cache could not be saved: %s.", e)
+
+    def segment_summary(self, segment):
+        """Podsumowanie skompresowanego segmentu (liczone przy pierwszym raporcie)"""
+        name = f"{segment['number']:06d}.json"
+        cached = self._load(name)
+        if cached and cached["bytes"] == segment["bytes"]:
+            return Summary.from_dict(cached["summary"])
+        with gzip.open(self.store.directory / segment["name"], "rt", encoding="utf-8", errors="replace") as f:
+            summary = Summary().feed(f)
+        self._save(name, {"bytes": segment["bytes"], "summary": summary.to_dict()})
+        return summary
+
+    def active_summary(self):
+        """Podsumowanie aktywnego pliku; czytane są tylko pełne linie dopisane od poprzedniego raportu"""
+        cached = self._load("active.json")
+        try:
+            f = open(self.store.log_file, "rb")
+        except FileNotFoundError:
+            return Summary()
+        with f:
+            st = os.fstat(f.fileno())
+            identity = [st.st_dev, st.st_ino]
+            if cached and cached["identity"] == identity and cached["offset"] <= st.st_size:
+                summary, offset = Summary.from_dict(cached["summary"]), cached["offset"]
+            else:
+                summary, offset = Summary(), 0
+            start = offset
+            f.seek(offset)
+            rest = b""
+            while True:
+                block = f.read(READ_BLOCK)
+                if not block:
+                    break
+                block = rest + block
+                end = block.rfind(b"\n") + 1
+                summary.feed(block[:end].decode("utf-8", "replace").splitlines())
+                offset += end
+                rest = block[end:]
+        if offset != start or not cached:
+            self._save("active.json", {"identity": identity, "offset": offset, "summary": summary.to_dict()})
+        return summary
+
+    def summary(self):
+        """Podsumowanie całego logu; usuwa z pamięci podręcznej segmenty usunięte przez retencję"""
+        segments = self.store.load_index()
+        total = Summary()
+        for segment in segments:
+            try:
+                total.merge(self.segment_summary(segment))
+            except FileNotFoundError:
+                continue  # segment usunięty przez retencję w trakcie raportu
+        total.merge(self.active_summary())
+        current = {f"{segment['number']:06d}.json" for segment in segments}
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob("[0-9]*.json"):
+                if path.name not in current:
+                    path.unlink(missing_ok=True)
+        return total
@@ -0,0 +1,526 @@
+# fortipass/logstore.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, re, gzip, json, mmap, time, shutil, struct, hashlib, logging
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from pathlib import Path
+from paths import default_cache_dir, temp_path
+
+
+MAX_SEGMENT_BYTES = 1 << 20  # rozmiar aktywnego pliku, po którym następuje rotacja
+KEEP_SEGMENTS = 50  # liczba przechowywanych skompresowanych segmentów
+KEEP_DAYS = 0  # maksymalny wiek segmentu w dniach (0: bez limitu)
+
+INDEX_VERSION = 1
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+# Trwały indeks początków linii: magic, urządzenie, i-węzeł, zindeksowany rozmiar, skrót końcówki
+LINES_MAGIC = b"FPLINES1"
+LINES_HEADER = struct.Struct("<8sQQQ16s")
+TAIL_SIZE = 64
+SCAN_BLOCK = 4 << 20
+
+# Wpis: "2024-11-05 12:00:00,123 - INFO - komunikat"
+TIMESTAMP_SIZE = 23
+SEPARATOR = " - "
+
+
+def parse_line(line):
+    """Para (znacznik czasu, poziom) z linii logu; (None, None) dla kontynuacji (np. traceback)"""
+    timestamp, sep, rest = line.partition(SEPARATOR)
+    if not sep or len(timestamp) != TIMESTAMP_SIZE:
+        return None, None
+    level = rest.partition(SEPARATOR)[0]
+    return timestamp, level if level in LEVELS else None
+
+
+def summarize(lines, parse=parse_line):
+    """Zakres czasu, liczba linii i liczniki poziomów dla zbioru linii"""
+    start = end = None
+    levels = Counter()
+    count = 0
+    for line in lines:
+        count += 1
+        timestamp, level = parse(line)
+        if timestamp is None:
+            continue
+        start = start or timestamp
+        end = timestamp
+        if level:
+            levels[level] += 1
+    return {"start": start, "end": end, "lines": count, "levels": dict(levels)}
+
+
+class LogStore:
+    def __init__(self, log_file, keep_segments=KEEP_SEGMENTS, keep_days=KEEP_DAYS, parse=parse_line):
+        """Aktywny plik logu i skompresowane segmenty z indeksem (zakresy czasu, liczniki poziomów);
+        parse - odczyt (czas, poziom) z linii formatu pliku"""
+        self.log_file = Path(log_file)
+        self.parse = parse
+        self.directory = self.log_file.parent
+        self.index_file = self.directory / f"{self.log_file.name}.index.json"
+        self.keep_segments = keep_segments
+        self.keep_days = keep_days
+
+    def segment_path(self, number):
+        return self.directory / f"{self.log_file.name}.{number:06d}.gz"
+
+    def load_index(self):
+        """Wpisy indeksu od najstarszego segmentu (pusta lista, gdy indeksu brak lub jest uszkodzony)"""
+        try:
+            with open(self.index_file, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if index.get("version") != INDEX_VERSION:
+            return []
+        return index["segments"]
+
+    def save_index(self, segments):
+        """Zapis atomowy (plik tymczasowy + os.replace)"""
+        temp = temp_path(self.index_file)
+        try:
+            with open(temp, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "segments": segments}, f, indent=1)
+            os.replace(temp, self.index_file)
+        except BaseException:
+            temp.unlink(missing_ok=True)
+            raise
+
+    def _next_number(self, segments):
+        numbers = [segment["number"] for segment in segments]
+        numbers += [int(match.group(1)) for match in map(self._pending_pattern().fullmatch,
+                                                         os.listdir(self.directory)) if match]
+        return max(numbers, default=0) + 1
+
+    def _pending_pattern(self):
+        return re.compile(re.escape(self.log_file.name) + r"\.(\d{6})")
+
+    def detach(self):
+        """Zmienia nazwę aktywnego pliku na segment do kompresji; zwraca jego ścieżkę"""
+        segments = self.load_index()
+        pending = self.directory / f"{self.log_file.name}.{self._next_number(segments):06d}"
+        os.replace(self.log_file, pending)
+        return pending
+
+    def seal(self, pending):
+        """Kompresuje odłączony segment, dopisuje go do indeksu i stosuje limity przechowywania"""
+        number = int(pending.name.rsplit(".", 1)[1])
+        with open(pending, encoding="utf-8", errors="replace") as f:
+            entry = summarize(f, self.parse)
+        entry.update(number=number, name=self.segment_path(number).name, raw_bytes=pending.stat().st_size)
+
+        target = self.segment_path(number)
+        temp = temp_path(target)
+        try:
+            with open(pending, "rb") as source, gzip.open(temp, "wb", compresslevel=6) as out:
+                shutil.copyfileobj(source, out, 1 << 20)
+            os.replace(temp, target)
+        except BaseException:
+            temp.unlink(missing_ok=True)
+            raise
+        entry["bytes"] = target.stat().st_size
+
+        segments = [s for s in self.load_index() if s["number"] != number] + [entry]
+        segments.sort(key=lambda s: s["number"])
+        segments = self.apply_retention(segments)
+        self.save_index(segments)
+        pending.unlink()
+        return entry
+
+    def recover(self):
+        """Dokańcza rotacje przerwane przez zamknięcie programu (segmenty nieskompresowane)"""
+        pattern = self._pending_pattern()
+        for name in sorted(os.listdir(self.directory)):
+            if pattern.fullmatch(name):
+                self.seal(self.directory / name)
+
+    def apply_retention(self, segments):
+        """Usuwa najstarsze segmenty ponad limit liczby i wieku; zwraca pozostałe wpisy"""
+        expired = []
+        if self.keep_segments and len(segments) > self.keep_segments:
+            expired, segments = segments[:-self.keep_segments], segments[-self.keep_segments:]
+        if self.keep_days:
+            cutoff = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() - self.keep_days * 86400))
+            old = [s for s in segments if s["end"] and s["end"] < cutoff]
+            expired += old
+            segments = [s for s in segments if s not in old]
+        for segment in expired:
+            try:
+                (self.directory / segment["name"]).unlink()
+            except FileNotFoundError:
+                pass
+        return segments
+
+    def segments(self, start=None, end=None, levels=None):
+        """Wpisy indeksu segmentów, które mogą zawierać linie z zakresu czasu i poziomów"""
+        selected = []
+        for segment in self.load_index():
+            if start and segment["end"] and segment["end"] < start:
+                continue
+            if end and segment["start"] and segment["start"] > end:
+                continue
+            if levels and not any(segment["levels"].get(level) for level in levels):
+                continue
+            selected.append(segment)
+        return selected
+
+    def open_segment(self, segment):
+        return gzip.open(self.directory / segment["name"], "rt", encoding="utf-8", errors="replace")
+
+    def iter_lines(self, start=None, end=None, levels=None):
+        """Linie ze wszystkich segmentów i aktywnego pliku w kolejności czasu (z filtrami)"""
+        sources = [lambda segment=segment: self.open_segment(segment)
+                   for segment in self.segments(start, end, levels)]
+        if self.log_file.exists():
+            sources.append(lambda: open(self.log_file, encoding="utf-8", errors="replace"))
+        filtered = start or end or levels
+        for open_source in sources:
+            try:
+                f = open_source()
+            except FileNotFoundError:
+                continue  # segment usunięty przez retencję w trakcie odczytu
+            with f:
+                if not filtered:
+                    yield from f
+                    continue
+                keep = True
+                for line in f:
+                    timestamp, level = self.parse(line)
+                    if timestamp is not None:
+                        # Linie kontynuacji dziedziczą wynik filtra od poprzedzającego wpisu
+                        keep = ((not start or timestamp >= start) and (not end or timestamp <= end)
+                                and (not levels or level in levels))
+                    if keep:
+                        yield line
+
+
+class RotatingLogHandler(logging.FileHandler):
+    def __init__(self, filename, max_bytes=MAX_SEGMENT_BYTES, keep_segments=KEEP_SEGMENTS,
+                 keep_days=KEEP_DAYS, encoding="utf-8", parse=parse_line):
+        """Zapis do pliku z rotacją po max_bytes; zamknięte segmenty kompresowane (wątek zapisu)"""
+        super().__init__(filename, encoding=encoding)
+        self.max_bytes = max_bytes
+        self.store = LogStore(filename, keep_segments, keep_days, parse)
+        self.size = os.path.getsize(self.baseFilename)
+        self.store.recover()
+
+    def write(self, text):
+        """Zapisuje sformatowany wpis i rotuje plik po przekroczeniu rozmiaru"""
+        self.stream.write(text)
+        # Rozmiar w bajtach pliku, nie w znakach (polskie litery w UTF-8 zajmują po dwa bajty)
+        if text.isascii():
+            self.size += len(text)
+        else:
+            self.size += len(text.encode(self.encoding or "utf-8", self.errors or "strict"))
+        if self.max_bytes and self.size >= self.max_bytes:
+            self.rotate()
+
+    def emit(self, record):
+        try:
+            self.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+    def rotate(self):
+        """Zamyka aktywny plik, otwiera nowy i kompresuje poprzedni jako segment"""
+        self.stream.close()
+        pending = self.store.detach()
+        self.stream = self._open()
+        self.size = 0
+        self.store.seal(pending)
+
+
+def _tail_digest(data, size):
+    """Skrót ostatnich bajtów zindeksowanej części (wykrywa nadpisanie pliku)"""
+    return hashlib.blake2b(data[max(0, size - TAIL_SIZE):size], digest_size=16).digest()
+
+
+class LineIndex:
+    def __init__(self, path, index_path=None):
+        """Początki linii pliku mapowanego w pamięci; indeks utrwalany i uzupełniany o dopisane bajty"""
+        self.path = Path(path)
+        self.index_path = Path(index_path) if index_path else None
+        self.starts = array("Q", [0])
+        self.size = 0
+        self.tail = _tail_digest(b"", 0)
+        self.identity = None
+        self._file = None
+        self._map = b""
+        self._dirty = False
+        self._load()
+        self.refresh()
+
+    def _load(self):
+        """Wczytuje zapisany indeks, jeśli dotyczy tego samego pliku i nie został on skrócony"""
+        if self.index_path is None:
+            return
+        try:
+            data = self.index_path.read_bytes()
+            magic, dev, ino, size, tail = LINES_HEADER.unpack_from(data)
+            st = os.stat(self.path)
+        except (OSError, struct.error):
+            return
+        if magic != LINES_MAGIC or (dev, ino) != (st.st_dev, st.st_ino) or st.st_size < size:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(max(0, size - TAIL_SIZE))
+            if hashlib.blake2b(f.read(min(size, TAIL_SIZE)), digest_size=16).digest() != tail:
+                return
+        starts = array("Q")
+        starts.frombytes(data[LINES_HEADER.size:])
+        if starts and starts[0] == 0:
+            self.starts, self.size, self.tail, self.identity = starts, size, tail, (dev, ino)
+
+    def save(self):
+        """Zapis atomowy indeksu (tylko po zmianach)"""
+        if self.index_path is None or not self._dirty or self.identity is None:
+            return
+        header = LINES_HEADER.pack(LINES_MAGIC, *self.identity, self.size, self.tail)
+        temp = temp_path(self.index_path)
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp, "wb") as f:
+                f.write(header)
+                f.write(self.starts.tobytes())
+            os.replace(temp, self.index_path)
+            self._dirty = False
+        except OSError as e:
+            logging.warning("The log line index could not be saved: %s.", e)
+
+    def close(self):
+        self.save()
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        if self._file:
+            self._file.close()
+        self._map, self._file = b"", None
+
+    def _reset(self):
+        self.starts = array("Q", [0])
+        self.size = 0
+        self.tail = _tail_digest(b"", 0)
+        self._dirty = True
+
+    def refresh(self):
+        """Uwzględnia zmiany pliku: dopisane bajty (skanowane tylko one), skrócenie lub podmianę pliku.
+        Zwraca 'grown', 'reset' albo None (bez zmian)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+        identity = (st.st_dev, st.st_ino) if st else None
+        size = st.st_size if st else 0
+
+        status = None
+        if identity != self.identity or size < self.size or self._rewritten(size):
+            # Rotacja (nowy plik), skrócenie lub nadpisanie - indeks budowany od początku
+            self.close()
+            self._reset()
+            self.identity = identity
+            status = "reset"
+        if identity and self._file is None:
+            self._file = open(self.path, "rb")
+        if size == len(self._map) == self.size:
+            return status
+
+        # Nowe mapowanie obejmujące dopisane bajty; skanowane są tylko one
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ) if size else b""
+        if size == self.size:
+            return status
+        starts, data = self.starts, self._map
+        for block in range(self.size, size, SCAN_BLOCK):
+            chunk = data[block:min(block + SCAN_BLOCK, size)]
+            pos = chunk.find(b"\n")
+            while pos >= 0:
+                starts.append(block + pos + 1)
+                pos = chunk.find(b"\n", pos + 1)
+        self.size = size
+        self.tail = _tail_digest(data, size)
+        self._dirty = True
+        return status or "grown"
+
+    def _rewritten(self, size):
+        """Czy zindeksowana końcówka pliku się zmieniła (skrócenie i ponowny zapis między odczytami)"""
+        if not self.size or size <= self.size or self._file is None:
+            return False
+        n = min(TAIL_SIZE, self.size)
+        data = os.pread(self._file.fileno(), n, self.size - n)
+        return hashlib.blake2b(data, digest_size=16).digest() != self.tail
+
+    @property
+    def partial(self):
+        """Czy ostatnia linia nie jest jeszcze zakończona znakiem nowej linii (zapis w toku)"""
+        return self.starts[-1] != self.size
+
+    def __len__(self):
+        """Liczba linii (pusta końcówka po ostatnim znaku nowej linii się nie liczy)"""
+        return len(self.starts) - 1 if self.starts[-1] == self.size else len(self.starts)
+
+    def lines(self, start, stop):
+        """Linie [start, stop) zakończone znakiem nowej linii"""
+        stop = min(stop, len(self))
+        if start >= stop:
+            return []
+        begin = self.starts[start]
+        end = self._end(stop - 1)
+        if not self._readable(end):
+            self.refresh()
+            return self.lines(start, stop)
+        text = self._map[begin:end].decode("utf-8", "replace")
+        if not text.endswith("\n"):
+            text += "\n"
+        return text.splitlines(keepends=True)
+
+    def select(self, numbers):
+        """Linie o podanych (rosnących) numerach - jedno sprawdzenie pliku dla całej listy"""
+        numbers = [n for n in numbers if n < len(self)]
+        if not numbers:
+            return []
+        if not self._readable(self._end(numbers[-1])):
+            self.refresh()
+            return self.select(numbers)
+        data, starts, end = self._map, self.starts, self._end
+        result = []
+        for n in numbers:
+            line = data[starts[n]:end(n)].decode("utf-8", "replace")
+            result.append(line if line.endswith("\n") else line + "\n")
+        return result
+
+    def matching(self, needle):
+        """Pary (numer linii, kolumna) pierwszego wystąpienia needle (bajty, małe litery ASCII) w liniach"""
+        if not self._readable(self.size):
+            self.refresh()
+        # Skan blokami zamienianymi na małe litery (bez kopii całego pliku); blok zachodzi na następny o
+        # len(needle) - 1 bajtów, więc każde wystąpienie zaczynające się w bloku mieści się w nim w całości
+        data, starts, size = self._map, self.starts, self.size
+        result = []
+        offset = 0
+        while offset < size:
+            block = data[offset:min(offset + SCAN_BLOCK + len(needle) - 1, size)].lower()
+            following = offset + SCAN_BLOCK
+            index = block.find(needle)
+            while index >= 0:
+                pos = offset + index
+                number = bisect_right(starts, pos) - 1
+                result.append((number, pos - starts[number]))
+                if number + 1 >= len(starts):
+                    return result
+                if starts[number + 1] >= following:
+                    following = starts[number + 1]  # następna linia zaczyna się za blokiem
+                    break
+                index = block.find(needle, starts[number + 1] - offset)
+            offset = following
+        return result
+
+    def _end(self, number):
+        """Bajt końca linii (łącznie ze znakiem nowej linii)"""
+        return self.starts[number + 1] if number + 1 < len(self.starts) else self.size
+
+    def _readable(self, end):
+        """Czy mapowanie można czytać do bajtu end - odczyt poza końcem skróconego pliku przerwałby program"""
+        return self._file is not None and os.fstat(self._file.fileno()).st_size >= end
+
+
+class LogDocument:
+    def __init__(self, log_file, cache_dir=None):
+        """Jeden ciąg linii ze skompresowanych segmentów i aktywnego pliku (dostęp po numerze linii)"""
+        self.store = LogStore(log_file)
+        key = hashlib.blake2b(str(self.store.log_file.resolve()).encode(), digest_size=8).hexdigest()
+        self.cache_dir = Path(cache_dir or default_cache_dir()) / f"logs-{key}"
+        self.active = LineIndex(self.store.log_file, self.cache_dir / "active.lines")
+        self.segments = []
+        self.bases = [0]
+        self._opened = {}
+        self._index_signature = 0
+        self.refresh()
+
+    def refresh(self):
+        """Wczytuje zmiany: nowe segmenty (indeks czytany tylko po zmianie) i przyrost aktywnego pliku.
+        Zwraca 'reset' (zmiana numeracji linii), 'grown' albo None"""
+        status = None
+        try:
+            signature = os.stat(self.store.index_file).st_mtime_ns
+        except FileNotFoundError:
+            signature = None
+        if signature != self._index_signature:
+            self._index_signature = signature
+            segments = self.store.load_index()
+            if [s["number"] for s in segments] != [s["number"] for s in self.segments]:
+                self.segments = segments
+                self._prune_cache()
+                self._rebase()
+                status = "reset"
+        active = self.active.refresh()
+        return status or active
+
+    def _rebase(self):
+        self.bases = [0]
+        for segment in self.segments:
+            opened = self._opened.get(segment["number"])
+            self.bases.append(self.bases[-1] + (len(opened) if opened else segment["lines"]))
+
+    def _prune_cache(self):
+        """Zwalnia segmenty usunięte z indeksu (rotacja, retencja)"""
+        current = {segment["number"] for segment in self.segments}
+        for number in list(self._opened):
+            if number not in current:
+                self._opened.pop(number).close()
+                for path in self.cache_dir.glob(f"{number:06d}.*"):
+                    path.unlink(missing_ok=True)
+
+    def segment_index(self, position):
+        """Indeks linii rozpakowanego segmentu (rozpakowanie przy pierwszym użyciu)"""
+        segment = self.segments[position]
+        number = segment["number"]
+        if number not in self._opened:
+            unpacked = self.cache_dir / f"{number:06d}.log"
+            if not unpacked.exists():
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                temp = temp_path(unpacked)
+                with gzip.open(self.store.directory / segment["name"], "rb") as source, open(temp, "wb") as out:
+                    shutil.copyfileobj(source, out, 1 << 20)
+                os.replace(temp, unpacked)
+            self._opened[number] = LineIndex(unpacked, self.cache_dir / f"{number:06d}.lines")
+            if len(self._opened[number]) != segment["lines"]:
+                self._rebase()
+        return self._opened[number]
+
+    @property
+    def segment_lines(self):
+        return self.bases[-1]
+
+    def __len__(self):
+        return self.segment_lines + len(self.active)
+
+    def lines(self, start, stop):
+        """Linie [start, stop) całego logu (mogą obejmować kilka segmentów)"""
+        result = []
+        stop = min(stop, len(self))
+        while start < stop:
+            if start >= self.segment_lines:
+                offset = self.segment_lines
+                result += self.active.lines(start - offset, stop - offset)
+                break
+            position = bisect_right(self.bases, start) - 1
+            index = self.segment_index(position)
+            base = self.bases[position]
+            chunk = index.lines(start - base, min(stop, self.bases[position + 1]) - base)
+            if not chunk:
+                break
+            result += chunk
+            start += len(chunk)
+        return result
+
+    def close(self):
+        self.active.close()
+        for index in self._opened.values():
+            index.close()
+        self._opened.clear()
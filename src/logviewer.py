@@ -0,0 +1,331 @@
+# fortipass/logviewer.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import threading
+import tkinter as tk
+from bisect import bisect_left
+from logstore import LogDocument, parse_line, LEVELS
+from logsearch import LogSearch, FilteredLines
+from logwatch import FileWatcher, POLL_INTERVAL_MS
+from metrics import span
+
+
+# Linie renderowane ponad i pod widocznym fragmentem (płynne przewijanie o kilka linii)
+MARGIN = 20
+
+# Zmiany pliku zbierane przez ten czas i wstawiane jednym wywołaniem (tryb śledzenia)
+BATCH_MS = 100
+
+ALL_LEVELS = "All levels"
+
+LEVEL_COLORS = {"DEBUG": "blue", "INFO": "green", "WARNING": "orange", "ERROR": "red", "CRITICAL": "red"}
+
+
+def tagged(lines):
+    """Argumenty jednego wywołania Text.insert: pary (linia, znacznik poziomu)"""
+    args = []
+    for line in lines:
+        args += (line, parse_line(line)[1] or ())
+    return args
+
+
+class LogViewer:
+    def __init__(self, master, log_file, title="FortiPass® - Event Log", document=None, tasks=None):
+        """Okno logu wyświetlające tylko widoczną stronę linii (indeks początków linii, mmap);
+        document - dokument otwarty wcześniej (np. w tle), tasks - pula zadań wyszukiwania (TaskRunner)"""
+        self.log_file = log_file
+        self.document = document or LogDocument(log_file)
+        self.view = self.document  # wszystkie linie albo wyniki filtra (FilteredLines)
+        self.tasks = tasks
+        self.search = None  # osobny dokument i indeksy używane tylko przez wyszukiwanie (wątek roboczy)
+        self.search_lock = threading.Lock()
+        self.search_task = None
+        self.first = 0  # numer pierwszej widocznej linii
+        self.start = 0  # numer pierwszej linii wstawionej do widgetu
+        self.rendered = 0  # liczba linii w widgecie
+        self.watcher = FileWatcher(log_file)
+        self.pending_update = None
+        self.poll_job = None
+
+        self.window = tk.Toplevel(master)
+        self.window.title(title)
+        window_width, window_height = 1160, 520
+        position_top = (master.winfo_screenheight() - window_height) // 2
+        position_left = (master.winfo_screenwidth() - window_width) // 2
+        self.window.geometry(f"{window_width}x{window_height}+{position_left}+{position_top}")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = tk.Frame(self.window)
+        toolbar.pack(fill="x", padx=10, pady=(10, 0))
+        tk.Button(toolbar, text="Top", width=8, command=self.jump_top).pack(side="left")
+        tk.Button(toolbar, text="Bottom", width=8, command=self.jump_bottom).pack(side="left", padx=5)
+        self.follow = tk.BooleanVar(value=True)
+        tk.Checkbutton(toolbar, text="Follow", variable=self.follow,
+                       command=lambda: self.follow.get() and self.jump_bottom()).pack(side="left", padx=5)
+        self.position_label = tk.Label(toolbar, font=("Courier", 10))
+        self.position_label.pack(side="right")
+
+        filter_bar = tk.Frame(self.window)
+        filter_bar.pack(fill="x", padx=10, pady=(5, 0))
+        self.level = tk.StringVar(value=ALL_LEVELS)
+        tk.OptionMenu(filter_bar, self.level, ALL_LEVELS, *LEVELS,
+                      command=lambda value: self.apply_filter()).pack(side="left")
+        self.query = tk.StringVar()
+        query_entry = tk.Entry(filter_bar, textvariable=self.query, width=40)
+        query_entry.pack(side="left", padx=5)
+        query_entry.bind("<Return>", lambda event: self.apply_filter())
+        query_entry.bind("<Escape>", lambda event: self.cancel_search())
+        tk.Button(filter_bar, text="Find", width=8, command=self.apply_filter).pack(side="left")
+        tk.Button(filter_bar, text="Clear", width=8, command=self.clear_filter).pack(side="left", padx=5)
+
+        text_frame = tk.Frame(self.window)
+        text_frame.pack(fill="both", expand=True)
+        self.scrollbar = tk.Scrollbar(text_frame, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        xscrollbar = tk.Scrollbar(text_frame, orient="horizontal")
+        xscrollbar.pack(side="bottom", fill="x")
+
+        # Jedna linia logu = jeden wiersz widgetu (bez zawijania), przewijanie pionowe obsługuje okno
+        self.text = tk.Text(text_frame, wrap="none", font=("Courier", 11), xscrollcommand=xscrollbar.set)
+        self.text.pack(side="left", fill="both", expand=True, padx=10, pady=10)
+        xscrollbar.config(command=self.text.xview)
+        for level, color in LEVEL_COLORS.items():
+            self.text.tag_config(level, foreground=color)
+
+        for sequence, delta in (("<Button-4>", -3), ("<Button-5>", 3), ("<Up>", -1), ("<Down>", 1)):
+            self.text.bind(sequence, lambda event, delta=delta: self.scroll(delta))
+        self.text.bind("<MouseWheel>", lambda event: self.scroll(-3 if event.delta > 0 else 3))
+        self.text.bind("<Prior>", lambda event: self.scroll(-self.page_size()))
+        self.text.bind("<Next>", lambda event: self.scroll(self.page_size()))
+        self.text.bind("<Home>", lambda event: self.jump_top())
+        self.text.bind("<End>", lambda event: self.jump_bottom())
+        self.text.bind("<Configure>", lambda event: self.render())
+        self.text.focus_set()
+
+        self.jump_bottom()
+        self.start_watching()
+
+    def close(self):
+        if self.watcher.uses_inotify:
+            self.window.tk.deletefilehandler(self.watcher.fileno())
+        for job in (self.pending_update, self.poll_job):
+            if job is not None:
+                self.window.after_cancel(job)
+        self.watcher.close()
+        self.cancel_search()
+        if self.tasks is not None and not self.tasks.closed:
+            self.tasks.submit(lambda task: self.close_search())
+        else:
+            self.close_search()
+        self.document.close()
+        self.window.destroy()
+
+    def start_watching(self):
+        """Powiadomienia inotify w pętli Tk (bez odpytywania) albo okresowe sprawdzanie stat"""
+        if self.watcher.uses_inotify and hasattr(self.window.tk, "createfilehandler"):
+            self.window.tk.createfilehandler(self.watcher.fileno(), tk.READABLE, self.on_notify)
+        else:
+            self.poll()
+
+    def on_notify(self, fd, mask):
+        if self.watcher.drain():
+            self.schedule_update()
+
+    def poll(self):
+        if self.watcher.changed():
+            self.schedule_update()
+        self.poll_job = self.window.after(POLL_INTERVAL_MS, self.poll)
+
+    def schedule_update(self):
+        """Łączy zmiany z krótkiego okresu w jedną aktualizację"""
+        if self.pending_update is None:
+            self.pending_update = self.window.after(BATCH_MS, self.update)
+
+    def filtered(self):
+        return self.view is not self.document
+
+    def apply_filter(self, keep_position=False):
+        """Wyszukiwanie poziomu i tekstu w tle (z TaskRunner) albo od razu; pusty filtr - cały log"""
+        self.cancel_search()
+        level, text = self.level.get(), self.query.get().strip()
+        levels = [level] if level != ALL_LEVELS else None
+        if not levels and not text:
+            self.show_results(None)
+        elif self.tasks is None:
+            self.show_results(self.run_search(None, levels, text), keep_position)
+        else:
+            self.position_label.config(text="Searching...")
+            self.search_task = self.tasks.submit(
+                self.run_search, levels, text, on_progress=self.show_progress, on_error=self.search_failed,
+                on_done=lambda result: self.show_results(result, keep_position))
+
+    def run_search(self, task, levels, text):
+        """Numery pasujących linii i lista segmentów, na której je policzono (wątek roboczy)"""
+        with self.search_lock, span("log.search"):
+            if self.search is None:
+                self.search = LogSearch(LogDocument(self.log_file, self.document.cache_dir.parent))
+            document = self.search.document
+            document.refresh()
+            numbers = self.search.search(levels, text, progress=task.report if task else None)
+            return [segment["number"] for segment in document.segments], numbers
+
+    def show_results(self, result, keep_position=False):
+        """Wyniki wyszukiwania jako widok okna (wątek Tk)"""
+        self.search_task = None
+        if result is None:
+            self.view = self.document
+        else:
+            segments, numbers = result
+            self.document.refresh()
+            if segments != [segment["number"] for segment in self.document.segments]:
+                # Rotacja w trakcie wyszukiwania zmieniła numerację linii - wyszukiwanie od nowa
+                self.apply_filter(keep_position)
+                return
+            # Linie dopisane po odświeżeniu widoku pojawią się przy następnej aktualizacji
+            self.view = FilteredLines(self.document, numbers[:bisect_left(numbers, len(self.document))])
+        if self.follow.get():
+            self.first = self.last_first()
+        elif not keep_position:
+            self.first = 0
+        self.render()
+
+    def show_progress(self, done, total):
+        if self.search_task is not None:
+            self.position_label.config(text=f"Searching... {done * 100 // max(1, total)}%")
+
+    def search_failed(self, error):
+        self.search_task = None
+        self.position_label.config(text=f"Search failed: {error}")
+
+    def cancel_search(self):
+        if self.search_task is not None:
+            self.search_task.cancel()
+            self.search_task = None
+            self.update_position()
+
+    def close_search(self):
+        with self.search_lock:
+            if self.search is not None:
+                self.search.close()
+                self.search.document.close()
+                self.search = None
+
+    def clear_filter(self):
+        self.level.set(ALL_LEVELS)
+        self.query.set("")
+        self.apply_filter()
+
+    def update(self):
+        """Dołącza nowe linie na końcu (koszt zależny tylko od ich liczby); rotacja i skrócenie - pełne odświeżenie"""
+        self.pending_update = None
+        previous = len(self.document)
+        # Niedokończona ostatnia linia mogła zostać uzupełniona - wymaga ponownego wstawienia
+        was_partial = self.document.active.partial
+        status = self.document.refresh()
+        total = len(self.document)
+        following = self.follow.get()
+
+        if self.filtered():
+            # Indeks wyszukiwania uzupełnia tylko dopisane linie
+            if status:
+                self.apply_filter(keep_position=True)
+        elif status == "reset" or total < previous or (status and was_partial):
+            if following:
+                self.first = total
+            self.render()
+        elif status == "grown" and following and self.start + self.rendered == previous \
+                and total - previous <= self.page_size() + MARGIN:
+            self.append(self.document.lines(previous, total))
+        elif status == "grown":
+            if following:
+                self.first = total
+                self.render()
+            else:
+                self.update_position()
+
+    def append(self, lines):
+        """Wstawia nowe linie na końcu, usuwa nadmiar z początku i przewija na dół"""
+        self.text.config(state=tk.NORMAL)
+        self.text.insert("end", *tagged(lines))
+        self.rendered += len(lines)
+        excess = self.rendered - (self.page_size() + 2 * MARGIN)
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self.start += excess
+            self.rendered -= excess
+        self.text.config(state=tk.DISABLED)
+        self.first = self.last_first()
+        self.text.yview(f"{self.first - self.start + 1}.0")
+        self.update_position()
+
+    def page_size(self):
+        """Liczba wierszy mieszczących się w oknie"""
+        height = self.text.winfo_height()
+        line_height = self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace")
+        return max(1, height // max(1, int(line_height)))
+
+    def last_first(self):
+        """Największy numer pierwszej linii (ostatnia strona)"""
+        return max(0, len(self.view) - self.page_size())
+
+    def render(self):
+        """Wstawia widoczną stronę z marginesem jednym wywołaniem insert"""
+        total = len(self.view)
+        rows = self.page_size()
+        self.first = min(max(0, self.first), self.last_first())
+        start = max(0, self.first - MARGIN)
+        lines = self.view.lines(start, min(total, self.first + rows + MARGIN))
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", "end")
+        if lines:
+            self.text.insert("end", *tagged(lines))
+        self.text.config(state=tk.DISABLED)
+        self.start, self.rendered = start, len(lines)
+        self.text.yview(f"{self.first - start + 1}.0")
+        self.update_position()
+
+    def update_position(self):
+        """Pasek przewijania i etykieta pozycji"""
+        total = len(self.view)
+        rows = self.page_size()
+        suffix = " matches" if self.filtered() else ""
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + rows) / total))
+            self.position_label.config(text=f"{self.first + 1}-{min(total, self.first + rows)} / {total}{suffix}")
+        else:
+            self.scrollbar.set(0.0, 1.0)
+            self.position_label.config(text=f"0 / 0{suffix}")
+
+    def scroll(self, delta):
+        self.first += delta
+        self.render()
+        # Przewinięcie w górę wstrzymuje śledzenie, powrót na koniec je wznawia
+        self.follow.set(self.first >= self.last_first())
+        return "break"
+
+    def jump_top(self):
+        self.first = 0
+        self.follow.set(False)
+        self.render()
+        return "break"
+
+    def jump_bottom(self):
+        self.first = self.last_first()
+        self.follow.set(True)
+        self.render()
+        return "break"
+
+    def on_scrollbar(self, action, value, unit=None):
+        """Obsługa paska przewijania: 'moveto' (ułamek) lub 'scroll' (linie/strony)"""
+        if action == "moveto":
+            self.first = int(float(value) * len(self.view))
+        elif unit == "pages":
+            self.first += int(value) * self.page_size()
+        else:
+            self.first += int(value)
+        self.render()
+        self.follow.set(self.first >= self.last_first())
@@ -0,0 +1,88 @@
+# fortipass/logwatch.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, ctypes, ctypes.util
+from pathlib import Path
+
+
+# Zdarzenia inotify w katalogu logu: dopisanie, rotacja (zmiana nazwy), nowy plik, usunięcie
+IN_MODIFY = 0x002
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+POLL_INTERVAL_MS = 500  # okres sprawdzania stat, gdy inotify jest niedostępne
+
+
+def _inotify_watch(directory):
+    """Deskryptor inotify obserwujący katalog (None, gdy system go nie obsługuje)"""
+    if not hasattr(os, "O_NONBLOCK"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+    if add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class FileWatcher:
+    def __init__(self, path, use_inotify=True):
+        """Wykrywa zmiany pliku (i plików obok niego): inotify, a bez niego porównanie stat"""
+        self.path = Path(path)
+        self.fd = _inotify_watch(self.path.parent) if use_inotify else None
+        self._signature = self._stat()
+
+    def _stat(self):
+        signature = []
+        for path in (self.path, self.path.with_name(f"{self.path.name}.index.json")):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            except FileNotFoundError:
+                signature.append(None)
+        return signature
+
+    @property
+    def uses_inotify(self):
+        return self.fd is not None
+
+    def fileno(self):
+        return self.fd
+
+    def drain(self):
+        """Odczytuje zaległe zdarzenia inotify (bez blokowania); zwraca True, jeśli były"""
+        changed = False
+        while True:
+            try:
+                if not os.read(self.fd, 4096):
+                    return changed
+                changed = True
+            except BlockingIOError:
+                return changed
+
+    def changed(self):
+        """Czy plik zmienił się od poprzedniego sprawdzenia (zdarzenia inotify lub porównanie stat)"""
+        if self.fd is not None:
+            return self.drain()
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return True
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,326 @@
+# fortipass/mailer.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, re, csv, ssl, time, queue, base64, random, struct, logging, smtplib, threading, binascii
+from collections import namedtuple
+from email.message import EmailMessage
+from email.policy import SMTP as SMTP_POLICY
+from email.utils import formatdate, make_msgid, parseaddr
+from generator import get_policy, generate_password
+from crypto import derive_keys, encrypt, decrypt, NONCE_SIZE, MAC_SIZE, SCRYPT_N, SCRYPT_R, SCRYPT_P
+
+
+# Załącznik z hasłem: nagłówek i wynik crypto.encrypt (nagłówek jako dane powiązane) zakodowane w base64;
+# klucze z hasła odbiorcy (scrypt)
+SEALED_MAGIC = b"FPMAIL01"
+SEALED = struct.Struct("<8s16sIII")  # magic, sól, parametry scrypt (n, r, p)
+MAX_SCRYPT_N = 1 << 20  # ograniczenie parametrów odczytanych z załącznika
+ATTACHMENT = "password.fpm"
+
+PASSPHRASE_LENGTH = 20  # litery i cyfry - łatwe do przepisania z SMS lub kartki
+
+# Hasło konta SMTP (nie jest przyjmowane jako argument - byłoby widoczne na liście procesów)
+SMTP_PASSWORD_ENV = "FORTIPASS_SMTP_PASSWORD"
+
+CONNECTIONS = 4  # równoległe połączenia SMTP
+PER_CONNECTION = 100  # wiadomości wysyłane jednym połączeniem (serwery ograniczają ich liczbę)
+RETRIES = 3
+BACKOFF = 0.5  # pierwsza przerwa przed ponowieniem (s), kolejne dwa razy dłuższe
+TIMEOUT = 30.0
+SECURITY = ("none", "starttls", "ssl")
+
+# Błędy konfiguracji - dotyczą wszystkich wiadomości, więc wysyłka jest przerywana
+FATAL_ERRORS = (smtplib.SMTPAuthenticationError, smtplib.SMTPNotSupportedError, ssl.SSLCertVerificationError)
+
+Recipient = namedtuple("Recipient", "email name passphrase")
+
+
+def seal(text, passphrase, kdf=(SCRYPT_N, SCRYPT_R, SCRYPT_P)):
+    """Szyfruje tekst hasłem odbiorcy; wynik - linie base64 (załącznik wiadomości)"""
+    salt = os.urandom(16)
+    key, mac_key, _ = derive_keys(passphrase, salt, *kdf)
+    header = SEALED.pack(SEALED_MAGIC, salt, *kdf)
+    return base64.encodebytes(header + encrypt(key, mac_key, text.encode("utf-8"), header))
+
+
+def unseal(data, passphrase):
+    """Odszyfrowuje załącznik utworzony przez seal"""
+    try:
+        raw = base64.b64decode(b"".join(data.split()), validate=True)
+    except binascii.Error:
+        raw = b""
+    if len(raw) < SEALED.size + NONCE_SIZE + MAC_SIZE or not raw.startswith(SEALED_MAGIC):
+        raise ValueError("This is not a password sealed by FortiPass.")
+    _, salt, n, r, p = SEALED.unpack_from(raw)
+    if not (1 < n <= MAX_SCRYPT_N and n & (n - 1) == 0 and 0 < r <= 32 and 0 < p <= 16):
+        raise ValueError("The sealed password uses unsupported key derivation parameters.")
+    key, mac_key, _ = derive_keys(passphrase, salt, n, r, p)
+    text = decrypt(key, mac_key, raw[SEALED.size:], raw[:SEALED.size])
+    if text is None:
+        raise ValueError("Wrong passphrase or the sealed password was modified.")
+    return text.decode("utf-8")
+
+
+def new_passphrase():
+    return generate_password(get_policy(PASSPHRASE_LENGTH, use_special=False))
+
+
+def read_recipients(path):
+    """Odbiorcy z pliku CSV z kolumnami email oraz opcjonalnie name i passphrase"""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        if "email" not in (reader.fieldnames or ()):
+            raise ValueError(f"{path} has no 'email' column.")
+        recipients = []
+        for line, row in enumerate(reader, 2):
+            email = (row["email"] or "").strip()
+            if "@" not in email:
+                raise ValueError(f"{path}:{line}: invalid e-mail address '{email}'.")
+            if not email.isascii():
+                # Adresy spoza ASCII wymagają SMTPUTF8 - nieobsługiwane
+                raise ValueError(f"{path}:{line}: e-mail address '{email}' is not ASCII (not supported).")
+            recipients.append(Recipient(email, (row.get("name") or "").strip(), row.get("passphrase") or None))
+    return recipients
+
+
+def build_message(sender, recipient, subject, password, kdf=(SCRYPT_N, SCRYPT_R, SCRYPT_P)):
+    """Wiadomość z hasłem w zaszyfrowanym załączniku (hasło szyfrujące przekazywane osobno)"""
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = recipient.email
+    message["Subject"] = subject
+    message["Date"] = formatdate(localtime=True)
+    message["Message-ID"] = make_msgid(domain=sender.rpartition("@")[2].strip(">") or None)
+    greeting = f"Hello {recipient.name}," if recipient.name else "Hello,"
+    message.set_content(f"{greeting}\n\n"
+                        f"Your new password is in the attached file {ATTACHMENT}. It is encrypted with a passphrase\n"
+                        f"that you will receive separately. To read it, run:\n\n"
+                        f"    fortipass mail open {ATTACHMENT}\n\n"
+                        f"Please change the password after the first login.\n")
+    message.add_attachment(seal(password, recipient.passphrase, kdf),
+                           maintype="application", subtype="octet-stream", filename=ATTACHMENT)
+    return message
+
+
+def _quote_data(data):
+    """Treść po DATA: kropki na początku linii podwojone, zakończenie <CR><LF>.<CR><LF>"""
+    data = re.sub(rb"(?m)^\.", b"..", data)
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return data + b".\r\n"
+
+
+def _permanent(error):
+    """Odrzucenie trwałe (kod 5xx) - ponowienie nic nie zmieni"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class DeliveryReport:
+    def __init__(self):
+        """Wynik wysyłki (aktualizowany przez wątki połączeń)"""
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.failed = {}  # adres -> opis błędu
+        self.retries = 0
+        self.connections = 0  # nawiązane połączenia
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def add(self, field, value=1):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + value)
+
+    def fail(self, address, error):
+        with self.lock:
+            self.failed[address] = str(error) or type(error).__name__
+        logging.warning("The message to %s was not sent: %s", address, error)
+
+
+class MailPool:
+    def __init__(self, host="localhost", port=25, security="none", user=None, password=None,
+                 connections=CONNECTIONS, per_connection=PER_CONNECTION, retries=RETRIES, backoff=BACKOFF,
+                 timeout=TIMEOUT):
+        """Wysyłka przez kilka połączeń SMTP, każde dla wielu wiadomości (PIPELINING, gdy serwer go ogłasza)"""
+        if security not in SECURITY:
+            raise ValueError(f"Unknown SMTP security: {security} (choose from {', '.join(SECURITY)}).")
+        if connections < 1 or per_connection < 1 or retries < 0:
+            raise ValueError("The number of connections and messages per connection must be greater than zero.")
+        self.host = host
+        self.port = port
+        self.security = security
+        self.user = user
+        self.password = password
+        self.connections = connections
+        self.per_connection = per_connection
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.fatal = None  # błąd przerywający wysyłkę
+
+    def connect(self):
+        """Nowe połączenie: EHLO, opcjonalnie STARTTLS i logowanie"""
+        context = ssl.create_default_context()
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.security == "starttls":
+                smtp.starttls(context=context)
+                smtp.ehlo()
+            if self.user:
+                smtp.login(self.user, self.password or "")
+        except BaseException:
+            smtp.close()
+            raise
+        return smtp
+
+    @staticmethod
+    def _close(smtp):
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    @staticmethod
+    def send(smtp, sender, recipient, data):
+        """Wysyła wiadomość; z PIPELINING polecenia MAIL, RCPT i DATA idą razem (jedna odpowiedź zamiast trzech)"""
+        if not smtp.has_extn("pipelining"):
+            smtp.sendmail(sender, [recipient], data)
+            return
+        smtp.send(f"MAIL FROM:{smtplib.quoteaddr(sender)}\r\nRCPT TO:{smtplib.quoteaddr(recipient)}\r\nDATA\r\n")
+        (mail_code, mail_text), (rcpt_code, rcpt_text), (data_code, data_text) = [smtp.getreply() for _ in range(3)]
+        if data_code == 354 and mail_code == 250 and rcpt_code in (250, 251):
+            smtp.send(_quote_data(data))
+            code, text = smtp.getreply()
+            if code != 250:
+                raise smtplib.SMTPDataError(code, text)
+            return
+        if data_code == 354:
+            smtp.send(b".\r\n")  # serwer przyjął DATA mimo odrzucenia nadawcy lub odbiorcy - pusta treść
+            smtp.getreply()
+        try:
+            smtp.rset()
+        except (smtplib.SMTPException, OSError):
+            pass  # połączenie zerwane - następna wysyłka otworzy nowe
+        if mail_code != 250:
+            raise smtplib.SMTPSenderRefused(mail_code, mail_text, sender)
+        if rcpt_code not in (250, 251):
+            raise smtplib.SMTPRecipientsRefused({recipient: (rcpt_code, rcpt_text)})
+        raise smtplib.SMTPDataError(data_code, data_text)
+
+    def _open(self, report):
+        """Połączenie albo None po błędzie konfiguracji (zapamiętanym w self.fatal)"""
+        try:
+            smtp = self.connect()
+        except FATAL_ERRORS as e:
+            self.fatal = e
+            return None
+        except smtplib.SMTPResponseException as e:
+            if e.smtp_code < 500:
+                raise
+            self.fatal = e
+            return None
+        report.add("connections")
+        return smtp
+
+    def _worker(self, jobs, report):
+        smtp, used = None, 0
+        try:
+            while True:
+                job = jobs.get()
+                if job is None:
+                    return
+                recipient, build = job
+                if self.fatal is not None:
+                    report.fail(recipient, self.fatal)
+                    continue
+                try:
+                    message = build()  # szyfrowanie (scrypt) w wątku połączenia
+                    sender = parseaddr(message["From"])[1]
+                    data = message.as_bytes(policy=SMTP_POLICY)
+                except Exception as e:
+                    report.fail(recipient, e)
+                    continue
+
+                for attempt in range(self.retries + 1):
+                    try:
+                        if smtp is None or used >= self.per_connection:
+                            self._close(smtp)
+                            smtp, used = self._open(report), 0
+                            if smtp is None:
+                                report.fail(recipient, self.fatal)
+                                break
+                        used += 1
+                        self.send(smtp, sender, recipient, data)
+                        report.add("sent")
+                        break
+                    except (smtplib.SMTPException, OSError) as e:
+                        if _permanent(e):
+                            report.fail(recipient, e)
+                            break
+                        # Błąd przejściowy (4xx, zerwane połączenie): nowe połączenie po przerwie
+                        if smtp is not None:
+                            smtp.close()
+                            smtp = None
+                        if attempt == self.retries:
+                            report.fail(recipient, e)
+                            break
+                        report.add("retries")
+                        time.sleep(self.backoff * 2 ** attempt * random.uniform(1.0, 1.5))
+                    except Exception as e:
+                        # Inny błąd (np. adres spoza ASCII) - wiadomość odrzucona, wątek obsługuje następne;
+                        # połączenie mogło zostać w połowie transakcji, więc jest zamykane
+                        if smtp is not None:
+                            smtp.close()
+                            smtp = None
+                        report.fail(recipient, e)
+                        break
+        finally:
+            self._close(smtp)
+
+    def deliver(self, jobs):
+        """Wysyła wiadomości z par (adres odbiorcy, funkcja budująca wiadomość); zwraca DeliveryReport"""
+        report = DeliveryReport()
+        self.fatal = None
+        pending = queue.Queue(maxsize=self.connections * 2)  # wiadomości budowane dopiero przed wysłaniem
+        workers = [threading.Thread(target=self._worker, args=(pending, report), name=f"smtp-{i}", daemon=True)
+                   for i in range(self.connections)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        try:
+            for job in jobs:
+                pending.put(job)
+        finally:
+            for _ in workers:
+                pending.put(None)
+            for worker in workers:
+                worker.join()
+        report.elapsed = time.perf_counter() - start
+        logging.info("Sent %s messages in %.3f s (%s failed, %s retries).", report.sent, report.elapsed,
+                     len(report.failed), report.retries)
+        return report
+
+
+def password_jobs(recipients, sender, subject, policy, record, kdf=(SCRYPT_N, SCRYPT_R, SCRYPT_P)):
+    """Zadania dla MailPool.deliver: każdy odbiorca dostaje nowe hasło zaszyfrowane swoim hasłem;
+    record(adres, hasło) zapisuje hasło, zanim zadanie trafi do wysyłki"""
+    for recipient in recipients:
+        if not recipient.passphrase:
+            raise ValueError(f"No passphrase for {recipient.email}.")
+        password = generate_password(policy)
+        record(recipient.email, password)
+        yield recipient.email, (lambda recipient=recipient, password=password:
+                                build_message(sender, recipient, subject, password, kdf))
@@ -4,31 +4,88 @@
 # Licensed under the MIT License. See LICENSE file in the project root for details.
 
 
-import tkinter as tk, threading, logging, secrets, string, sys, random
-from tkinter import messagebox, Toplevel, PhotoImage
+import os, logging, time, sys
+from datetime import datetime
 from pathlib import Path
-from lock import AppLocker
+from lock import AppLocker, forward_request
+from logsetup import setup_logging, event, LOG_FILE
+from generator import get_policy, generate_password
+from tasks import TaskRunner
+from metrics import METRICS, span, timed, observe, configure as configure_metrics
+
+# Tkinter wczytywany dopiero w trybie graficznym (tryb CLI i przekazanie żądania go nie potrzebują)
+tk = messagebox = Toplevel = PhotoImage = None
+
+
+def _load_tk():
+    """Importuje Tkinter przy pierwszym użyciu interfejsu"""
+    global tk, messagebox, Toplevel, PhotoImage
+    if tk is None:
+        import tkinter
+        from tkinter import messagebox as tk_messagebox
+        tk, messagebox = tkinter, tk_messagebox
+        Toplevel, PhotoImage = tkinter.Toplevel, tkinter.PhotoImage
+
+
+MAX_FORWARDED_COUNT = 10000
+
+# Czas wyświetlania powiadomienia (ms)
+TOAST_MS = 1800
+
+# Co tyle haseł generowanie w tle raportuje postęp (i sprawdza anulowanie)
+PROGRESS_EVERY = 1000
+
+
+@timed("task.generate_batch")
+def generate_batch(task, policy, count):
+    """Generowanie wielu haseł w wątku roboczym (z postępem i możliwością anulowania)"""
+    passwords = []
+    for start in range(0, count, PROGRESS_EVERY):
+        task.report(start, count)
+        passwords += [generate_password(policy) for _ in range(min(PROGRESS_EVERY, count - start))]
+    return passwords
+
+
+@timed("log.open_document")
+def open_log_document(task, log_file):
+    """Otwiera log (indeks linii budowany lub wczytywany z pamięci podręcznej) w wątku roboczym"""
+    from logstore import LogDocument
+    return LogDocument(log_file)
+
+
+@timed("history.open")
+def open_password_history(task, passphrase):
+    """Otwiera szyfrowaną historię haseł (scrypt, wczytanie indeksu) w wątku roboczym"""
+    from history import PasswordHistory, default_history_file
+    return PasswordHistory(default_history_file(), passphrase)
+
+
+@timed("history.commit")
+def commit_history(task, history):
+    """Utrwala dopisane wpisy historii (fsync); zwraca True, gdy plik wymaga kompaktowania"""
+    history.commit()
+    return history.needs_compaction()
+
 
 class PasswordGeneratorApp:
     def __init__(self, root):
         """Inicjalizacja aplikacji z głównym oknem"""
+        self.started = time.perf_counter()
+        _load_tk()
         self.root = root
         self.root.title("FortiPass®")
         self.root.geometry("375x555")
         self.root.resizable(False, False)
 
-        self.chunk_size = 1000  
-        self.current_offset = 0
-
         try:
             self.setup_logging()
             logging.debug("Starting the program:".upper())
+            self.setup_metrics()
 
-            # Inicjalizacja tłumaczeń
-            self.translations = self.setup_translations()
-
-            # Ustawienia języka (domyślny to angielski)
+            # Ustawienia języka (domyślny to angielski); pierwsza klatka potrzebuje tylko jego tłumaczeń,
+            # pozostałe języki budowane przy pierwszej zmianie języka
             self.current_language = "EN"
+            self.translations = {"EN": self.setup_translations("EN")}
 
             logging.warning("Initiating the program startup process.")
 
@@ -38,28 +95,98 @@ class PasswordGeneratorApp:
             # Próba zablokowania instancji
             self.locker.lock_instance()
 
-            # Inicjalizacja ustawień
+            # Wolne operacje w puli wątków; wyniki i żądania kolejnych uruchomień wracają do wątku Tk
+            self.tasks = TaskRunner(self.root)
+            self.log_task = None
+            self.clipboard = None  # mechanizm schowka wybierany przy pierwszym kopiowaniu
+            self.history = None  # historia haseł otwierana przy pierwszym wygenerowanym haśle
+            self.history_task = None
+            self.history_queue = []
+            self.history_disabled = False
+            self.compacting = False
+            self.toast = None
+            self.locker.listen({"raise": self.request_raise, "generate": self.request_generate,
+                                "metrics": self.request_metrics})
+
+            # Inicjalizacja ustawień potrzebnych do pierwszej klatki
             self.setup_ui()
-            self.setup_menu()
-            self.setup_icon()
 
             # Obsługa klawisza Enter
             self.root.bind("<Return>", self.handle_enter_key)
 
+            # Menu, ikona i słowniki wzorców dopiero po narysowaniu okna
+            self.startup_complete = False
+            self.root.bind("<Map>", self.on_first_map)
+
             # Logowanie poszczególnych etapów inicjalizacji
             logging.info("User Interface has been launched successfully.")
-            logging.info("Shortcut icon settings have been loaded successfully.")
-            logging.info("Menu settings have been loaded successfully.")
             logging.info("Workflow monitoring settings have been loaded successfully.")
             logging.info("The default language has been set in the program.")
             
         except Exception as e:
-            logging.error(f"Startup Error: {str(e)}!")
+            logging.error("Startup Error: %s!", e)
             messagebox.showerror("FortiPass® - Error", "An error occurred during the program startup!")
             sys.exit(1)
   
+        observe("startup.init", time.perf_counter() - self.started)
         logging.info("The program was started successfully.")
 
+    def on_first_map(self, event):
+        """Pierwsze wyświetlenie okna: pozostała inicjalizacja w najbliższej bezczynności pętli Tk"""
+        if event.widget is not self.root:
+            return
+        self.root.unbind("<Map>")
+        observe("startup.first_frame", time.perf_counter() - self.started)
+        self.root.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """Elementy niepotrzebne do pierwszej klatki: menu, ikona, wstępne wczytanie słowników"""
+        try:
+            self.setup_menu()
+            logging.info("Menu settings have been loaded successfully.")
+            self.setup_icon()
+            logging.info("Shortcut icon settings have been loaded successfully.")
+
+            # Słowniki wzorców (ocena siły) wczytywane w tle, zanim użytkownik wygeneruje hasło
+            self.tasks.submit(self.warm_up)
+        except Exception as e:
+            logging.error("Deferred startup: %s!", e)
+        self.startup_complete = True
+        observe("startup.complete", time.perf_counter() - self.started)
+
+    @staticmethod
+    def warm_up(task):
+        """Wczytuje moduł oceny siły i słowniki wzorców poza wątkiem interfejsu"""
+        from strength import get_matcher
+        get_matcher()
+
+    def request_raise(self, request):
+        """Prośba o pokazanie okna (wątek gniazda - wykonanie w pętli Tk)"""
+        self.tasks.post(self.raise_window)
+
+    def request_generate(self, request):
+        """Generowanie haseł dla kolejnego uruchomienia (bez interfejsu, w wątku gniazda)"""
+        count = int(request.get("count", 1))
+        if not 1 <= count <= MAX_FORWARDED_COUNT:
+            raise ValueError(f"The number of passwords must be between 1 and {MAX_FORWARDED_COUNT}.")
+        classes = request.get("classes", ["letters", "digits", "special"])
+        policy = get_policy(int(request.get("length", 12)),
+                            "letters" in classes, "digits" in classes, "special" in classes)
+        logging.info("Generating %s passwords for a forwarded request.", count,
+                     extra=event("remote_generate", count=count, length=policy.length))
+        return {"passwords": self.tasks.submit(generate_batch, policy, count).result()}
+
+    def request_metrics(self, request):
+        """Migawka histogramów dla 'fortipass remote metrics' (wątek gniazda)"""
+        return {"metrics": METRICS.snapshot()}
+
+    def raise_window(self):
+        """Przywraca i wysuwa okno na wierzch"""
+        self.root.deiconify()
+        self.root.lift()
+        self.root.focus_force()
+        logging.info("The window was raised at the request of another launch.")
+
     def setup_icon(self):
         # Tworzenie katalogu "img" w katalogu nadrzędnym
         try:
@@ -73,35 +200,25 @@ class PasswordGeneratorApp:
                 icon = PhotoImage(file=img_file)
                 self.root.iconphoto(True, icon)
         except Exception as e:
-            logging.error(f"Setting up icon: {str(e)}!")
+            logging.error("Setting up icon: %s!", e)
             messagebox.showerror("FortiPass® - Error", "Failed to load the icon!")
 
     def setup_logging(self):
-        """Ustawienia loggowania"""
-        # Tworzenie katalogu logs w katalogu nadrzędnym
+        """Ustawienia loggowania (kolejka i wątek zapisu - moduł logsetup.py)"""
         try:
-            parent_dir = Path(__file__).resolve().parent.parent
-            log_dir = parent_dir / "logs"
-            log_dir.mkdir(exist_ok=True)
-            log_file = log_dir / "password_generator.log"
-            self.log_file = log_file
-
-            # Sprawdzanie, czy plik istnieje
-            if not log_file.exists():
-                # Tworzenie nowego pliku log (jeśli nie istnieje)
-                log_file.touch()
-
-            # Konfiguracja loggowania
-            logging.basicConfig(
-                filename=log_file,
-                level=logging.DEBUG,
-                format="%(asctime)s - %(levelname)s - %(message)s"
-            )
-
+            self.log_file = setup_logging()
         except Exception as e:
-            logging.error(f"Setting up logging: {str(e)}!")
+            self.log_file = LOG_FILE
+            logging.error("Setting up logging: %s!", e)
             messagebox.showerror("FortiPass® - Error", "An error occurred while starting the program related to logging events to the log file!")
 
+    def setup_metrics(self):
+        """Pomiar czasu operacji i profilowanie według zmiennych środowiskowych (moduł metrics.py)"""
+        try:
+            configure_metrics()
+        except ValueError as e:
+            logging.error("Setting up metrics: %s!", e)
+
     def handle_enter_key(self, event):
         """Przechwytuje naciśnięcie klawisza Enter dla aktywnego przycisku lub pola tekstowego"""
         widget = self.root.focus_get()  # Zwraca widget, który ma fokus
@@ -112,32 +229,10 @@ class PasswordGeneratorApp:
             # Jeśli pole tekstowe jest aktywne, uruchamia generowanie hasła
             self.generate_password()
 
-    def setup_translations(self):
-        """Słownik z tłumaczeniami"""
-        return {
-            "EN": {
-                "title": "FortiPass®",
-                "language_menu": "Language",
-                "password_length": "Password length:",
-                "letters": "Letters (a-Z)",
-                "digits": "Digits (0-9)",
-                "special_chars": "Special characters (!@#)",
-                "generated_password": "Generated password:",
-                "generate_btn": "Generate Password",
-                "copy_btn": "Copy to Clipboard",
-                "log_btn": "Show Log",
-                "password_strength": "Password strength: ",
-                "strong": "Strong",
-                "medium": "Medium",
-                "weak": "Weak",
-                "english": "English",
-                "polish": "Polish",
-                "password_copied": "Password copied to clipboard!",
-                "empty_password": "No generated password to copy.",
-                "input_error": "Password length must be greater than zero.",
-                "select_option": "You must select at least one option!",
-            },
-            "PL": {
+    def setup_translations(self, language):
+        """Słownik z tłumaczeniami jednego języka"""
+        if language == "PL":
+            return {
                 "title": "FortiPass®",
                 "language_menu": "Język",
                 "password_length": "Długość hasła:",
@@ -154,11 +249,40 @@ class PasswordGeneratorApp:
                 "weak": "Słabe",
                 "english": "Angielski",
                 "polish": "Polski",
+                "tools_menu": "Narzędzia",
+                "performance": "Wydajność",
                 "password_copied": "Hasło skopiowane do schowka!",
+                "clipboard_cleared": "Schowek wyczyszczony.",
+                "history_passphrase": "Hasło szyfrujące historię haseł:",
                 "empty_password": "Brak wygenerowanego hasła do skopiowania.",
                 "input_error": "Długość hasła musi być większa od zera.",
                 "select_option": "Musisz wybrać co najmniej jedną opcję!",
-            },
+            }
+        return {
+            "title": "FortiPass®",
+            "language_menu": "Language",
+            "password_length": "Password length:",
+            "letters": "Letters (a-Z)",
+            "digits": "Digits (0-9)",
+            "special_chars": "Special characters (!@#)",
+            "generated_password": "Generated password:",
+            "generate_btn": "Generate Password",
+            "copy_btn": "Copy to Clipboard",
+            "log_btn": "Show Log",
+            "password_strength": "Password strength: ",
+            "strong": "Strong",
+            "medium": "Medium",
+            "weak": "Weak",
+            "english": "English",
+            "polish": "Polish",
+            "tools_menu": "Tools",
+            "performance": "Performance",
+            "password_copied": "Password copied to clipboard!",
+            "clipboard_cleared": "Clipboard cleared.",
+            "history_passphrase": "Passphrase of the password history:",
+            "empty_password": "No generated password to copy.",
+            "input_error": "Password length must be greater than zero.",
+            "select_option": "You must select at least one option!",
         }
 
     def setup_menu(self):
@@ -173,6 +297,11 @@ class PasswordGeneratorApp:
 
         # Dodaj podmenu z wyborem języka do głównego menu
         self.menu.add_cascade(label=translations["language_menu"], menu=self.language_menu)
+
+        # Okno wydajności (histogramy czasu operacji)
+        self.tools_menu = tk.Menu(self.menu, tearoff=0)
+        self.tools_menu.add_command(label=translations["performance"], command=self.show_performance)
+        self.menu.add_cascade(label=translations["tools_menu"], menu=self.tools_menu)
         self.root.config(menu=self.menu)
         
     def set_language(self, language):
@@ -184,19 +313,22 @@ class PasswordGeneratorApp:
             previous_language = self.current_language
 
             # Aktualizacja języka i interfejsu
-            self.current_language = language
-            self.update_ui_texts()
-            self.password_entry.delete(0, tk.END)
-            self.update_password_strength(None)
-            self.strength_bar.delete("all")
-            self.strength_bar.create_oval(5, 5, 20, 20, fill="white")
+            with span("gui.set_language"):
+                if language not in self.translations:
+                    self.translations[language] = self.setup_translations(language)
+                self.current_language = language
+                self.update_ui_texts()
+                self.password_entry.delete(0, tk.END)
+                self.update_password_strength(None)
+                self.strength_bar.delete("all")
+                self.strength_bar.create_oval(5, 5, 20, 20, fill="white")
 
             # Dodawanie informacji do logów
-            logging.info(f"Change from: {previous_language}")
-            logging.info(f"Change to: {language}")
+            logging.info("Change from: %s", previous_language)
+            logging.info("Change to: %s", language)
             logging.info("The language setting was changed successfully.")
         except Exception as e:
-            logging.error(f"Setting language: {str(e)}!")
+            logging.error("Setting language: %s!", e)
             messagebox.showerror("FortiPass® - Error", "An error occurred while changing the language setting!")
 
     def update_ui_texts(self):
@@ -275,102 +407,51 @@ class PasswordGeneratorApp:
             # Inicjalizacja procesu generowania hasła.
             logging.warning("Initializing the password generation process.")
 
-            if length < 4:
-                raise ValueError("Password length must be at least 4 characters.")
-            if length > 128:
-                raise ValueError("Password length must be no more than 128 characters.")
-
             # Sprawdzanie opcji
             use_letters = self.letters_var.get()
             use_numbers = self.numbers_var.get()
             use_special = self.special_var.get()
 
-            # Logowanie składników hasła
-            composition = []
-            if use_letters:
-                composition.append("letters")
-            if use_numbers:
-                composition.append("numbers")
-            if use_special:
-                composition.append("special characters")
-
-            if not composition:
+            if not any([use_letters, use_numbers, use_special]):
                 error_message = "You must select at least one option!"
-                logging.error("Component error: No component was selected to generate the password!")
+                logging.error("Component error: No component was selected to generate the password!",
+                              extra=event("generate"))
                 messagebox.showerror("FortiPass® - Error", error_message)
                 return
 
-            if not any([use_letters, use_numbers, use_special]):
-                raise ValueError("You must select at least one option!")
-
-            # Tworzenie bazy znaków na podstawie zaznaczonych opcji
-            characters = ""
-            if use_letters:
-                characters += string.ascii_letters
-            if use_numbers:
-                characters += string.digits
-            if use_special:
-                characters += string.punctuation
-
-            if not characters:
-                raise ValueError("No characters available for password generation!")
-
-            # Wykluczanie podobnych znaków
-            similar_chars = "O0l1I"
-            characters = ''.join(c for c in characters if c not in similar_chars)
-
-            # Inicjalizowanie listy do hasła
-            password = []
-
-            # Dodanie po jednym znaku z każdej wybranej opcji
-            if use_letters:
-                password.append(secrets.choice(string.ascii_letters))
-            if use_numbers:
-                password.append(secrets.choice(string.digits))
-            if use_special:
-                password.append(secrets.choice(string.punctuation))
-
-            # Wypełnianie reszty hasła losowymi znakami z dostępnych opcji
-            remaining_length = length - len(password)
-            all_selected_characters = ""
-            if use_letters:
-                all_selected_characters += string.ascii_letters
-            if use_numbers:
-                all_selected_characters += string.digits
-            if use_special:
-                all_selected_characters += string.punctuation
-
-            # Generowanie pozostałych znaków
-            password += [secrets.choice(all_selected_characters) for _ in range(remaining_length)]
-
-            # Mieszanie znaków w haśle
-            random.shuffle(password)
-
-            # Finalne hasło
-            password = ''.join(password)
-
-            # Wyświetlanie hasła i jego siły
-            self.password_entry.delete(0, tk.END)
-            self.password_entry.insert(0, password)
-
-            # Ocena złożoności wygenerowanego hasła (siła hasła)
-            strength, color = self.evaluate_password_strength(password)
-            self.update_strength_bar(strength, color)
-
-            # Automatyczne zaznaczenie wygenerowanego hasła
-            self.password_entry.select_range(0, tk.END)
+            with span("gui.generate_password"):
+                # Skompilowana polityka (pamiętana między kliknięciami) i generowanie hasła
+                started = time.perf_counter()
+                policy = get_policy(length, use_letters, use_numbers, use_special)
+                composition = policy.composition()
+                password = generate_password(policy)
+                duration_ms = (time.perf_counter() - started) * 1000
+
+                # Wyświetlanie hasła i jego siły
+                self.password_entry.delete(0, tk.END)
+                self.password_entry.insert(0, password)
+
+                # Ocena złożoności wygenerowanego hasła (siła hasła)
+                strength, color = self.evaluate_password_strength(password)
+                self.update_strength_bar(strength, color)
+
+                # Automatyczne zaznaczenie wygenerowanego hasła
+                self.password_entry.select_range(0, tk.END)
 
             # Informacje o wygenerowanym haśle
-            logging.info(f"Length: {length}.")
-            logging.info(f"Include: {', '.join(composition)}.")
-            logging.info(f"Strength: {strength}.")
-            logging.info(f"The password generated successfully.")
+            logging.info("Length: %s.", length)
+            logging.info("Include: %s.", ", ".join(composition))
+            logging.info("Strength: %s.", strength)
+            logging.info("The password generated successfully.",
+                         extra=event("generate", length=length, composition=list(composition),
+                                     strength=strength, duration_ms=round(duration_ms, 3)))
+            self.record_history(password, length=length, composition=list(composition), strength=strength)
 
         except ValueError as e:
-            logging.error(f"Input error: {str(e)}!")
+            logging.error("Input error: %s!", e, extra=event("generate"))
             messagebox.showerror("FortiPass® - Error", str(e))
         except Exception as e:
-            logging.error(f"Generating the password: {str(e)}!")
+            logging.error("Generating the password: %s!", e, extra=event("generate"))
             messagebox.showerror("FortiPass® - Error", "There was a problem generating the password!")
 
     def update_password_strength(self, strength_value):
@@ -389,19 +470,11 @@ class PasswordGeneratorApp:
         self.strength_label.config(text=f"{translations['password_strength']}{strength_text}")
 
     def evaluate_password_strength(self, password):
-        """Ocena siły hasła na podstawie długości i różnych typów znaków"""
-        length = len(password)
-        has_letters = any(c.isalpha() for c in password)
-        has_digits = any(c.isdigit() for c in password)
-        has_specials = any(c in string.punctuation for c in password)
-
-        # Kryteria siły hasła oraz wyświetlanej nazwy według ustawionego języka
-        if length >= 12 and has_letters and has_digits and has_specials:
-            return "Strong".lower(), "green"
-        elif length >= 8 and (has_letters and has_digits or has_specials):
-            return "Medium".lower(), "orange"
-        else:
-            return "Weak".lower(), "red"
+        """Ocena siły hasła na podstawie entropii (moduł strength.py)"""
+        from strength import estimate, TIER_COLORS
+        with span("strength.estimate"):
+            bits, strength = estimate(password)
+        return strength, TIER_COLORS[strength]
 
     def update_strength_bar(self, strength, color):
         """Aktualizacja koła siły hasła i tekstu"""
@@ -416,165 +489,173 @@ class PasswordGeneratorApp:
             self.strength_label.config(text=f"Siła hasła: {strength}")
 
     def copy_to_clipboard(self):
-        """Kopiowanie wygenerowanego hasła do schowka (Tkinter Clipboard)"""
+        """Kopiowanie wygenerowanego hasła do schowka (moduł clipboard.py - bez root.update i okna modalnego)"""
         logging.debug("Copying to the clipboard:".upper())
         password = self.password_entry.get()
         logging.warning("Initializing the password copy to clipboard process.")
         if password:
             try:
-                # Użycie Tkintera do kopiowania do schowka
-                self.root.clipboard_clear()  # Czyszczenie schowka
-                self.root.clipboard_append(password)  # Kopiowanie do schowka
-                self.root.update()  # Zaktualizowanie schowka w systemie
-                logging.info("The password was copied successfully.")
-                messagebox.showinfo("FortiPass® - Success", "Password copied to clipboard!")
+                with span("gui.copy_to_clipboard"):
+                    self.setup_clipboard()
+                    self.clipboard.copy(password, on_done=self.password_copied, on_error=self.copy_failed)
             except Exception as e:
-                logging.error(f"Copying to clipboard: {str(e)}!")
-                messagebox.showerror("FortiPass® - Error", "There was a problem copying the password to the clipboard!")
+                self.copy_failed(e)
         else:
-            logging.error("The attempt to copy an empty password was made!")
+            logging.error("The attempt to copy an empty password was made!", extra=event("copy"))
             messagebox.showerror("FortiPass® - Error", "There is no generated password to copy!")
 
-    def on_scroll(self, event, log_text):
-        """Reakcja na przewijanie"""
-        if log_text.yview()[1] >= 1.0:  # Przewinięto do końca
-            self.load_more_logs(log_text)
-
-    def on_resize(self, log_text):
-        """Reakcja na zmianę rozmiaru okna"""
-        if log_text.yview()[1] >= 1.0:
-                self.load_more_logs(log_text)
-
-    def load_more_logs(self, log_text):
-        """Wczytuje kolejne logi do wyświetlenia"""
-        try:
-            with open(self.log_file, "r") as f:
-                f.seek(self.current_offset)
-                lines = [f.readline() for _ in range(self.chunk_size)]
-                if not lines:
-                    return  # Brak więcej logów do wczytania
-
-                for line in lines:
-                    log_text.insert("end", line)
-
-                self.current_offset = f.tell()
-
-        except Exception as e:
-            logging.error(f"Loading more the logs: {str(e)}!")
-            messagebox.showerror("FortiPass® - Error", "The event log file could not be opened!")
+    def setup_clipboard(self):
+        """Mechanizm schowka (FORTIPASS_CLIPBOARD) i czas czyszczenia (FORTIPASS_CLIPBOARD_CLEAR)"""
+        if self.clipboard is None:
+            from clipboard import ClipboardService, select_backend, clear_after_setting
+            self.clipboard = ClipboardService(select_backend(self.root), self.tasks, clear_after_setting(),
+                                              on_cleared=self.clipboard_cleared)
+            logging.info("The %s clipboard backend was selected.", self.clipboard.backend.name)
+
+    def password_copied(self):
+        """Potwierdzenie kopiowania bez blokowania okna (wątek Tk)"""
+        logging.info("The password was copied successfully.",
+                     extra=event("copy", backend=self.clipboard.backend.name))
+        self.show_toast(self.translations[self.current_language]["password_copied"])
+
+    def copy_failed(self, error):
+        logging.error("Copying to clipboard: %s!", error, extra=event("copy"))
+        messagebox.showerror("FortiPass® - Error", "There was a problem copying the password to the clipboard!")
+
+    def clipboard_cleared(self):
+        self.show_toast(self.translations[self.current_language]["clipboard_cleared"])
+
+    def show_toast(self, message, duration_ms=TOAST_MS):
+        """Krótkie powiadomienie przy dolnej krawędzi okna, znikające samo (bez okna modalnego)"""
+        if self.toast is not None:
+            self.toast.destroy()
+        width = max(self.root.winfo_width(), 200) - 40
+        x = self.root.winfo_rootx() + 20
+        y = self.root.winfo_rooty() + max(self.root.winfo_height(), 200) - 70
+        toast = self.toast = Toplevel(self.root)
+        toast.overrideredirect(True)
+        toast.attributes("-topmost", True)
+        toast.geometry(f"{width}x30+{x}+{y}")
+        tk.Label(toast, text=message, bg="#333333", fg="white", font=("Courier", 10, "bold")).pack(
+            fill="both", expand=True)
+
+        def hide():
+            toast.destroy()
+            if self.toast is toast:
+                self.toast = None
+
+        toast.after(duration_ms, hide)
+
+    def record_history(self, password, **fields):
+        """Zapis hasła w szyfrowanej historii (FORTIPASS_HISTORY=1); fsync w wątku roboczym"""
+        from history import history_enabled
+        if self.history_disabled or not history_enabled():
+            return
+        label = datetime.now().isoformat(sep=" ", timespec="microseconds")
+        self.history_queue.append((label, password, fields))
+        if self.history is not None:
+            self.store_history()
+        elif self.history_task is None:
+            self.open_history()
+
+    def open_history(self):
+        """Hasło szyfrujące (zmienna środowiskowa lub okno dialogowe) i otwarcie historii w tle"""
+        from history import PASSPHRASE_ENV
+        passphrase = os.environ.get(PASSPHRASE_ENV)
+        if passphrase is None:
+            from tkinter import simpledialog
+            passphrase = simpledialog.askstring("FortiPass® - History",
+                                                self.translations[self.current_language]["history_passphrase"],
+                                                show="*", parent=self.root)
+        if not passphrase:
+            self.disable_history()
+            logging.warning("The password history is disabled for this session (no passphrase).")
+            return
+        self.history_task = self.tasks.submit(open_password_history, passphrase,
+                                              on_done=self.history_opened, on_error=self.history_failed)
+
+    def history_opened(self, history):
+        self.history_task = None
+        self.history = history
+        logging.info("The password history was opened (%s entries).", len(history))
+        self.store_history()
+
+    def history_failed(self, error):
+        self.history_task = None
+        self.disable_history()
+        logging.error("Opening the password history: %s!", error)
+        messagebox.showerror("FortiPass® - Error", f"The password history could not be opened: {error}")
+
+    def disable_history(self):
+        self.history_disabled = True
+        self.history_queue.clear()
+
+    def store_history(self):
+        """Wpisy trafiają do bufora historii od razu (zamknięcie programu ich nie gubi), fsync - w tle"""
+        entries, self.history_queue = self.history_queue, []
+        for label, password, fields in entries:
+            self.history.put(label, password, sync=False, **fields)
+        self.tasks.submit(commit_history, self.history, on_done=self.history_committed,
+                          on_error=lambda e: logging.error("Saving the password history: %s!", e))
+
+    def history_committed(self, needs_compaction):
+        if needs_compaction and not self.compacting:
+            self.compacting = True
+            self.tasks.submit(lambda task: self.history.compact(), on_done=self.history_compacted,
+                              on_error=self.history_compacted)
+
+    def history_compacted(self, result):
+        self.compacting = False
+        if isinstance(result, Exception):
+            logging.error("Compacting the password history: %s!", result)
 
     def show_log(self):
-        """Otworzenie logu w nowym oknie w oddzielnym wątku"""
+        """Otworzenie logu: indeks linii w tle, okno (wyświetlana jest tylko widoczna strona linii) w wątku Tk"""
         logging.debug("Loading the event log:".upper())
-
-        def open_log():
-            try:
-                logging.warning("Initiating the process of starting the event log.")
-                logging.info("Loading and partitioning the log into chunks.")
-
-                # Wczytywanie i dzielenie logu na partie
-                log_content = ""
-                with open(self.log_file, "r") as f:
-                    # Wczytywanie logu w kawałkach
-                    while True:
-                        lines = []
-                        for _ in range(self.chunk_size):
-                            line = f.readline()
-                            if not line:
-                                break
-                            lines.append(line)
-                        if not lines:
-                            break
-                        log_content += ''.join(lines)
-
-                self.show_log_window(log_content, None, None)
-
-            except FileNotFoundError as fnf_error:
-                logging.error(f"Loading the log file: {str(fnf_error)}!")
-                messagebox.showerror("FortiPass® - Error", "The log file could not be found!")
-
-            except PermissionError as perm_error:
-                logging.error(f"Loading the log file: {str(perm_error)}!")
-                messagebox.showerror("FortiPass® - Error", "You don't have the required permissions to access the log file.!")
-
-            except Exception as e:
-                logging.error(f"Error loading the event log file: {str(e)}!")
-                messagebox.showerror("FortiPass® - Error", "The event log file could not be opened!")
-
+        if self.log_task is not None and not self.log_task.done():
+            return  # log jest już wczytywany
+        logging.warning("Initiating the process of starting the event log.")
+        self.log_button.config(cursor="watch")
+        self.log_requested = time.perf_counter()
+        self.log_task = self.tasks.submit(open_log_document, self.log_file,
+                                          on_done=self.show_log_window, on_error=self.show_log_error)
+
+    def show_log_window(self, document):
+        """Okno logu dla dokumentu otwartego w tle (wątek Tk)"""
+        self.log_button.config(cursor="")
         try:
-            # Uruchomienie nowego wątku.
-            threading.Thread(target=open_log, daemon=True).start()
-            logging.info("The event log window was started in new thread successfully.")
+            from logviewer import LogViewer
+            with span("gui.log_window"):
+                LogViewer(self.root, self.log_file, document=document, tasks=self.tasks)
+            # Od kliknięcia do pokazania okna (wczytanie w tle i budowa okna)
+            observe("gui.show_log", time.perf_counter() - self.log_requested)
+            logging.info("The event log was displayed successfully.", extra=event("show_log"))
         except Exception as e:
-            logging.error("Starting a new thread: An error occurred while trying to start a new thread!")
-            messagebox.showerror("FortiPass® - Error", "An error occurred while trying to open event log in a new thread!")
+            document.close()
+            self.show_log_error(e)
+
+    def show_log_error(self, error):
+        """Komunikat błędu wczytywania lub wyświetlania logu (wątek Tk)"""
+        self.log_button.config(cursor="")
+        if isinstance(error, FileNotFoundError):
+            logging.error("Loading the log file: %s!", error, extra=event("show_log"))
+            messagebox.showerror("FortiPass® - Error", "The log file could not be found!")
+        elif isinstance(error, PermissionError):
+            logging.error("Loading the log file: %s!", error, extra=event("show_log"))
+            messagebox.showerror("FortiPass® - Error", "You don't have the required permissions to access the log file.!")
+        else:
+            logging.error("Displaying the event log window: %s!", error, extra=event("show_log"))
+            messagebox.showerror("FortiPass® - Error", "Failed to display the event log!")
 
-    def show_log_window(self, log_content, log_text, scrollbar):
-        """Pokazuje zawartość logu w nowym oknie"""
+    def show_performance(self):
+        """Okno z histogramami czasu operacji, eksportem i profilowaniem jednej operacji"""
         try:
-            log_window = tk.Toplevel(self.root)
-            log_window.title("FortiPass® - Event Log")
-
-            # Wymiary ekranu
-            screen_width = self.root.winfo_screenwidth()
-            screen_height = self.root.winfo_screenheight()
-
-            # Wymiary okna logu
-            window_width = 1160
-            window_height = 520
-
-            # Obliczanie pozycji okna, aby było wyśrodkowane na ekranie
-            position_top = (screen_height - window_height) // 2
-            position_left = (screen_width - window_width) // 2
-
-            # Ustawienie pozycji okna
-            log_window.geometry(f'{window_width}x{window_height}+{position_left}+{position_top}')
-
-            # Tworzenie kontenera na tekst z paskiem przewijania
-            text_frame = tk.Frame(log_window)
-            text_frame.pack(fill="both", expand=True)
-
-            # Tworzenie paska przewijania w dół
-            scrollbar = tk.Scrollbar(text_frame, orient="vertical")
-            scrollbar.pack(side="right", fill="y")
-
-            # Tworzenie widgetu Text do wyświetlania logu
-            log_text = tk.Text(text_frame, wrap="word", font=("Courier", 11), width=175, height=40, yscrollcommand=scrollbar.set)
-            log_text.pack(side="left", fill="both", expand=True, padx=10, pady=10)
-
-            # Dodanie tagów dla stylizacji
-            log_text.tag_config("DEBUG", foreground="blue")
-            log_text.tag_config("INFO", foreground="green")
-            log_text.tag_config("WARNING", foreground="orange")
-            log_text.tag_config("FortiPass® - Error", foreground="red")
-
-            # Wstawienie zawartości logu z kolorowaniem
-            for line in log_content.splitlines():
-                if "INFO" in line:
-                    log_text.insert("end", line + "\n", "INFO")
-                elif "WARNING" in line:
-                    log_text.insert("end", line + "\n", "WARNING")
-                elif "ERROR" in line:
-                    log_text.insert("end", line + "\n", "ERROR")
-                elif "DEBUG" in line:
-                    log_text.insert("end", line + "\n", "DEBUG")
-                else:
-                    log_text.insert("end", line + "\n")  # Domyślny kolor
-
-            log_text.config(state=tk.DISABLED)  # Zablokowanie edytowania tekstu
-
-            # Ustawienie paska przewijania
-            scrollbar.config(command=log_text.yview)
-
-            # Dynamiczne ładowanie logów po przewinięciu do końca
-            log_text.bind("<Configure>", lambda event: self.on_resize(log_text))
-            log_text.bind("<MouseWheel>", lambda event: self.on_scroll(event, log_text))
-
-            logging.info("The event log was displayed successfully.")
-
+            from perfviewer import PerformanceWindow
+            PerformanceWindow(self.root)
+            logging.info("The performance window was displayed successfully.")
         except Exception as e:
-            logging.error(f"Displaying the event log window: {str(e)}!")
-            messagebox.showerror("FortiPass® - Error", "Failed to display the event log!")
+            logging.error("Displaying the performance window: %s!", e)
+            messagebox.showerror("FortiPass® - Error", "Failed to display the performance window!")
 
     def shutdown_program_window(self, title, message):
         """Wyświetla okno dialogowe z pytaniem o zamknięcie programu 'Yes/No'."""
@@ -613,13 +694,18 @@ class PasswordGeneratorApp:
 
             answer = self.shutdown_program_window("FortiPass® - Exit program", "Do you really want to exit the program?")
             if answer:
+                if self.clipboard is not None:
+                    self.clipboard.close()
+                self.tasks.shutdown()
+                if self.history is not None:
+                    self.history.close()
                 self.locker.unlock_instance()
-                root.quit()
+                self.root.quit()
                 logging.info("The program shutdown successfully.")
             else:
                 logging.info("The program shutdown cancelled by the user.")
         except Exception as e:
-            logging.error(f"Shutting down the program: {str(e)}!")
+            logging.error("Shutting down the program: %s!", e)
             messagebox.showerror("FortiPass® - Error", "The program faced an issue that stopped it from closing properly!")
             sys.exit(1)
         finally:
@@ -627,9 +713,28 @@ class PasswordGeneratorApp:
             self.locker.unlock_instance()
 
 
-# Utworzenie głównego okna aplikacji
-if __name__ == "__main__":
+def main():
+    """Punkt wejścia programu: GUI lub tryb wiersza poleceń (np. 'fortipass gen')"""
+    if len(sys.argv) > 1:
+        from cli import run_cli
+        sys.exit(run_cli(sys.argv[1:]))
+
+    # Program już działa: pokaż jego okno zamiast uruchamiać kolejną instancję
+    if forward_request({"command": "raise"}) is not None:
+        sys.exit(0)
+
+    root, app = create_window()
+    root.mainloop()
+
+
+def create_window():
+    """Tworzy główne okno aplikacji (import Tk dopiero w trybie graficznym)"""
+    _load_tk()
     root = tk.Tk()
     app = PasswordGeneratorApp(root)
     root.protocol("WM_DELETE_WINDOW", app.shutdown_program)
-    root.mainloop()
+    return root, app
+
+
+if __name__ == "__main__":
+    main()
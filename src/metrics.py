@@ -0,0 +1,290 @@
+# fortipass/metrics.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, json, time, atexit, logging, functools, threading
+from bisect import bisect_left
+from contextlib import nullcontext
+from pathlib import Path
+from paths import default_cache_dir, temp_path
+
+
+# Pomiar czasu operacji (FORTIPASS_METRICS=1); bez niego span() i @timed kosztują jedno sprawdzenie flagi
+METRICS_ENV = "FORTIPASS_METRICS"
+
+# Zapis histogramów przy zakończeniu programu (.json - migawka JSON, inne rozszerzenia - format Prometheus)
+METRICS_FILE_ENV = "FORTIPASS_METRICS_FILE"
+
+# Profil cProfile jednej operacji: nazwa pomiaru (lub * - dowolny) i opcjonalny próg czasu
+PROFILE_ENV = "FORTIPASS_PROFILE"
+PROFILE_MIN_MS_ENV = "FORTIPASS_PROFILE_MIN_MS"
+
+# Górne granice przedziałów histogramu (sekundy, jak w konwencji Prometheus); ostatni przedział - powyżej
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+NULL_SPAN = nullcontext()
+
+
+def env_enabled(name):
+    return os.environ.get(name, "").lower() in ("1", "true", "yes", "on")
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "errors", "total", "max")
+
+    def __init__(self):
+        """Liczniki przedziałów czasu trwania jednej operacji (pamięć stała, niezależna od liczby pomiarów)"""
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self):
+        return {"count": self.count, "errors": self.errors, "sum": self.total, "max": self.max,
+                "buckets": list(self.counts)}
+
+
+class Span:
+    __slots__ = ("metrics", "name", "start", "profiler")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.profiler = None
+
+    def __enter__(self):
+        if self.metrics.profile_target is not None:
+            self.profiler = self.metrics._start_profile(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        seconds = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.metrics._finish_profile(self.name, self.profiler, seconds)
+        if self.metrics.enabled:
+            self.metrics.observe(self.name, seconds, failed=kind is not None)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        """Histogramy czasu trwania i liczniki w pamięci procesu (wątki robocze i wątek Tk)"""
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.started = time.time()
+        self.profile_target = None  # nazwa pomiaru do profilowania (None - profilowanie wyłączone)
+        self.profile_path = None
+        self.profile_min_seconds = 0.0
+        self.profiling = False
+        self.last_profile = None
+
+    def span(self, name):
+        """Kontekst mierzący czas bloku: with metrics.span("gui.generate_password"): ..."""
+        if not self.enabled and self.profile_target is None:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def timed(self, name):
+        """Dekorator mierzący czas wywołań funkcji (flaga sprawdzana przy każdym wywołaniu)"""
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled and self.profile_target is None:
+                    return function(*args, **kwargs)
+                with Span(self, name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def observe(self, name, seconds, failed=False):
+        """Dodaje pomiar (np. czas zmierzony poza span - od kliknięcia do pokazania okna)"""
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+            if failed:
+                histogram.errors += 1
+
+    def increment(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """Migawka JSON: przedziały (nieskumulowane, ostatni - powyżej BUCKETS[-1]), sumy, maksima i liczniki"""
+        with self.lock:
+            return {"enabled": self.enabled, "started": self.started, "time": time.time(), "buckets": list(BUCKETS),
+                    "spans": {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+                    "counters": dict(sorted(self.counters.items()))}
+
+    def write(self, path):
+        """Zapis atomowy migawki: .json - JSON, w przeciwnym razie format tekstowy Prometheus"""
+        path = Path(path)
+        snapshot = self.snapshot()
+        text = json.dumps(snapshot, indent=1) + "\n" if path.suffix == ".json" else format_prometheus(snapshot)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = temp_path(path)
+        try:
+            with open(temp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temp, path)
+        except BaseException:
+            temp.unlink(missing_ok=True)
+            raise
+        return path
+
+    def profile_next(self, name=None, path=None, min_seconds=0.0):
+        """Profiluje (cProfile) najbliższą operację name (None - dowolną) trwającą co najmniej min_seconds;
+        profil zapisywany do path (domyślnie w katalogu pamięci podręcznej)"""
+        with self.lock:
+            self.profile_path = Path(path) if path else None
+            self.profile_min_seconds = min_seconds
+            self.profile_target = name or "*"
+
+    def cancel_profile(self):
+        with self.lock:
+            self.profile_target = None
+
+    def _start_profile(self, name):
+        """Profiler dla pierwszej pasującej operacji (naraz profilowana jest tylko jedna)"""
+        import cProfile
+
+        with self.lock:
+            if self.profiling or self.profile_target not in (name, "*"):
+                return None
+            self.profiling = True
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # inny profiler aktywny w tym wątku
+            with self.lock:
+                self.profiling = False
+            return None
+        return profiler
+
+    def _finish_profile(self, name, profiler, seconds):
+        profiler.disable()
+        with self.lock:
+            self.profiling = False
+            if seconds < self.profile_min_seconds or self.profile_target is None:
+                return  # operacja za szybka - profilowana będzie kolejna
+            self.profile_target = None
+            path = self.profile_path
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = Path(default_cache_dir()) / "profiles" / f"{name.replace('/', '_')}-{stamp}.prof"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError as e:
+            logging.error("Saving the profile of %s: %s!", name, e)
+            return
+        self.last_profile = path
+        logging.info("The profile of %s (%.1f ms) was saved to %s.", name, seconds * 1000, path)
+
+
+def quantile(span, q, bounds=BUCKETS):
+    """Kwantyl z histogramu (sekundy): górna granica przedziału, w ostatnim przedziale - maksimum"""
+    if not span["count"]:
+        return None
+    rank = q * span["count"]
+    seen = 0
+    for bound, count in zip(bounds, span["buckets"]):
+        seen += count
+        if seen >= rank:
+            return min(bound, span["max"])
+    return span["max"]
+
+
+def describe(snapshot):
+    """Wiersze tabeli (okno wydajności, 'remote metrics'): nazwa, liczba, błędy, średnia, p50, p95, maksimum (ms)"""
+    rows = []
+    bounds = snapshot["buckets"]
+    for name, span in snapshot["spans"].items():
+        count = span["count"]
+        rows.append((name, count, span["errors"], span["sum"] / count * 1000 if count else 0.0,
+                     quantile(span, 0.5, bounds) * 1000, quantile(span, 0.95, bounds) * 1000, span["max"] * 1000))
+    return rows
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_prometheus(snapshot):
+    """Format tekstowy Prometheus (np. dla node_exporter --collector.textfile)"""
+    lines = ["# HELP fortipass_span_duration_seconds Duration of instrumented FortiPass operations.",
+             "# TYPE fortipass_span_duration_seconds histogram"]
+    bounds = snapshot["buckets"]
+    for name, span in snapshot["spans"].items():
+        label = f'span="{_label(name)}"'
+        cumulative = 0
+        for bound, count in zip(bounds, span["buckets"]):
+            cumulative += count
+            lines.append(f'fortipass_span_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'fortipass_span_duration_seconds_bucket{{{label},le="+Inf"}} {span["count"]}')
+        lines.append(f"fortipass_span_duration_seconds_sum{{{label}}} {span['sum']!r}")
+        lines.append(f"fortipass_span_duration_seconds_count{{{label}}} {span['count']}")
+    lines += ["# HELP fortipass_span_errors_total Instrumented operations that raised an exception.",
+              "# TYPE fortipass_span_errors_total counter"]
+    lines += [f'fortipass_span_errors_total{{span="{_label(name)}"}} {span["errors"]}'
+              for name, span in snapshot["spans"].items()]
+    if snapshot["counters"]:
+        lines += ["# HELP fortipass_events_total Counted FortiPass events.", "# TYPE fortipass_events_total counter"]
+        lines += [f'fortipass_events_total{{name="{_label(name)}"}} {value}'
+                  for name, value in snapshot["counters"].items()]
+    return "\n".join(lines) + "\n"
+
+
+# Rejestr procesu (okno i zadania w tle)
+METRICS = Metrics()
+span = METRICS.span
+timed = METRICS.timed
+observe = METRICS.observe
+increment = METRICS.increment
+
+
+def _export_at_exit(path):
+    try:
+        METRICS.write(path)
+    except OSError as e:
+        logging.error("Saving the metrics to %s: %s!", path, e)
+
+
+def configure():
+    """Ustawienia ze zmiennych środowiskowych: pomiar, zapis przy zakończeniu i profil jednej operacji"""
+    METRICS.enabled = env_enabled(METRICS_ENV) or bool(os.environ.get(METRICS_FILE_ENV))
+    export = os.environ.get(METRICS_FILE_ENV)
+    if export:
+        atexit.register(_export_at_exit, export)
+    target = os.environ.get(PROFILE_ENV)
+    if target:
+        try:
+            min_ms = float(os.environ.get(PROFILE_MIN_MS_ENV, 0))
+        except ValueError:
+            raise ValueError(f"{PROFILE_MIN_MS_ENV} must be a number.") from None
+        METRICS.profile_next(None if target == "*" else target, min_seconds=min_ms / 1000)
+    return METRICS
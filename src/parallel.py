@@ -0,0 +1,82 @@
+# fortipass/parallel.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from generator import generate_password, DEFAULT_CHUNK_SIZE
+from entropy import EntropyPool
+
+
+# Maksymalna liczba partii w toku na jeden proces (ogranicza zużycie pamięci)
+IN_FLIGHT_PER_WORKER = 4
+
+# Niezależne źródło losowości tworzone osobno w każdym procesie roboczym
+_worker_rng = None
+
+
+def _init_worker():
+    """Inicjalizacja procesu roboczego: własny CSPRNG"""
+    global _worker_rng
+    _worker_rng = EntropyPool()
+
+
+def _generate_shard(policy, count):
+    """Generuje jedną partię haseł w procesie roboczym"""
+    return [generate_password(policy, _worker_rng) for _ in range(count)]
+
+
+def default_workers():
+    """Domyślna liczba procesów: liczba dostępnych rdzeni"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def shard_sizes(n, chunk_size):
+    """Dzieli zlecenie na partie o rozmiarze co najwyżej chunk_size"""
+    full, rest = divmod(n, chunk_size)
+    for _ in range(full):
+        yield chunk_size
+    if rest:
+        yield rest
+
+
+def iter_passwords_parallel(n, policy, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, ordered=True):
+    """Generator partii haseł z puli procesów (ordered=False: kolejność ukończenia)"""
+    if n < 0:
+        raise ValueError("The number of passwords cannot be negative.")
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be greater than zero.")
+    workers = workers or default_workers()
+    if workers < 1:
+        raise ValueError("The number of workers must be greater than zero.")
+
+    sizes = shard_sizes(n, chunk_size)
+    max_in_flight = workers * IN_FLIGHT_PER_WORKER
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        pending = deque()
+
+        def refill():
+            while len(pending) < max_in_flight:
+                size = next(sizes, None)
+                if size is None:
+                    return
+                pending.append(executor.submit(_generate_shard, policy, size))
+
+        refill()
+        while pending:
+            if ordered:
+                # Stabilna kolejność: zawsze najstarsza partia
+                yield pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+            refill()
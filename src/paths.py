@@ -0,0 +1,19 @@
+# fortipass/paths.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, threading
+from pathlib import Path
+
+
+def default_cache_dir():
+    """Katalog pamięci podręcznej użytkownika (XDG_CACHE_HOME)"""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "fortipass"
+
+
+def temp_path(path):
+    """Plik tymczasowy zapisu atomowego, osobny dla procesu i wątku (indeksy zapisywane także w tle)"""
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
@@ -0,0 +1,551 @@
+# fortipass/patterns.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, re, math, struct, hashlib, threading, logging
+from array import array
+from collections import namedtuple
+from pathlib import Path
+from paths import default_cache_dir, temp_path
+
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+# Słowniki w kolejności popularności (pozycja w pliku = ranga słowa)
+DICTIONARIES = ("passwords", "english", "polish")
+
+CACHE_MAGIC = b"FPTRIE1\0"
+CACHE_HEADER = struct.Struct("<8s32sII")
+
+# Minimalna długość dopasowań (krótsze trafiają się przypadkiem w losowych hasłach)
+MIN_WORD_LENGTH = 4
+MIN_PATTERN_LENGTH = 3
+
+# Minimalna liczba prób dla dowolnego dopasowania (jak w zxcvbn)
+MIN_GUESSES = 50
+
+# Wzorce szukane tylko w początku hasła (jak maxLength w zxcvbn-ts) - koszt oceny ograniczony dla dowolnego wejścia;
+# 64 losowe znaki to ponad 400 bitów, więc dalsze znaki i tak nie zmieniają poziomu
+MAX_PATTERN_LENGTH = 64
+
+# Powtórzenia i sekwencje co najmniej tej długości są tańsze od każdego podziału na słowa i daty - te wzorce
+# (najdroższe: l33t, daty w ciągach cyfr) są szukane tylko poza nimi
+LONG_RUN_LENGTH = 8
+
+# Dłuższe ścieżki klawiatury liczone jak ścieżki tej długości (wynik bez przepełnienia, pętla ograniczona)
+MAX_SPATIAL_LENGTH = 32
+
+REFERENCE_YEAR = 2024
+MIN_YEAR_SPACE = 20
+
+L33T_TABLE = {
+    "4": "a", "@": "a", "8": "b", "(": "c", "{": "c", "[": "c", "<": "c", "3": "e",
+    "6": "g", "9": "g", "1": "il", "!": "i", "|": "il", "7": "lt", "0": "o", "$": "s",
+    "5": "s", "+": "t", "%": "x", "2": "z",
+}
+
+Match = namedtuple("Match", "pattern i j token guesses")
+
+
+class Trie:
+    def __init__(self, first_edge, labels, targets, ranks, sources):
+        """Zwarty trie w układzie CSR: krawędzie węzła n to labels[first_edge[n]:first_edge[n + 1]]"""
+        self.first_edge = first_edge
+        self.labels = labels
+        self.targets = targets
+        self.ranks = ranks
+        self.sources = sources
+
+    @classmethod
+    def build(cls, wordlists):
+        """Buduje trie z list słów (ranga = pozycja na liście, wygrywa najniższa)"""
+        root = {}
+        best = {}
+        for source, words in enumerate(wordlists):
+            for rank, word in enumerate(words, 1):
+                if word not in best or rank < best[word][0]:
+                    best[word] = (rank, source)
+
+        for word in best:
+            node = root
+            for byte in word.encode("ascii"):
+                node = node.setdefault(byte, {})
+            node[None] = best[word]
+
+        # Numeracja węzłów w kolejności BFS i spłaszczenie do tablic
+        first_edge, targets = array("I"), array("I")
+        ranks, sources, labels = array("I"), bytearray(), bytearray()
+        queue, head = [root], 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            first_edge.append(len(labels))
+            rank, source = node.get(None, (0, 0))
+            ranks.append(rank)
+            sources.append(source)
+            for byte in sorted(k for k in node if k is not None):
+                labels.append(byte)
+                targets.append(len(queue))
+                queue.append(node[byte])
+        first_edge.append(len(labels))
+        return cls(first_edge, bytes(labels), targets, ranks, bytes(sources))
+
+    def to_bytes(self, digest):
+        """Serializacja do postaci binarnej (nagłówek + tablice)"""
+        header = CACHE_HEADER.pack(CACHE_MAGIC, digest, len(self.ranks), len(self.labels))
+        return b"".join([header, self.first_edge.tobytes(), self.targets.tobytes(),
+                         self.ranks.tobytes(), self.labels, self.sources])
+
+    @classmethod
+    def from_bytes(cls, data, digest):
+        """Odczyt postaci binarnej; None, gdy plik jest nieaktualny lub uszkodzony"""
+        if len(data) < CACHE_HEADER.size:
+            return None
+        magic, stored, nodes, edges = CACHE_HEADER.unpack_from(data)
+        if magic != CACHE_MAGIC or stored != digest:
+            return None
+
+        offset = CACHE_HEADER.size
+        arrays = []
+        for count in (nodes + 1, edges, nodes):
+            values = array("I")
+            size = count * values.itemsize
+            values.frombytes(data[offset:offset + size])
+            arrays.append(values)
+            offset += size
+        labels = data[offset:offset + edges]
+        sources = data[offset + edges:offset + edges + nodes]
+        if len(sources) != nodes:
+            return None
+        first_edge, targets, ranks = arrays
+        return cls(first_edge, labels, targets, ranks, sources)
+
+    def child(self, node, byte):
+        """Węzeł potomny dla danego bajtu albo -1"""
+        index = self.labels.find(byte, self.first_edge[node], self.first_edge[node + 1])
+        return self.targets[index] if index >= 0 else -1
+
+
+def _read_wordlists():
+    """Listy słów z katalogu data/ oraz ich skrót (klucz pamięci podręcznej)"""
+    digest = hashlib.sha256(CACHE_MAGIC)
+    wordlists = []
+    for name in DICTIONARIES:
+        raw = (DATA_DIR / f"{name}.txt").read_bytes()
+        digest.update(raw)
+        words = [w.strip().lower() for w in raw.decode("ascii").splitlines()]
+        wordlists.append([w for w in words if w])
+    return wordlists, digest.digest()
+
+
+def load_trie(cache_dir=None):
+    """Wczytuje trie z pliku binarnego lub buduje go i zapisuje (zapis atomowy)"""
+    wordlists, digest = _read_wordlists()
+    cache_file = Path(cache_dir or default_cache_dir()) / "dictionaries.trie"
+
+    try:
+        trie = Trie.from_bytes(cache_file.read_bytes(), digest)
+        if trie is not None:
+            return trie
+    except OSError:
+        pass
+
+    trie = Trie.build(wordlists)
+    temp_file = temp_path(cache_file)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file.write_bytes(trie.to_bytes(digest))
+        os.replace(temp_file, cache_file)
+    except OSError as e:
+        temp_file.unlink(missing_ok=True)
+        logging.warning("The dictionary cache could not be saved: %s.", e)
+    return trie
+
+
+def _build_keyboard(rows, slanted):
+    """Graf sąsiedztwa klawiatury: znak -> lista (klawisz sąsiada lub None) wg kierunku"""
+    positions = {}
+    for y, row in enumerate(rows):
+        offset = 0 if y == 0 or not slanted else 1
+        for x, key in enumerate(row.split()):
+            positions[(x + offset, y)] = key
+
+    if slanted:
+        directions = [(-1, 0), (0, -1), (1, -1), (1, 0), (0, 1), (-1, 1)]
+    else:
+        directions = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1)]
+
+    graph = {}
+    for (x, y), key in positions.items():
+        neighbours = [positions.get((x + dx, y + dy)) for dx, dy in directions]
+        for char in key:
+            graph[char] = neighbours
+    return graph
+
+
+QWERTY = _build_keyboard([
+    "`~ 1! 2@ 3# 4$ 5% 6^ 7& 8* 9( 0) -_ =+",
+    "qQ wW eE rR tT yY uU iI oO pP [{ ]} \\|",
+    "aA sS dD fF gG hH jJ kK lL ;: '\"",
+    "zZ xX cC vV bB nN mM ,< .> /?",
+], slanted=True)
+
+KEYPAD = _build_keyboard([
+    "/ * -",
+    "7 8 9 +",
+    "4 5 6",
+    "1 2 3",
+    "0 .",
+], slanted=False)
+
+
+def _average_degree(graph):
+    """Średnia liczba sąsiadów klawisza"""
+    return sum(sum(1 for n in ns if n) for ns in graph.values()) / len(graph)
+
+
+def _steps(graph):
+    """Ruchy po klawiaturze: znak -> {następny znak: (kierunek, z Shift)} (pierwszy pasujący kierunek)"""
+    steps = {}
+    for char, neighbours in graph.items():
+        moves = steps[char] = {}
+        for direction, key in enumerate(neighbours):
+            for index, target in enumerate(key or ""):
+                moves.setdefault(target, (direction, index == 1))
+    return steps
+
+
+NO_STEPS = {}
+
+KEYBOARDS = [
+    (_steps(QWERTY), len({id(v) for v in QWERTY.values()}), _average_degree(QWERTY)),
+    (_steps(KEYPAD), len(KEYPAD), _average_degree(KEYPAD)),
+]
+
+DATE_SEPARATOR_RE = re.compile(r"(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})")
+DATE_SPLITS = {
+    4: [(1, 2), (2, 3)],
+    5: [(1, 3), (2, 3)],
+    6: [(1, 2), (2, 4), (4, 5)],
+    7: [(1, 3), (2, 3), (4, 5), (4, 6)],
+    8: [(2, 4), (4, 6)],
+}
+YEAR_RE = re.compile(r"19\d\d|20\d\d")
+DIGITS_RE = re.compile(r"\d{4,}")
+REPEAT_RE = re.compile(r"(.+?)\1+")
+
+
+class PatternMatcher:
+    def __init__(self, trie):
+        """Wyszukiwanie wzorców w stylu zxcvbn na skompilowanym trie słowników"""
+        self.trie = trie
+
+    # --- słowniki ---------------------------------------------------------
+
+    def _dictionary(self, password, reverse=False):
+        """Słowa ze słowników, także z podstawieniami l33t i (reverse) pisane wspak"""
+        trie = self.trie
+        text = password[::-1] if reverse else password
+        lowered = text.lower()
+        n = len(text)
+        matches = []
+
+        # Kandydaci każdej pozycji wyznaczani raz (nie w każdym kroku przeszukiwania)
+        options = [_OPTIONS[char] if char in _OPTIONS else _char_options(char) for char in lowered]
+
+        labels, first_edge, targets, ranks = trie.labels, trie.first_edge, trie.targets, trie.ranks
+        root_start, root_end = first_edge[0], first_edge[1]
+        for i in range(n):
+            # Przeszukiwanie w głąb: (węzeł, pozycja, liczba podstawień l33t); pierwszy krok bez stosu -
+            # w losowym haśle większość pozycji kończy się na nim
+            stack = [(targets[index], i + 1, sub) for byte, sub in options[i]
+                     if (index := labels.find(byte, root_start, root_end)) >= 0]
+            while stack:
+                node, j, subs = stack.pop()
+                if j >= n:
+                    continue
+                start, end = first_edge[node], first_edge[node + 1]
+                for byte, sub in options[j]:
+                    index = labels.find(byte, start, end)
+                    if index < 0:
+                        continue
+                    target = targets[index]
+                    rank = ranks[target]
+                    if rank and j - i + 1 >= MIN_WORD_LENGTH:
+                        token = text[i:j + 1]
+                        guesses = rank * _uppercase_variations(token) * _l33t_variations(subs + sub)
+                        if reverse:
+                            guesses *= 2
+                            matches.append(Match("dictionary", n - 1 - j, n - 1 - i, token[::-1], guesses))
+                        else:
+                            matches.append(Match("dictionary", i, j, token, guesses))
+                    stack.append((target, j + 1, subs + sub))
+        return matches
+
+    # --- klawiatura -------------------------------------------------------
+
+    def _spatial(self, password):
+        """Ścieżki po sąsiednich klawiszach (qwerty i klawiatura numeryczna)"""
+        matches = []
+        for steps, starts, degree in KEYBOARDS:
+            # Ruch między każdą parą sąsiednich znaków (None - klawisze nie sąsiadują); ścieżki to serie ruchów
+            moves = [steps.get(a, NO_STEPS).get(b) for a, b in zip(password, password[1:])]
+            i, count = 0, len(moves)
+            while i < count:
+                if moves[i] is None:
+                    i += 1
+                    continue
+                j, turns, shifted, direction = i, 0, 0, None
+                while j < count and moves[j] is not None:
+                    found, shift = moves[j]
+                    shifted += shift
+                    if found != direction:
+                        turns += 1
+                        direction = found
+                    j += 1
+                # Klawisze i..j (j - i ruchów)
+                if j - i + 1 >= MIN_PATTERN_LENGTH:
+                    token = password[i:j + 1]
+                    guesses = _spatial_guesses(len(token), turns, shifted, starts, degree)
+                    matches.append(Match("spatial", i, j, token, guesses))
+                i = j
+        return matches
+
+    # --- sekwencje, powtórzenia, daty ---------------------------------------
+
+    def _sequences(self, password):
+        """Ciągi o stałym kroku (abc, 1357, zyx) w obrębie jednej klasy znaków"""
+        matches = []
+        n = len(password)
+        i = 0
+        while i < n - 1:
+            delta = ord(password[i + 1]) - ord(password[i])
+            j = i + 1
+            while j + 1 < n and ord(password[j + 1]) - ord(password[j]) == delta:
+                j += 1
+            token = password[i:j + 1]
+            if 0 < abs(delta) <= 5 and len(token) >= MIN_PATTERN_LENGTH and _same_class(token):
+                first = token[0]
+                if first in "aAzZ019":
+                    base = 4
+                elif first.isdigit():
+                    base = 10
+                else:
+                    base = 26
+                guesses = base * len(token) * (2 if delta < 0 else 1)
+                matches.append(Match("sequence", i, j, token, guesses))
+            i = j
+        return matches
+
+    def _repeats(self, password):
+        """Powtórzenia fragmentu (aaa, abcabc)"""
+        matches = []
+        if not _may_repeat(password):
+            return matches
+        for found in REPEAT_RE.finditer(password):
+            token = found.group(0)
+            if len(token) < MIN_PATTERN_LENGTH:
+                continue
+            unit = found.group(1)
+            count = len(token) // len(unit)
+            base = 2 ** self.guess_bits(unit) if len(unit) > 1 else 10
+            matches.append(Match("repeat", found.start(), found.end() - 1, token, base * count))
+        return matches
+
+    def _dates(self, password):
+        """Daty z separatorami i bez, oraz same lata (19xx, 20xx)"""
+        matches = []
+        for found in YEAR_RE.finditer(password):
+            year = int(found.group(0))
+            matches.append(Match("date", found.start(), found.end() - 1, found.group(0), _year_space(year)))
+
+        for run in DIGITS_RE.finditer(password):
+            digits, offset, n = run.group(0), run.start(), len(run.group(0))
+            # Wartości fragmentów 1-4 cyfr od każdej pozycji (bez int() dla każdego podziału)
+            values = [None] + [[int(digits[k:k + size]) for k in range(n)] for size in range(1, 5)]
+            for i in range(n - 3):
+                for length in range(4, min(8, n - i) + 1):
+                    for a, b in DATE_SPLITS[length]:
+                        first, middle, last = values[a][i], values[b - a][i + a], values[length - b][i + b]
+                        if not (0 < middle <= 12 or 0 < first <= 12):
+                            continue  # brak miesiąca w żadnym z układów
+                        year = _plausible_date(first, middle, last)
+                        if year is not None:
+                            matches.append(Match("date", offset + i, offset + i + length - 1,
+                                                 digits[i:i + length], 365 * _year_space(year)))
+                            break
+
+        for found in DATE_SEPARATOR_RE.finditer(password):
+            year = _plausible_date(int(found.group(1)), int(found.group(3)), int(found.group(4)))
+            if year is not None:
+                matches.append(Match("date", found.start(), found.end() - 1, found.group(0),
+                                     365 * _year_space(year) * 4))
+        return matches
+
+    # --- ocena --------------------------------------------------------------
+
+    def matches(self, password):
+        """Wszystkie znalezione wzorce; słowa i daty szukane tylko poza długimi powtórzeniami i sekwencjami"""
+        runs = self._sequences(password) + self._repeats(password)
+        found = runs + self._spatial(password)
+        pieces, start = [], 0
+        for run in sorted(runs, key=lambda match: match.i):
+            if run.j - run.i + 1 >= LONG_RUN_LENGTH:
+                pieces.append((start, run.i))
+                start = max(start, run.j + 1)
+        pieces.append((start, len(password)))
+        for start, end in pieces:
+            if start < end:
+                piece = password[start:end]
+                inner = self._dictionary(piece) + self._dictionary(piece, reverse=True) + self._dates(piece)
+                found += [match._replace(i=match.i + start, j=match.j + start) for match in inner] if start else inner
+        return found
+
+    def guess_bits(self, password, pool_bits=None):
+        """log2 liczby prób dla najlepszego podziału hasła na wzorce i fragmenty losowe"""
+        bits, _ = self.analyze(password, pool_bits)
+        return bits
+
+    def analyze(self, password, pool_bits=None):
+        """Zwraca (bity, lista dopasowań na optymalnej ścieżce)"""
+        n = len(password)
+        if not n:
+            return 0.0, []
+        if pool_bits is None:
+            from strength import POOL_BITS, class_mask
+            pool_bits = POOL_BITS[class_mask(password)]
+
+        ending = [[] for _ in range(n)]
+        for match in self.matches(password):
+            ending[match.j].append(match)
+
+        # Programowanie dynamiczne po pozycjach: (bity, liczba segmentów, ścieżka)
+        best = [(0.0, 0, None)] + [None] * n
+        for j in range(n):
+            bits, segments, path = best[j]
+            # Znak losowy: kolejne znaki losowe tworzą jeden segment
+            joined = path is not None and path[0] is None
+            candidate = (bits + pool_bits, segments + (0 if joined else 1), (None, path))
+            for match in ending[j]:
+                prev_bits, prev_segments, prev_path = best[match.i]
+                cost = prev_bits + math.log2(max(match.guesses, MIN_GUESSES))
+                if cost < candidate[0]:
+                    candidate = (cost, prev_segments + 1, (match, prev_path))
+            best[j + 1] = candidate
+
+        bits, segments, path = best[n]
+        sequence = []
+        while path is not None:
+            if path[0] is not None:
+                sequence.append(path[0])
+            path = path[1]
+        sequence.reverse()
+
+        # Kara za kolejność segmentów (log2 silni liczby segmentów)
+        if sequence:
+            bits += math.lgamma(segments + 1) / math.log(2)
+        return min(bits, n * pool_bits), sequence
+
+
+def _may_repeat(password):
+    """Szybki warunek konieczny powtórzenia (wyrażenie REPEAT_RE jest kwadratowe względem długości): dla
+    fragmentu długości u - seria równych znaków w odstępie u (XOR tekstu z przesuniętą kopią)"""
+    n = len(password)
+    try:
+        data, width = password.encode("latin-1"), 1
+    except UnicodeEncodeError:
+        data, width = password.encode("utf-32-le", "surrogatepass"), 4  # bajty spoza UTF-8 z audytu (surrogateescape)
+    value = int.from_bytes(data, "little")
+    for unit in range(1, n // 2 + 1):
+        run = max(unit, MIN_PATTERN_LENGTH - unit)  # wymagane równe pary (powtórzenie ma >= 3 znaki)
+        if unit + run > n:
+            break
+        equal = (value ^ (value >> (8 * width * unit))).to_bytes(len(data), "little")[:width * (n - unit)]
+        if b"\0" * (width * run) in equal:
+            return True
+    return False
+
+
+_OPTIONS = {}
+
+
+def _char_options(char):
+    """Kandydaci dla znaku (małej litery): (bajt litery lub cyfry, czy podstawienie l33t)"""
+    options = _OPTIONS[char] = [(ord(candidate), sub) for candidate, sub in
+                                [(char, 0)] + [(c, 1) for c in L33T_TABLE.get(char, "")]
+                                if "a" <= candidate <= "z" or "0" <= candidate <= "9"]
+    return options
+
+
+def _same_class(token):
+    """Czy wszystkie znaki należą do tej samej klasy (małe, wielkie, cyfry)"""
+    return token.islower() or token.isupper() or token.isdigit()
+
+
+def _uppercase_variations(token):
+    """Mnożnik prób dla wielkich liter w słowie"""
+    if token.islower() or not any(c.isalpha() for c in token):
+        return 1
+    if token.isupper() or (token[0].isupper() and token[1:].islower()) or (token[-1].isupper() and token[:-1].islower()):
+        return 2
+    upper = sum(c.isupper() for c in token)
+    lower = sum(c.islower() for c in token)
+    return sum(math.comb(upper + lower, k) for k in range(1, min(upper, lower) + 1))
+
+
+def _l33t_variations(substitutions):
+    """Mnożnik prób dla podstawień l33t"""
+    return 2 ** substitutions if substitutions else 1
+
+
+def _spatial_guesses(length, turns, shifted, starts, degree):
+    """Liczba prób dla ścieżki klawiatury (formuła zxcvbn; długość ograniczona do MAX_SPATIAL_LENGTH)"""
+    if length > MAX_SPATIAL_LENGTH:
+        shifted = shifted * MAX_SPATIAL_LENGTH // length
+        length = MAX_SPATIAL_LENGTH
+    turns = min(turns, length - 1)
+    guesses = 0.0
+    for i in range(2, length + 1):
+        if turns >= i - 1:
+            # Wszystkie liczby zwrotów: suma C(i-1, t-1) * d^t w postaci zamkniętej d * ((1 + d)^(i-1) - d^(i-1))
+            guesses += starts * degree * ((1 + degree) ** (i - 1) - degree ** (i - 1))
+        else:
+            guesses += starts * sum(math.comb(i - 1, t - 1) * degree ** t for t in range(1, turns + 1))
+    if shifted:
+        unshifted = length - shifted
+        if not unshifted:
+            guesses *= 2
+        else:
+            guesses *= sum(math.comb(length, k) for k in range(1, min(shifted, unshifted) + 1))
+    return guesses
+
+
+def _year_space(year):
+    """Liczba lat do sprawdzenia przez atakującego"""
+    return max(abs(year - REFERENCE_YEAR), MIN_YEAR_SPACE)
+
+
+def _plausible_date(a, b, c):
+    """Rok prawdopodobnej daty (d-m-r, r-m-d, m-d-r) albo None"""
+    for day, month, year in ((a, b, c), (c, b, a), (b, a, c)):
+        if year < 100:
+            year += 2000 if year <= REFERENCE_YEAR % 100 else 1900
+        if 1 <= month <= 12 and 1 <= day <= 31 and 1900 <= year <= 2050:
+            return year
+    return None
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher():
+    """Leniwie tworzony, współdzielony obiekt PatternMatcher (trie wczytywany przy pierwszym użyciu)"""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                _matcher = PatternMatcher(load_trie())
+    return _matcher
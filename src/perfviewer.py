@@ -0,0 +1,109 @@
+# fortipass/perfviewer.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import logging
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from metrics import METRICS, describe
+
+
+# Okres odświeżania tabeli (ms)
+REFRESH_MS = 1000
+
+COLUMNS = (("span", "Operation", 220), ("count", "Count", 70), ("errors", "Errors", 60), ("mean", "Mean ms", 80),
+           ("p50", "p50 ms", 80), ("p95", "p95 ms", 80), ("max", "Max ms", 80))
+
+
+class PerformanceWindow:
+    def __init__(self, master, metrics=METRICS, title="FortiPass® - Performance"):
+        """Okno z histogramami czasu operacji: tabela odświeżana co sekundę, eksport i profil jednej operacji"""
+        self.metrics = metrics
+        self.refresh_job = None
+
+        self.window = tk.Toplevel(master)
+        self.window.title(title)
+        self.window.geometry("720x360")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = tk.Frame(self.window)
+        toolbar.pack(fill="x", padx=10, pady=(10, 0))
+        self.enabled = tk.BooleanVar(value=metrics.enabled)
+        tk.Checkbutton(toolbar, text="Record timings", variable=self.enabled,
+                       command=self.toggle).pack(side="left")
+        tk.Button(toolbar, text="Reset", width=8, command=self.reset).pack(side="left", padx=5)
+        tk.Button(toolbar, text="Export...", width=10, command=self.export).pack(side="left")
+        tk.Button(toolbar, text="Profile next action", command=self.profile).pack(side="left", padx=5)
+        self.min_ms = tk.StringVar(value="0")
+        tk.Label(toolbar, text="slower than (ms):").pack(side="left")
+        tk.Entry(toolbar, textvariable=self.min_ms, width=6, justify="right").pack(side="left", padx=5)
+
+        frame = tk.Frame(self.window)
+        frame.pack(fill="both", expand=True, padx=10, pady=10)
+        self.table = ttk.Treeview(frame, columns=[name for name, _, _ in COLUMNS], show="headings")
+        for name, heading, width in COLUMNS:
+            self.table.heading(name, text=heading)
+            self.table.column(name, width=width, anchor="w" if name == "span" else "e")
+        scrollbar = tk.Scrollbar(frame, orient="vertical", command=self.table.yview)
+        self.table.config(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.table.pack(side="left", fill="both", expand=True)
+
+        self.status = tk.Label(self.window, anchor="w", font=("Courier", 10))
+        self.status.pack(fill="x", padx=10, pady=(0, 10))
+        self.refresh()
+
+    def close(self):
+        if self.refresh_job is not None:
+            self.window.after_cancel(self.refresh_job)
+        self.window.destroy()
+
+    def refresh(self):
+        """Przebudowa tabeli z migawki (kilkanaście wierszy - koszt pomijalny)"""
+        snapshot = self.metrics.snapshot()
+        self.table.delete(*self.table.get_children())
+        for name, count, errors, mean, p50, p95, peak in describe(snapshot):
+            self.table.insert("", "end", values=(name, count, errors, f"{mean:.2f}", f"{p50:.2f}", f"{p95:.2f}",
+                                                 f"{peak:.2f}"))
+        if self.metrics.profile_target is not None:
+            status = "Waiting for the next action to profile..."
+        elif self.metrics.last_profile is not None:
+            status = f"Last profile: {self.metrics.last_profile}"
+        elif not self.metrics.enabled:
+            status = "Timings are not recorded (enable them above or set FORTIPASS_METRICS=1)."
+        else:
+            status = f"{len(snapshot['spans'])} operations measured."
+        self.status.config(text=status)
+        self.refresh_job = self.window.after(REFRESH_MS, self.refresh)
+
+    def toggle(self):
+        self.metrics.enabled = self.enabled.get()
+        logging.info("Recording of operation timings was %s.", "enabled" if self.metrics.enabled else "disabled")
+
+    def reset(self):
+        self.metrics.reset()
+
+    def export(self):
+        """Zapis migawki: format według rozszerzenia (.json lub tekstowy Prometheus .prom)"""
+        path = filedialog.asksaveasfilename(parent=self.window, title="Export metrics", defaultextension=".prom",
+                                            filetypes=[("Prometheus text", "*.prom"), ("JSON snapshot", "*.json")])
+        if not path:
+            return
+        try:
+            self.metrics.write(path)
+            logging.info("The metrics were exported to %s.", path)
+        except OSError as e:
+            logging.error("Exporting the metrics: %s!", e)
+            messagebox.showerror("FortiPass® - Error", "The metrics could not be saved!", parent=self.window)
+
+    def profile(self):
+        try:
+            min_ms = float(self.min_ms.get() or 0)
+        except ValueError:
+            messagebox.showerror("FortiPass® - Error", "The threshold must be a number of milliseconds.",
+                                 parent=self.window)
+            return
+        self.metrics.profile_next(min_seconds=min_ms / 1000)
+        logging.info("The next action slower than %s ms will be profiled.", min_ms)
@@ -0,0 +1,217 @@
+# fortipass/server.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import asyncio, json, logging
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+from generator import get_policy, generate_password, DEFAULT_LENGTH
+from parallel import _init_worker, _generate_shard, default_workers, shard_sizes
+from strength import evaluate_many
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+MAX_COUNT = 100_000  # hasła w jednym żądaniu /generate
+MAX_BODY = 1 << 20  # treść żądania /strength
+MAX_PASSWORD = 256  # dłuższe hasła odrzucane przez /strength (koszt oceny rośnie z długością)
+MAX_HEADERS = 100
+
+# Małe partie liczone w pętli zdarzeń (koszt IPC większy niż obliczeń), duże w puli procesów
+INLINE_GENERATE = 64
+INLINE_STRENGTH = 128  # łączna liczba znaków ocenianych haseł (do kilku ms w pętli zdarzeń)
+SHARD_SIZE = 5000
+
+CLASS_NAMES = ("letters", "digits", "special")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+def _strength_batch(passwords):
+    """Ocena partii haseł (wywoływana w procesie roboczym)"""
+    return [{"bits": round(bits, 2), "tier": tier} for bits, tier in evaluate_many(passwords)]
+
+
+def parse_classes(value):
+    """Klasy znaków z parametru 'classes' (np. 'letters,digits')"""
+    if value is None:
+        return True, True, True
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - set(CLASS_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown character classes: {', '.join(sorted(unknown))}.")
+    return tuple(name in names for name in CLASS_NAMES)
+
+
+def _int_param(query, name, default):
+    try:
+        return int(query.get(name, [default])[0])
+    except ValueError:
+        raise ValueError(f"The '{name}' parameter must be an integer.") from None
+
+
+class PasswordService:
+    def __init__(self, workers=None):
+        """Usługa HTTP/JSON: /generate i /strength, ciężkie partie w puli procesów"""
+        self.workers = workers or default_workers()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self.routes = {"/generate": self.generate, "/strength": self.strength, "/health": self.health}
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def generate(self, method, query, body):
+        """GET /generate?count=&length=&classes= - partia haseł"""
+        if method != "GET":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+        count = _int_param(query, "count", 1)
+        length = _int_param(query, "length", DEFAULT_LENGTH)
+        if not 1 <= count <= MAX_COUNT:
+            raise ValueError(f"The 'count' parameter must be between 1 and {MAX_COUNT}.")
+        policy = get_policy(length, *parse_classes(query.get("classes", [None])[0]))
+
+        if count <= INLINE_GENERATE:
+            passwords = [generate_password(policy) for _ in range(count)]
+        else:
+            shard = min(SHARD_SIZE, -(-count // self.workers))
+            shards = await asyncio.gather(*(self._run(_generate_shard, policy, size)
+                                            for size in shard_sizes(count, shard)))
+            passwords = [password for chunk in shards for password in chunk]
+        return {"passwords": passwords}
+
+    async def strength(self, method, query, body):
+        """POST /strength {"passwords": [...]} lub GET /strength?password= - ocena siły"""
+        if method == "GET":
+            passwords = query.get("password", [])
+        elif method == "POST":
+            try:
+                passwords = json.loads(body)["passwords"]
+            except (ValueError, KeyError, TypeError):
+                raise ValueError("The request body must be a JSON object with a 'passwords' list.") from None
+            if not isinstance(passwords, list) or not all(isinstance(p, str) for p in passwords):
+                raise ValueError("The 'passwords' field must be a list of strings.")
+        else:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+        if any(len(password) > MAX_PASSWORD for password in passwords):
+            raise ValueError(f"Passwords longer than {MAX_PASSWORD} characters are not evaluated.")
+
+        if sum(map(len, passwords)) <= INLINE_STRENGTH:
+            results = _strength_batch(passwords)
+        else:
+            shard = max(1, -(-len(passwords) // self.workers))
+            parts = await asyncio.gather(*(self._run(_strength_batch, passwords[i:i + shard])
+                                           for i in range(0, len(passwords), shard)))
+            results = [result for part in parts for result in part]
+        return {"results": results}
+
+    async def health(self, method, query, body):
+        return {"status": "ok", "workers": self.workers}
+
+    async def dispatch(self, method, target, body):
+        """Wywołuje obsługę ścieżki; zwraca (status, obiekt JSON)"""
+        url = urlsplit(target)
+        handler = self.routes.get(url.path)
+        try:
+            if handler is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND)
+            return HTTPStatus.OK, await handler(method, parse_qs(url.query), body)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+
+    async def handle_connection(self, reader, writer):
+        """Połączenie HTTP/1.1 z keep-alive: kolejne żądania obsługiwane po kolei"""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                status, payload = await self.dispatch(method, target, body)
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            self._write_response(writer, e.status, {"error": str(e)}, False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logging.error("Serving a request: %s!", e)
+            self._write_response(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal error."}, False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """Linia żądania, nagłówki i treść (Content-Length); None po zamknięciu połączenia"""
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line.") from None
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.") from None
+        if length > MAX_BODY:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b""
+        return method, target, version, headers, body
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+
+
+async def start(service, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None):
+    """Uruchamia serwer TCP lub na gnieździe Unix"""
+    if unix_socket:
+        return await asyncio.start_unix_server(service.handle_connection, path=unix_socket)
+    return await asyncio.start_server(service.handle_connection, host, port)
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None, workers=None, ready=None):
+    """Obsługuje żądania do przerwania; ready(adres) wywoływane po otwarciu gniazda"""
+    service = PasswordService(workers)
+    try:
+        server = await start(service, host, port, unix_socket)
+        async with server:
+            address = unix_socket or "http://%s:%d" % server.sockets[0].getsockname()[:2]
+            if ready:
+                ready(address)
+            await server.serve_forever()
+    finally:
+        service.close()
@@ -0,0 +1,118 @@
+# fortipass/strength.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import math, string
+from patterns import get_matcher, MAX_PATTERN_LENGTH
+from breach import default_checker
+
+# NumPy jest opcjonalny - przyspiesza audyt dużych zbiorów haseł
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Klasy znaków jako bity maski
+LOWER, UPPER, DIGIT, SPECIAL, OTHER = 1, 2, 4, 8, 16
+
+# Liczba znaków w każdej klasie (OTHER: spacja i znaki spoza ASCII - przybliżenie)
+CLASS_SIZES = {LOWER: 26, UPPER: 26, DIGIT: 10, SPECIAL: len(string.punctuation), OTHER: 128}
+
+# Progi siły hasła w bitach entropii
+MEDIUM_BITS = 45
+STRONG_BITS = 72
+
+TIER_COLORS = {"weak": "red", "medium": "orange", "strong": "green"}
+
+
+def _build_class_table():
+    """Tablica 256 wpisów: bajt -> bit klasy znaku (bajty UTF-8 >= 128 to OTHER)"""
+    table = bytearray([OTHER] * 256)
+    for c in string.ascii_lowercase:
+        table[ord(c)] = LOWER
+    for c in string.ascii_uppercase:
+        table[ord(c)] = UPPER
+    for c in string.digits:
+        table[ord(c)] = DIGIT
+    for c in string.punctuation:
+        table[ord(c)] = SPECIAL
+    return bytes(table)
+
+
+CLASS_TABLE = _build_class_table()
+
+# log2 rozmiaru puli dla każdej z 32 możliwych masek klas
+POOL_BITS = tuple(
+    math.log2(sum(size for bit, size in CLASS_SIZES.items() if mask & bit)) if mask else 0.0
+    for mask in range(32)
+)
+
+
+def class_mask(password):
+    """Maska klas znaków wyznaczona w jednym przebiegu (translate w C)"""
+    mask = 0
+    for bit in set(password.encode("utf-8", "surrogateescape").translate(CLASS_TABLE)):
+        mask |= bit
+    return mask
+
+
+def tier(bits):
+    """Poziom siły hasła dla podanej entropii"""
+    if bits >= STRONG_BITS:
+        return "strong"
+    if bits >= MEDIUM_BITS:
+        return "medium"
+    return "weak"
+
+
+def pattern_bits(password, pool_bits):
+    """Entropia ograniczona przez wzorce (słowa, klawiatura, sekwencje, daty); oceniany jest początek hasła
+    (MAX_PATTERN_LENGTH znaków), dalsze znaki nie zwiększają wyniku"""
+    return get_matcher().guess_bits(password[:MAX_PATTERN_LENGTH], pool_bits)
+
+
+def estimate(password, patterns=True, checker=None):
+    """Szacuje entropię hasła (w bitach) i zwraca parę (bity, poziom); hasło z wycieku ma 0 bitów"""
+    checker = checker or default_checker()
+    if checker is not None and password and checker.contains(password):
+        return 0.0, "weak"
+
+    pool_bits = POOL_BITS[class_mask(password)]
+    bits = len(password) * pool_bits
+    if patterns and password:
+        bits = min(bits, pattern_bits(password, pool_bits))
+    return bits, tier(bits)
+
+
+def evaluate_many(passwords, patterns=True, checker=None):
+    """Ocena wielu haseł naraz; zwraca listę par (bity, poziom)"""
+    passwords = list(passwords)
+    checker = checker or default_checker()
+    if np is None or not passwords:
+        return [estimate(p, patterns, checker) for p in passwords]
+
+    # Jeden bufor dla całego zbioru, klasyfikacja jednym translate
+    encoded = [p.encode("utf-8", "surrogateescape") for p in passwords]
+    sizes = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    classes = np.frombuffer(b"".join(encoded).translate(CLASS_TABLE), dtype=np.uint8)
+
+    # Maska każdego hasła: OR po jego fragmencie bufora (puste hasła mają maskę 0)
+    masks = np.zeros(len(encoded), dtype=np.uint8)
+    nonempty = sizes > 0
+    if nonempty.any():
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        masks[nonempty] = np.bitwise_or.reduceat(classes, offsets[nonempty])
+
+    lengths = np.fromiter((len(p) for p in passwords), dtype=np.float64, count=len(passwords))
+    pools = np.asarray(POOL_BITS)[masks]
+    bits = (lengths * pools).tolist()
+    if patterns:
+        bits = [min(b, pattern_bits(p, pool)) if p else b
+                for p, b, pool in zip(passwords, bits, pools.tolist())]
+    if checker is not None:
+        contains = checker.contains
+        bits = [0.0 if p and contains(p) else b for p, b in zip(passwords, bits)]
+    return [(b, tier(b)) for b in bits]
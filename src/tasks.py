@@ -0,0 +1,131 @@
+# fortipass/tasks.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, queue, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Liczba wątków roboczych (zadania ponad limit czekają w kolejce puli)
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+# Okres opróżniania kolejki wyników w wątku Tk (ms)
+POLL_MS = 50
+
+
+class Cancelled(Exception):
+    """Zadanie przerwane na żądanie (zgłaszane w punkcie raportowania postępu)"""
+
+
+class Task:
+    def __init__(self, runner, on_done=None, on_error=None, on_progress=None):
+        """Uchwyt zadania w tle: anulowanie, postęp i wynik (wywołania zwrotne w wątku Tk)"""
+        self.runner = runner
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """Anuluje zadanie: oczekujące nie zostanie uruchomione, trwające przerwie się przy raporcie postępu"""
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def report(self, done, total=None):
+        """Postęp z wątku roboczego; jednocześnie punkt przerwania anulowanego zadania"""
+        if self.cancelled:
+            raise Cancelled()
+        if self.on_progress is not None:
+            self.runner.post(self.on_progress, done, total)
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def result(self, timeout=None):
+        """Wynik zadania (blokuje - tylko poza wątkiem Tk)"""
+        return self.future.result(timeout)
+
+
+class TaskRunner:
+    def __init__(self, root=None, max_workers=MAX_WORKERS, poll_ms=POLL_MS):
+        """Ograniczona pula wątków dla pracy we/wy i obliczeń; wyniki wracają do wątku Tk przez kolejkę
+        opróżnianą przez root.after (bez root - przez wywołanie drain)"""
+        self.root = root
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="fortipass-task")
+        self.callbacks = queue.SimpleQueue()
+        self.poll_job = None
+        self.closed = False
+        if root is not None:
+            self.poll_job = root.after(poll_ms, self.poll)
+
+    def submit(self, function, *args, on_done=None, on_error=None, on_progress=None):
+        """Uruchamia function(task, *args) w puli; on_done(wynik) / on_error(wyjątek) w wątku Tk"""
+        task = Task(self, on_done, on_error, on_progress)
+        task.future = self.executor.submit(self._run, task, function, args)
+        return task
+
+    def _run(self, task, function, args):
+        if task.cancelled:
+            raise Cancelled()
+        try:
+            result = function(task, *args)
+        except Cancelled:
+            raise
+        except Exception as e:
+            self.post(self._failed, task, e)
+            raise
+        self.post(self._finished, task, result)
+        return result
+
+    def _finished(self, task, result):
+        if not task.cancelled and task.on_done is not None:
+            task.on_done(result)
+
+    def _failed(self, task, error):
+        if task.cancelled:
+            return
+        if task.on_error is not None:
+            task.on_error(error)
+        else:
+            logging.error("Background task: %s!", error)
+
+    def post(self, callback, *args):
+        """Zleca wywołanie w wątku Tk (bezpieczne z dowolnego wątku)"""
+        self.callbacks.put((callback, args))
+
+    def drain(self):
+        """Wykonuje zaległe wywołania zwrotne (wątek Tk)"""
+        while True:
+            try:
+                callback, args = self.callbacks.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.error("Task callback: %s!", e)
+
+    def poll(self):
+        self.drain()
+        if not self.closed:
+            self.poll_job = self.root.after(self.poll_ms, self.poll)
+
+    def shutdown(self):
+        """Anuluje zadania oczekujące w puli i kończy okresowe opróżnianie kolejki"""
+        self.closed = True
+        if self.poll_job is not None:
+            try:
+                self.root.after_cancel(self.poll_job)
+            except Exception:
+                pass  # okno już zniszczone
+            self.poll_job = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,293 @@
+# fortipass/uniqueness.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os, math, mmap, fcntl, struct, hashlib, shutil
+from contextlib import contextmanager
+from pathlib import Path
+
+
+MAGIC = b"FPBLOOM1"
+HEADER = struct.Struct("<8sQIQQ16s")  # magic, bity, funkcje skrótu, liczba wpisów, pojemność, sól
+SALT_SIZE = 16
+
+DEFAULT_CAPACITY = 1_000_000
+DEFAULT_FP_RATE = 1e-6
+
+# Filtr skalowalny: każdy kolejny segment ma 2x większą pojemność i 2x mniejszy błąd
+GROWTH_FACTOR = 2
+TIGHTENING_RATIO = 0.5
+
+MERGE_BLOCK = 1 << 20
+
+# Blokada katalogu magazynu: dodawanie, wzrost i scalanie w jednym procesie naraz (równoległe 'gen --unique')
+LOCK_FILE = "store.lock"
+
+
+def optimal_parameters(capacity, fp_rate):
+    """Liczba bitów i funkcji skrótu dla zadanej pojemności i prawdopodobieństwa fałszywego trafienia"""
+    if capacity < 1:
+        raise ValueError("The filter capacity must be greater than zero.")
+    if not 0 < fp_rate < 1:
+        raise ValueError("The false positive rate must be between 0 and 1.")
+    bits = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    def __init__(self, path):
+        """Filtr Blooma w pliku mapowanym w pamięci (nagłówek + tablica bitów)"""
+        self.path = Path(path)
+        self._file = open(self.path, "r+b")
+        self._map = None
+        try:
+            # Pusty plik - ValueError z mmap, krótszy od nagłówka - struct.error
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            magic, self.num_bits, self.num_hashes, self.count, self.capacity, self.salt = HEADER.unpack_from(self._map)
+            valid = magic == MAGIC and len(self._map) == HEADER.size + self.num_bits // 8
+        except (ValueError, struct.error):
+            valid = False
+        if not valid:
+            # Bez close() - nie zapisuje nagłówka do obcego pliku
+            if self._map is not None:
+                self._map.close()
+            self._file.close()
+            raise ValueError(f"{path} is not a valid FortiPass Bloom filter.")
+
+    @classmethod
+    def create(cls, path, capacity=DEFAULT_CAPACITY, fp_rate=DEFAULT_FP_RATE, salt=None):
+        """Tworzy nowy, pusty filtr (plik rzadki - bity zajmują miejsce dopiero po zapisie)"""
+        num_bits, num_hashes = optimal_parameters(capacity, fp_rate)
+        salt = salt or os.urandom(SALT_SIZE)
+        with open(path, "xb") as f:
+            f.write(HEADER.pack(MAGIC, num_bits, num_hashes, 0, capacity, salt))
+            f.truncate(HEADER.size + num_bits // 8)
+        return cls(path)
+
+    def close(self):
+        """Zapisuje licznik i zamyka mapowanie"""
+        if not self._map.closed:
+            self.flush()
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reload(self):
+        """Licznik wpisów z nagłówka (zapisany przez inny proces)"""
+        self.count = HEADER.unpack_from(self._map)[3]
+
+    def flush(self):
+        """Utrwala licznik wpisów i zmienione strony na dysku"""
+        HEADER.pack_into(self._map, 0, MAGIC, self.num_bits, self.num_hashes, self.count, self.capacity, self.salt)
+        self._map.flush()
+
+    def _positions(self, password):
+        """Pozycje bitów (podwójne haszowanie na kluczowanym BLAKE2b z solą filtra)"""
+        digest = hashlib.blake2b(password.encode("utf-8"), key=self.salt, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def __contains__(self, password):
+        data, base = self._map, HEADER.size
+        return all(data[base + (p >> 3)] & (1 << (p & 7)) for p in self._positions(password))
+
+    def add(self, password):
+        """Dodaje hasło; zwraca True, jeśli wcześniej go (na pewno) nie było"""
+        data, base = self._map, HEADER.size
+        new = False
+        for p in self._positions(password):
+            index, bit = base + (p >> 3), 1 << (p & 7)
+            value = data[index]
+            if not value & bit:
+                data[index] = value | bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def is_full(self):
+        """Czy osiągnięto pojemność projektową (dalsze wpisy zwiększają błąd)"""
+        return self.count >= self.capacity
+
+    def compatible(self, other):
+        """Czy filtry mają ten sam rozmiar, funkcje skrótu i sól (można je scalić)"""
+        return (self.num_bits, self.num_hashes, self.salt) == (other.num_bits, other.num_hashes, other.salt)
+
+    def merge(self, other):
+        """Suma filtrów (bitowe OR) - np. filtrów utworzonych przez równoległe procesy"""
+        if not self.compatible(other):
+            raise ValueError("Only Bloom filters with the same size, hashes and salt can be merged.")
+        start, end = HEADER.size, len(self._map)
+        for offset in range(start, end, MERGE_BLOCK):
+            stop = min(offset + MERGE_BLOCK, end)
+            a = int.from_bytes(self._map[offset:stop], "little")
+            b = int.from_bytes(other._map[offset:stop], "little")
+            self._map[offset:stop] = (a | b).to_bytes(stop - offset, "little")
+        self.count = self.estimated_count()
+        self.flush()
+
+    def estimated_count(self):
+        """Szacowana liczba wpisów na podstawie liczby ustawionych bitów"""
+        ones = 0
+        for offset in range(HEADER.size, len(self._map), MERGE_BLOCK):
+            ones += bin(int.from_bytes(self._map[offset:offset + MERGE_BLOCK], "little")).count("1")
+        if ones >= self.num_bits:
+            return self.capacity
+        return round(-self.num_bits / self.num_hashes * math.log(1 - ones / self.num_bits))
+
+
+class UniquenessStore:
+    def __init__(self, directory, capacity=DEFAULT_CAPACITY, fp_rate=DEFAULT_FP_RATE, salt=None):
+        """Skalowalny filtr Blooma: katalog segmentów o wspólnej soli, rosnący wraz z liczbą haseł"""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.segments = []
+        self.lock_fd = os.open(self.directory / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            with self._locked():
+                if not self.segments:
+                    self._grow(salt)
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def salt(self):
+        return self.segments[0].salt
+
+    def _segment_path(self, index):
+        return self.directory / f"segment-{index:04d}.bloom"
+
+    @contextmanager
+    def _locked(self):
+        """Blokada wyłączna katalogu; segmenty i liczniki odświeżane po zmianach innych procesów"""
+        fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+        try:
+            self._refresh()
+            yield
+        finally:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Segmenty dodane lub przenumerowane przez inny proces (wywołanie pod blokadą)"""
+        paths = sorted(self.directory.glob("segment-*.bloom"))
+        if (paths == [segment.path for segment in self.segments]
+                and all(os.path.samestat(os.stat(segment.path), os.fstat(segment._file.fileno()))
+                        for segment in self.segments)):
+            for segment in self.segments:
+                segment.reload()
+            return
+        for segment in self.segments:
+            segment.reload()  # zamknięcie zapisuje licznik - aktualny, nie ten sprzed zmian
+            segment.close()
+        self.segments = [BloomFilter(path) for path in paths]
+
+    def _grow(self, salt=None):
+        """Dodaje nowy segment (większa pojemność, mniejszy błąd - łączny błąd pozostaje ograniczony)"""
+        index = len(self.segments)
+        capacity = self.capacity * GROWTH_FACTOR ** index
+        fp_rate = self.fp_rate * (1 - TIGHTENING_RATIO) * TIGHTENING_RATIO ** index
+        if self.segments:
+            salt = self.segments[0].salt
+            self.segments[-1].flush()  # licznik pełnego segmentu w nagłówku (czytany przez inne procesy)
+        self.segments.append(BloomFilter.create(self._segment_path(index), capacity, fp_rate, salt))
+
+    def close(self):
+        """Zamyka segmenty pod blokadą (zapisywane liczniki uwzględniają zmiany innych procesów)"""
+        if self.lock_fd is None:
+            return
+        try:
+            with self._locked():
+                for segment in self.segments:
+                    segment.close()
+        finally:
+            os.close(self.lock_fd)
+            self.lock_fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        with self._locked():
+            return sum(segment.count for segment in self.segments)
+
+    def __contains__(self, password):
+        with self._locked():
+            return any(password in segment for segment in self.segments)
+
+    def add_many(self, passwords):
+        """Sprawdza i dodaje partię haseł; zwraca listę flag 'nowe hasło' (w kolejności wejścia)"""
+        with self._locked():
+            return self._add_many(passwords)
+
+    def _add_many(self, passwords):
+        fresh = []
+        current = self.segments[-1]
+        older = self.segments[:-1]
+        for password in passwords:
+            if any(password in segment for segment in older):
+                fresh.append(False)
+                continue
+            fresh.append(current.add(password))
+            if current.is_full():
+                self._grow()
+                current = self.segments[-1]
+                older = self.segments[:-1]
+        current.flush()
+        return fresh
+
+    def merge(self, other):
+        """Dołącza segmenty innego magazynu o tej samej soli (np. z równoległego procesu) i zamyka go"""
+        if other.salt != self.salt:
+            raise ValueError("Only uniqueness stores with the same salt can be merged.")
+        with self._locked(), other._locked():
+            for segment in other.segments:
+                segment.flush()
+                target = self.directory / f"segment-{len(self.segments):04d}.bloom"
+                shutil.copyfile(segment.path, target)
+                self.segments.insert(len(self.segments) - 1, BloomFilter(target))
+            # Najnowszy (aktywny) segment pozostaje na końcu listy
+            self._renumber()
+        other.close()
+
+    def _renumber(self):
+        """Nadaje plikom segmentów nazwy zgodne z kolejnością na liście"""
+        for segment in self.segments:
+            temp = segment.path.with_suffix(".renaming")
+            os.replace(segment.path, temp)
+            segment.path = temp
+        for index, segment in enumerate(self.segments):
+            target = self._segment_path(index)
+            os.replace(segment.path, target)
+            segment.path = target
+
+    def fork(self, directory):
+        """Nowy, pusty magazyn o tej samej soli - dla procesu roboczego, scalany później przez merge()"""
+        return UniquenessStore(directory, self.capacity, self.fp_rate, self.salt)
+
+
+def unique_chunks(chunks, store, regenerate):
+    """Przepuszcza tylko hasła niewydane wcześniej; duplikaty zastępuje nowymi z regenerate()"""
+    for chunk in chunks:
+        fresh = store.add_many(chunk)
+        for index, is_new in enumerate(fresh):
+            while not is_new:
+                chunk[index] = regenerate()
+                is_new = store.add_many([chunk[index]])[0]
+        yield chunk
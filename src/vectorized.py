@@ -0,0 +1,114 @@
+# fortipass/vectorized.py
+#
+# Copyright (c) 2024 Piotr Bodych
+# Licensed under the MIT License. See LICENSE file in the project root for details.
+
+
+import os
+from functools import lru_cache
+from generator import iter_passwords, DEFAULT_CHUNK_SIZE
+
+# NumPy jest opcjonalny - bez niego używany jest silnik w czystym Pythonie
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+NEWLINE = ord("\n")
+
+
+def available():
+    """Czy wektoryzowany silnik (NumPy) jest dostępny"""
+    return np is not None
+
+
+def supports(policy):
+    """Czy polityka może być obsłużona wektorowo (bez powtórzeń wymaga losowania bez zwracania)"""
+    return np is not None and not policy.no_repeat
+
+
+@lru_cache(maxsize=32)
+def _alphabet_table(alphabet):
+    """Alfabet jako wektor kodów ASCII (uint8)"""
+    return np.frombuffer(alphabet.encode("ascii"), dtype=np.uint8)
+
+
+def _uniform_indices(count, m):
+    """count indeksów z przedziału [0, m) z bloku os.urandom, z odrzucaniem bajtów >= limit"""
+    limit = 256 - 256 % m
+    indices = np.empty(count, dtype=np.uint8)
+    filled = 0
+    while filled < count:
+        need = count - filled
+        # Nadmiar pokrywa odrzucone bajty - zwykle wystarcza jeden odczyt
+        raw = np.frombuffer(os.urandom(need * 256 // limit + 64), dtype=np.uint8)
+        accepted = raw[raw < limit][:need]
+        indices[filled:filled + len(accepted)] = accepted
+        filled += len(accepted)
+    indices %= m
+    return indices
+
+
+def generate_matrix(n, policy, newline=False):
+    """Macierz (n, length) kodów znaków; newline=True dokłada kolumnę '\\n' (gotowy format 'raw')"""
+    if not supports(policy):
+        raise RuntimeError("The vectorized backend is not available for this policy.")
+
+    length = policy.length
+    matrix = np.empty((n, length + 1 if newline else length), dtype=np.uint8)
+    body = matrix[:, :length]
+
+    # Pierwsze kolumny: wymagane minimum z każdej klasy, reszta z całej puli
+    column = 0
+    for alphabet, minimum in policy.required:
+        table = _alphabet_table(alphabet)
+        indices = _uniform_indices(n * minimum, len(table)).reshape(n, minimum)
+        body[:, column:column + minimum] = table.take(indices)
+        column += minimum
+
+    table = _alphabet_table(policy.characters)
+    indices = _uniform_indices(n * (length - column), len(table)).reshape(n, length - column)
+    body[:, column:] = table.take(indices)
+
+    # Niezależna permutacja każdego wiersza (sortowanie losowych kluczy 64-bitowych)
+    if column:
+        keys = np.frombuffer(os.urandom(n * length * 8), dtype=np.uint64).reshape(n, length)
+        body[:] = np.take_along_axis(body, np.argsort(keys, axis=1), axis=1)
+
+    if newline:
+        matrix[:, length] = NEWLINE
+    return matrix
+
+
+def _chunk_sizes(n, chunk_size):
+    """Rozmiary kolejnych partii"""
+    if n < 0:
+        raise ValueError("The number of passwords cannot be negative.")
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be greater than zero.")
+    while n > 0:
+        size = min(chunk_size, n)
+        yield size
+        n -= size
+
+
+def iter_raw_blocks(n, policy, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Partie haseł rozdzielonych '\\n' jako bufor bajtów (memoryview bez kopiowania)"""
+    if not supports(policy):
+        for chunk in iter_passwords(n, policy, chunk_size):
+            yield ('\n'.join(chunk) + '\n').encode("ascii")
+        return
+
+    for size in _chunk_sizes(n, chunk_size):
+        yield generate_matrix(size, policy, newline=True).reshape(-1).data
+
+
+def iter_passwords_vectorized(n, policy, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Partie haseł jako listy napisów (zgodne z generator.iter_passwords)"""
+    if not supports(policy):
+        yield from iter_passwords(n, policy, chunk_size)
+        return
+
+    for size in _chunk_sizes(n, chunk_size):
+        yield generate_matrix(size, policy, newline=True).tobytes().decode("ascii").split("\n")[:-1]
@@ -67,7 +67,7 @@ def test_copy_to_clipboard(app):
 
 def test_password_strength(app):
     """Test siły hasła."""
-    app.password_entry.insert(0, "StrongPass123!")
+    app.password_entry.insert(0, "x7#Qm9!vR2$kLp")
     strength, color = app.evaluate_password_strength(app.password_entry.get())
 
     assert strength == "strong", "Password strength should be 'strong'"
@@ -77,6 +77,13 @@ def test_password_strength(app):
     app.password_entry.insert(0, "Weak123")
     strength, color = app.evaluate_password_strength(app.password_entry.get())
 
+    assert strength == "weak", "Password strength should be 'weak'"
+    assert color == "red", "Color for weak password should be red"
+
+    app.password_entry.delete(0, "end")
+    app.password_entry.insert(0, "k7Rm2pQx9wZb")
+    strength, color = app.evaluate_password_strength(app.password_entry.get())
+
     assert strength == "medium", "Password strength should be 'medium'"
     assert color == "orange", "Color for medium password should be orange"
 
@@ -88,7 +95,7 @@ def test_password_strength(app):
     assert color == "red", "Color for weak password should be red"
 
 
-@patch("src.main.logging")
+@patch("main.logging")
 def test_logging(mock_logging, app):
     """Test logowania działań."""
     app.length_entry.insert(0, "12")
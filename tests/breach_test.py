@@ -0,0 +1,62 @@
+import hashlib
+import pytest
+
+from breach import BreachChecker, convert_dump
+from strength import estimate
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Mały zrzut w formacie HIBP (nieposortowany) przekonwertowany do pliku binarnego."""
+    leaked = ["password", "123456", "x7#Qm9!vR2$kLp"] + [f"leak{i}" for i in range(5000)]
+    dump = tmp_path / "dump.txt"
+    dump.write_text("".join(f"{hashlib.sha1(p.encode()).hexdigest().upper()}:{i + 1}\n"
+                            for i, p in enumerate(leaked + ["password"])))
+    target = tmp_path / "breach.bin"
+    count = convert_dump(dump, target, run_size=700)
+    return target, count, leaked
+
+
+def test_convert_sorts_and_deduplicates(corpus):
+    """Test konwersji zrzutu: sortowanie zewnętrzne i usunięcie duplikatów."""
+    target, count, leaked = corpus
+    data = target.read_bytes()
+    records = [data[i:i + 20] for i in range(0, len(data), 20)]
+
+    assert count == len(leaked) == len(records)
+    assert records == sorted(records)
+
+
+def test_failed_conversion_leaves_no_files(tmp_path, monkeypatch):
+    """Test przerwanej konwersji: błąd formatu lub zapisu nie zostawia plików tymczasowych ani docelowego."""
+    dump = tmp_path / "dump.txt"
+    dump.write_text("".join(f"{hashlib.sha1(str(i).encode()).hexdigest()}:1\n" for i in range(100)) + "ABCD:1\n")
+    target = tmp_path / "breach.bin"
+    with pytest.raises(ValueError, match="not SHA-1"):
+        convert_dump(dump, target, run_size=30)
+
+    dump.write_text("".join(f"{hashlib.sha1(str(i).encode()).hexdigest()}:1\n" for i in range(100)))
+
+    def full_disk(source, destination):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr("os.replace", full_disk)
+    with pytest.raises(OSError, match="No space"):
+        convert_dump(dump, target, run_size=30)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["dump.txt"]
+
+
+def test_lookup(corpus):
+    """Test wyszukiwania haseł w pliku mapowanym w pamięci."""
+    target, _, leaked = corpus
+    with BreachChecker(target) as checker:
+        assert all(checker.contains(p) for p in leaked)
+        assert not any(checker.contains(f"safe{i}") for i in range(2000))
+
+
+def test_strength_rejects_breached_password(corpus):
+    """Test oceny hasła z wycieku jako słabego mimo wysokiej entropii."""
+    target, _, _ = corpus
+    with BreachChecker(target) as checker:
+        assert estimate("x7#Qm9!vR2$kLp", checker=checker) == (0.0, "weak")
+        assert estimate("k7Rm2pQx9wZb", checker=checker)[1] == "medium"
@@ -0,0 +1,91 @@
+import io
+import csv
+import json
+import hashlib
+
+from cli import run_cli
+
+
+def test_gen_jsonl_to_file(tmp_path, capsys):
+    """Test strumieniowego zapisu haseł w formacie JSONL do pliku."""
+    output = tmp_path / "passwords.jsonl"
+    code = run_cli(["gen", "--count", "2500", "--length", "24", "--no-special",
+                    "--format", "jsonl", "--chunk-size", "1000", "-o", str(output)])
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert code == 0
+    assert len(records) == 2500
+    assert all(len(r["password"]) == 24 and r["password"].isalnum() for r in records)
+    assert "passwords/s" in capsys.readouterr().err, "Throughput should be reported on stderr"
+
+
+def test_gen_csv_quotes_special_characters(tmp_path):
+    """Test poprawnego cytowania znaków specjalnych w formacie CSV."""
+    output = tmp_path / "passwords.csv"
+    run_cli(["gen", "--count", "500", "--format", "csv", "--quiet", "-o", str(output)])
+
+    with open(output, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["password"]
+    assert len(rows) == 501
+    assert all(len(row) == 1 and len(row[0]) == 12 for row in rows[1:])
+
+
+def test_gen_invalid_length(capsys):
+    """Test kodu wyjścia dla niepoprawnej długości hasła."""
+    assert run_cli(["gen", "--length", "2"]) == 2
+    assert "at least 4 characters" in capsys.readouterr().err
+
+
+def test_audit_summary(tmp_path, capsys):
+    """Test audytu siły haseł z pliku."""
+    source = tmp_path / "export.txt"
+    source.write_text("x7#Qm9!vR2$kLp\nWeak123\nk7Rm2pQx9wZb\n")
+
+    assert run_cli(["audit", str(source)]) == 0
+    captured = capsys.readouterr()
+    assert [line.split("\t")[1] for line in captured.out.splitlines()] == ["strong", "weak", "medium"]
+    assert "strong 1, medium 1, weak 1" in captured.err
+
+
+def test_audit_lines_that_are_not_utf8(tmp_path, capsys, monkeypatch):
+    """Test audytu linii z bajtami spoza UTF-8 (plik i stdin): ocenione i sprawdzone w korpusie, bez przerwania."""
+    from breach import convert_dump
+
+    dump = tmp_path / "dump.txt"
+    dump.write_text(hashlib.sha1(b"S3cret!pass\xff").hexdigest() + ":1\n")
+    convert_dump(dump, tmp_path / "breach.bin")
+    data = b"x7#Qm9!vR2$kLp\n\xff\nS3cret!pass\xff\n"
+    source = tmp_path / "export.txt"
+    source.write_bytes(data)
+
+    assert run_cli(["audit", str(source), "--breach-file", str(tmp_path / "breach.bin")]) == 0
+    captured = capsys.readouterr()
+    assert [line.split("\t")[1] for line in captured.out.splitlines()] == ["strong", "weak", "weak"]
+    assert captured.out.splitlines()[2].startswith("0.0\t")
+
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(data), encoding="utf-8"))
+    assert run_cli(["audit", "-", "--summary-only"]) == 0
+    assert "Evaluated 3 passwords" in capsys.readouterr().err
+
+
+def test_history_commands(tmp_path, capsys, monkeypatch):
+    """Test poleceń historii: dodanie, odczyt, lista, usunięcie i błędne hasło szyfrujące."""
+    path = str(tmp_path / "history.fpv")
+    monkeypatch.setenv("FORTIPASS_HISTORY_PASSPHRASE", "correct horse")
+    assert run_cli(["history", "--file", path, "get", "mail"]) == 2
+    assert "does not exist" in capsys.readouterr().err
+
+    assert run_cli(["history", "--file", path, "add", "mail", "--generate", "--length", "20"]) == 0
+    password = capsys.readouterr().out.strip()
+    assert len(password) == 20
+    assert run_cli(["history", "--file", path, "get", "mail"]) == 0
+    assert capsys.readouterr().out.strip() == password
+    assert run_cli(["history", "--file", path, "list", "--show"]) == 0
+    assert capsys.readouterr().out.rstrip("\n").split("\t")[1:] == ["mail", password]
+
+    assert run_cli(["history", "--file", path, "delete", "mail"]) == 0
+    assert run_cli(["history", "--file", path, "delete", "mail"]) == 2
+    monkeypatch.setenv("FORTIPASS_HISTORY_PASSPHRASE", "wrong")
+    assert run_cli(["history", "--file", path, "list"]) == 2
+    assert "Wrong passphrase" in capsys.readouterr().err
@@ -0,0 +1,87 @@
+import sys
+
+import pytest
+
+from clipboard import CommandClipboard, ClipboardService, select_backend, clear_after_setting
+from tasks import TaskRunner
+
+
+def file_clipboard(path):
+    """Schowek w pliku obsługiwany przez polecenia (jak wl-copy / wl-paste)."""
+    copy = [sys.executable, "-c", f"import sys; open({str(path)!r}, 'w').write(sys.stdin.read())"]
+    paste = [sys.executable, "-c", f"import sys; sys.stdout.write(open({str(path)!r}).read())"]
+    return CommandClipboard("file", copy, paste)
+
+
+def test_command_backend_copies_in_worker_thread(tmp_path):
+    """Test kopiowania przez polecenie: zapis w wątku roboczym, potwierdzenie dopiero w drain (wątek Tk)."""
+    path = tmp_path / "clipboard"
+    runner = TaskRunner()
+    service = ClipboardService(file_clipboard(path), runner)
+    done, errors = [], []
+
+    task = service.copy("S3cret!pass", on_done=lambda: done.append(True), on_error=errors.append)
+    task.result(10)
+    assert path.read_text() == "S3cret!pass" and done == [] and service.copied is None
+    runner.drain()
+    assert done == [True] and errors == [] and service.copied is not None
+
+    failing = CommandClipboard("false", [sys.executable, "-c", "raise SystemExit(3)"], ["true"])
+    ClipboardService(failing, runner).copy("x", on_error=errors.append).future.exception(10)
+    runner.drain()
+    assert isinstance(errors[0], OSError) and "status 3" in str(errors[0])
+    runner.shutdown()
+
+
+def test_expire_clears_only_our_password(tmp_path):
+    """Test czyszczenia: schowek opróżniany tylko, gdy nadal zawiera skopiowane hasło."""
+    path = tmp_path / "clipboard"
+    runner = TaskRunner()
+    cleared = []
+    service = ClipboardService(file_clipboard(path), runner, clear_after=0.1, on_cleared=lambda: cleared.append(1))
+
+    service.copy("S3cret!pass").result(10)
+    runner.drain()
+    service.expire().result(10)
+    runner.drain()
+    assert path.read_text() == "" and cleared == [1] and service.copied is None
+
+    service.copy("S3cret!pass").result(10)
+    runner.drain()
+    path.write_text("copied by the user")
+    service.expire().result(10)
+    runner.drain()
+    assert path.read_text() == "copied by the user" and cleared == [1] and service.copied is None
+    runner.shutdown()
+
+
+def test_backend_selection(tmp_path, monkeypatch):
+    """Test wyboru mechanizmu: nazwa ze zmiennej środowiskowej, polecenia z PATH i błędy konfiguracji."""
+    monkeypatch.setenv("PATH", str(tmp_path))
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    monkeypatch.delenv("FORTIPASS_CLIPBOARD", raising=False)
+    monkeypatch.setattr("clipboard.pyperclip", None)
+    with pytest.raises(ValueError, match="No clipboard tool"):
+        select_backend()
+    with pytest.raises(ValueError, match="not found"):
+        select_backend(name="xclip")
+    with pytest.raises(ValueError, match="requires the application window"):
+        select_backend(name="tk")
+    with pytest.raises(ValueError, match="Unknown clipboard backend"):
+        select_backend(name="clippy")
+
+    for name in ("wl-copy", "xsel"):
+        (tmp_path / name).write_text("#!/bin/sh\n")
+        (tmp_path / name).chmod(0o755)
+    assert select_backend().name == "xsel"
+    monkeypatch.setenv("WAYLAND_DISPLAY", "wayland-0")
+    assert select_backend().name == "wl-copy"
+    monkeypatch.setenv("FORTIPASS_CLIPBOARD", "xsel")
+    assert select_backend().clear_command == ["xsel", "--clipboard", "--delete"]
+    assert select_backend(root=object(), name="auto").name == "tk"
+
+    monkeypatch.setenv("FORTIPASS_CLIPBOARD_CLEAR", "soon")
+    with pytest.raises(ValueError):
+        clear_after_setting()
+    monkeypatch.setenv("FORTIPASS_CLIPBOARD_CLEAR", "0")
+    assert clear_after_setting() == 0
@@ -0,0 +1,68 @@
+import hashlib
+
+import pytest
+
+from crypto import derive_keys, keystream_xor, authenticate, encrypt, decrypt, NONCE_SIZE, MAC_SIZE
+
+KEY, MAC_KEY, NONCE = bytes(range(32)), bytes(range(32, 64)), bytes(range(64, 80))
+
+# encrypt(KEY, MAC_KEY, bytes(range(150)), b"FPMAIL01", NONCE) - trzy bloki strumienia, ostatni niepełny
+SEALED = bytes.fromhex(
+    "404142434445464748494a4b4c4d4e4faaf4957828c58ea31bbaab9917e42edb83da3af91b46c06376ff04ba77853a3e"
+    "944fe55517a641d498172ca4e5578f25b048d75e0e5378242584895c2a0b6e8e29829d40596833d5d200b27edf1b0dbe"
+    "7b0cfb433c3e1c1a69a3ab12f80392d61f8ae0909e2fcdc8979070a21028dc3fdae822010be802e924cbe1f7d039bbfe"
+    "9e716c0a1517359c254ba8a2edd8ba3738a495022874fa3f847829841cb2438cda7fb8cece11")
+
+
+def test_primitives_known_answers():
+    """Test wektorów BLAKE2b (RFC 7693, KAT z kluczem) i scrypt (RFC 7914), na których opiera się szyfrowanie."""
+    assert hashlib.blake2b(b"abc").hexdigest() == (
+        "ba80a53f981c4d0d6a2797b69f12f6e94c212f14685ac4b74b12bb6fdbffa2d1"
+        "7d87c5392aab792dc252d5de4533cc9518d38aa8dbf1925ab92386edd4009923")
+    assert hashlib.blake2b(b"", key=bytes(range(64))).hexdigest() == (
+        "10ebb67700b1868efb4417987acf4690ae9d972fb7a590c2f02871799aaa4786"
+        "b5e996e8f0f4eb981fc214b005f42d2ff4233499391653df7aefcbc13fc51568")
+    assert hashlib.scrypt(b"password", salt=b"NaCl", n=1024, r=8, p=16, dklen=64).hex() == (
+        "fdbabe1c9d3472007856e7190d01e9fe7c6ad7cbc8237830e77376634b3731622eaf30d92e22a3886ff109279d9830da"
+        "c727afb94a83ee6d8360cbdfa2cc0640")
+
+
+def test_construction_known_answers():
+    """Test wektorów całej konstrukcji: klucze z hasła, szyfrogram i znacznik niezmienne między wersjami."""
+    assert [key.hex() for key in derive_keys("correct horse", b"fortipass salt!!", 1 << 10, 8, 1)] == [
+        "0096addab8d091139e7c1057736385ec87567b1854325529523742140b427a96",
+        "124552ac41ddbd372ef33d3506b6a15ad25ae259bd7d0a8b23b1998b2b52e12b",
+        "5bc441e8c6444fa48a11d57d7e90685533816c53f4ab4df8c422b9da0d3691b0"]
+    assert encrypt(KEY, MAC_KEY, bytes(range(150)), b"FPMAIL01", NONCE) == SEALED
+    assert encrypt(KEY, MAC_KEY, b"", b"", NONCE).hex() == (
+        "404142434445464748494a4b4c4d4e4f6af5d61b35a22db948da8310224f1d08")
+
+    # Opis w crypto.py: strumień BLAKE2b(nonce || licznik), znacznik z długością danych powiązanych
+    ciphertext = SEALED[NONCE_SIZE:-MAC_SIZE]
+    stream = b"".join(hashlib.blake2b(NONCE + counter.to_bytes(8, "little"), key=KEY).digest() for counter in range(3))
+    assert ciphertext == bytes(a ^ b for a, b in zip(bytes(range(150)), stream))
+    assert keystream_xor(KEY, NONCE, ciphertext) == bytes(range(150))
+    assert SEALED[-MAC_SIZE:] == authenticate(MAC_KEY, b"FPMAIL01", SEALED[:-MAC_SIZE])
+
+
+def test_decrypt_rejects_modifications():
+    """Test uwierzytelniania: każda zmiana szyfrogramu, danych powiązanych lub klucza daje None."""
+    assert decrypt(KEY, MAC_KEY, SEALED, b"FPMAIL01") == bytes(range(150))
+    for position in (0, NONCE_SIZE, len(SEALED) - 1):
+        modified = bytearray(SEALED)
+        modified[position] ^= 1
+        assert decrypt(KEY, MAC_KEY, bytes(modified), b"FPMAIL01") is None
+    assert decrypt(KEY, MAC_KEY, SEALED, b"FPMAIL02") is None
+    assert decrypt(KEY, KEY, SEALED, b"FPMAIL01") is None
+    assert decrypt(KEY, MAC_KEY, SEALED[:NONCE_SIZE + MAC_SIZE - 1]) is None
+    # Granica danych powiązanych i szyfrogramu jest uwierzytelniana (długość na początku)
+    assert authenticate(MAC_KEY, b"ab", b"c") != authenticate(MAC_KEY, b"a", b"bc")
+
+
+@pytest.mark.parametrize("size", [0, 1, 63, 64, 65, 1000])
+def test_round_trip(size):
+    """Test szyfrowania i odszyfrowania tekstów różnej długości z losowym nonce."""
+    plaintext = bytes(range(256)) * 4
+    sealed = encrypt(KEY, MAC_KEY, plaintext[:size], b"record")
+    assert len(sealed) == NONCE_SIZE + size + MAC_SIZE and sealed != encrypt(KEY, MAC_KEY, plaintext[:size], b"record")
+    assert decrypt(KEY, MAC_KEY, sealed, b"record") == plaintext[:size]
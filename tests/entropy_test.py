@@ -0,0 +1,57 @@
+import os
+from collections import Counter
+
+from entropy import EntropyPool
+
+
+def test_randbelow_range_and_uniformity():
+    """Test zakresu i równomierności losowania z odrzucaniem."""
+    pool = EntropyPool()
+    counts = Counter(pool.randbelow(10) for _ in range(50000))
+
+    assert set(counts) == set(range(10))
+    assert all(4500 < c < 5500 for c in counts.values()), counts
+
+
+def test_randbelow_large_bound():
+    """Test losowania z zakresu większego niż jeden bajt."""
+    pool = EntropyPool()
+    values = [pool.randbelow(100003) for _ in range(2000)]
+    assert all(0 <= v < 100003 for v in values)
+    assert max(values) > 50000
+
+
+def test_sample_chars_uses_only_alphabet():
+    """Test losowania znaków z alfabetu o rozmiarze niebędącym dzielnikiem 256."""
+    pool = EntropyPool(block_size=64)
+    sample = pool.sample_chars("abcdefg", 7000)
+
+    assert len(sample) == 7000
+    assert set(sample) == set("abcdefg")
+    assert all(800 < c < 1200 for c in Counter(sample).values())
+
+
+def test_shuffle_is_permutation():
+    """Test tasowania Fishera-Yatesa."""
+    pool = EntropyPool()
+    items = list(range(100))
+    pool.shuffle(items)
+    assert sorted(items) == list(range(100))
+    assert items != list(range(100))
+
+
+def test_buffer_reset_after_fork():
+    """Test niezależności bufora w procesie potomnym."""
+    pool = EntropyPool()
+    pool.randbytes(1)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_fd, pool.randbytes(32))
+        os._exit(0)
+    os.waitpid(pid, 0)
+    child_bytes = os.read(read_fd, 32)
+    os.close(read_fd)
+    os.close(write_fd)
+
+    assert child_bytes != pool.randbytes(32), "Parent and child must not share buffered randomness"
@@ -0,0 +1,65 @@
+import string
+import pytest
+
+from generator import Policy, get_policy, generate_password, generate_many, iter_passwords
+
+
+def test_generate_many_count_and_length():
+    """Test generowania serii haseł o zadanej długości bez interfejsu Tkinter."""
+    policy = Policy(length=16)
+    passwords = generate_many(2500, policy)
+
+    assert len(passwords) == 2500, "The batch should contain the requested number of passwords"
+    assert all(len(p) == 16 for p in passwords), "Every password should have the policy length"
+
+
+def test_generate_password_contains_every_class():
+    """Test obecności co najmniej jednego znaku z każdej wybranej klasy."""
+    policy = Policy(length=4)
+    for _ in range(200):
+        password = generate_password(policy)
+        assert any(c in string.ascii_letters for c in password)
+        assert any(c in string.digits for c in password)
+        assert any(c in string.punctuation for c in password)
+
+
+def test_iter_passwords_chunks():
+    """Test podziału serii na partie."""
+    chunks = list(iter_passwords(2500, Policy(length=8, use_special=False), chunk_size=1000))
+
+    assert [len(c) for c in chunks] == [1000, 1000, 500]
+    assert all(c.isalnum() for chunk in chunks for c in chunk)
+
+
+def test_policy_validation():
+    """Test walidacji parametrów polityki."""
+    with pytest.raises(ValueError):
+        Policy(length=3)
+    with pytest.raises(ValueError):
+        Policy(length=129)
+    with pytest.raises(ValueError):
+        Policy(use_letters=False, use_numbers=False, use_special=False)
+
+
+def test_policy_minimum_counts_and_exclusions():
+    """Test minimalnej liczby znaków z klas oraz wykluczeń (bez ponawiania losowania)."""
+    policy = Policy(length=10, min_numbers=4, min_special=3, exclude="#$", exclude_ambiguous=True)
+    for password in generate_many(500, policy):
+        assert sum(c in string.digits for c in password) >= 4
+        assert sum(c in string.punctuation for c in password) >= 3
+        assert not set(password) & set("#$O0l1I")
+
+
+def test_policy_no_repeat():
+    """Test haseł bez powtórzeń znaków."""
+    policy = Policy(length=60, no_repeat=True)
+    assert all(len(set(p)) == 60 for p in generate_many(200, policy))
+
+    with pytest.raises(ValueError):
+        Policy(length=12, use_letters=False, use_special=False, no_repeat=True)
+
+
+def test_get_policy_is_memoized():
+    """Test zapamiętywania skompilowanej polityki według parametrów."""
+    assert get_policy(20, True, False, True) is get_policy(20, True, False, True)
+    assert get_policy(20, True, False, True) is not get_policy(21, True, False, True)
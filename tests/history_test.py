@@ -0,0 +1,159 @@
+import os
+import zlib
+import fcntl
+import struct
+import threading
+
+import pytest
+
+import history
+from history import PasswordHistory, HEADER, RECORD, MAC_SIZE
+
+KDF = (1 << 10, 8, 1)  # szybki scrypt w testach
+
+
+def open_store(path, passphrase="correct horse"):
+    return PasswordHistory(path, passphrase, kdf=KDF)
+
+
+def test_put_get_delete_and_reopen(tmp_path):
+    """Test zapisu, zastąpienia i usunięcia wpisu oraz ponownego otwarcia z zapisanego indeksu."""
+    path = tmp_path / "history.fpv"
+    with open_store(path) as store:
+        store.put("mail", "first", length=5)
+        store.put("bank", "S3cret!pass", strength="strong")
+        store.put("mail", "second")
+        assert store.delete("bank") and not store.delete("missing")
+        assert store.get("mail")["password"] == "second" and store.get("bank") is None
+        assert len(store) == 1 and "mail" in store and "bank" not in store
+        assert b"second" not in path.read_bytes()
+
+    assert store.index_path.exists()
+    with open_store(path) as store:
+        assert [entry["label"] for entry in store.entries()] == ["mail"]
+        assert store.get("mail")["password"] == "second" and "time" in store.get("mail")
+        with pytest.raises(ValueError, match="closed"):
+            store.close()
+            store.put("late", "x")
+
+    with pytest.raises(ValueError, match="Wrong passphrase"):
+        open_store(path, "wrong passphrase")
+
+
+def test_torn_tail_and_missing_index_are_recovered(tmp_path, caplog):
+    """Test odtwarzania po awarii: niepełny ostatni rekord jest obcinany, brakujący indeks budowany od nowa."""
+    path = tmp_path / "history.fpv"
+    store = open_store(path)
+    store.put_many([(f"entry-{i}", f"password-{i}", {"length": 10}) for i in range(100)])
+    store.delete("entry-3")
+    store.close(save=False)
+    size = path.stat().st_size
+    with open(path, "ab") as f:
+        f.write(b"\x40\x00\x00\x00torn")
+
+    with open_store(path) as store:
+        assert path.stat().st_size == size and len(store) == 99
+        assert store.get("entry-99")["password"] == "password-99" and store.get("entry-3") is None
+        store.put("entry-100", "password-100")
+    assert "incomplete record" in caplog.text
+
+    with open(store.index_path, "r+b") as f:
+        f.write(b"garbage!")
+    with open_store(path) as store:
+        assert len(store) == 100 and store.get("entry-100")["password"] == "password-100"
+
+
+def test_compaction_with_concurrent_writes(tmp_path, monkeypatch):
+    """Test kompaktowania: usunięte rekordy znikają z pliku, zapisy z innego wątku w trakcie nie giną."""
+    monkeypatch.setattr(history, "COMPACT_MIN_BYTES", 0)
+    path = tmp_path / "history.fpv"
+    store = open_store(path)
+    with store.batch():
+        for i in range(2000):
+            store.put(f"entry-{i}", f"password-{i}", sync=False)
+        for i in range(0, 2000, 2):
+            store.delete(f"entry-{i}", sync=False)
+    size = path.stat().st_size
+    assert store.needs_compaction()
+
+    def writer():
+        for i in range(300):
+            store.put(f"late-{i}", f"late-password-{i}")
+        store.delete("entry-1")
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    store.compact()
+    thread.join()
+    assert path.stat().st_size < size and not store.needs_compaction()
+    assert len(store) == 999 + 300
+
+    store.close()
+    with open_store(path) as store:
+        assert len(store) == 1299 and store.get("entry-1") is None
+        assert store.get("entry-1999")["password"] == "password-1999"
+        assert store.get("late-299")["password"] == "late-password-299"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_compacted_file_is_locked_before_it_replaces_the_old_one(tmp_path, monkeypatch):
+    """Test blokady przy kompaktowaniu: nowy plik nie jest ani chwili dostępny dla innego procesu."""
+    path = tmp_path / "history.fpv"
+    store = open_store(path)
+    store.put_many([(f"entry-{i}", f"password-{i}") for i in range(10)])
+    replace, attempts = os.replace, []
+
+    def replace_and_try_lock(source, target):
+        replace(source, target)
+        if str(target) == str(path):
+            fd = os.open(path, os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                attempts.append("locked")
+            except BlockingIOError:
+                attempts.append("busy")
+            finally:
+                os.close(fd)
+
+    monkeypatch.setattr(os, "replace", replace_and_try_lock)
+    store.compact()
+    monkeypatch.undo()
+    assert attempts == ["busy"]
+    with pytest.raises(OSError, match="another process"):
+        open_store(path)
+    store.close()
+    with open_store(path) as store:
+        assert len(store) == 10
+
+
+def test_modified_record_is_rejected(tmp_path):
+    """Test uwierzytelniania: zmiana szyfrogramu z poprawionym CRC jest wykrywana przy odczycie."""
+    path = tmp_path / "history.fpv"
+    with open_store(path) as store:
+        store.put("mail", "S3cret!pass")
+    data = bytearray(path.read_bytes())
+    length = RECORD.unpack_from(data, HEADER.size)[0]
+    end = HEADER.size + RECORD.size + length
+    data[end - MAC_SIZE - 1] ^= 1
+    struct.pack_into("<I", data, HEADER.size + 4, zlib.crc32(data[HEADER.size + 8:end]))
+    path.write_bytes(data)
+
+    with open_store(path) as store:
+        with pytest.raises(ValueError, match="authentication"):
+            store.get("mail")
+
+
+def test_replayed_record_is_rejected(tmp_path):
+    """Test powiązania MAC z plikiem i pozycją: stary rekord skopiowany na koniec pliku nie jest przyjmowany."""
+    path = tmp_path / "history.fpv"
+    with open_store(path) as store:
+        store.put("mail", "old password")
+        store.put("mail", "new password")
+    data = path.read_bytes()
+    first = data[HEADER.size:HEADER.size + RECORD.size + RECORD.unpack_from(data, HEADER.size)[0]]
+    path.write_bytes(data + first)
+    store.index_path.unlink()
+
+    with open_store(path) as store:
+        with pytest.raises(ValueError, match="authentication"):
+            store.get("mail")
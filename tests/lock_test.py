@@ -0,0 +1,62 @@
+from cli import run_cli
+from lock import AppLocker, forward_request
+
+
+def start_locker(tmp_path, handlers):
+    locker = AppLocker(lock_file=str(tmp_path / "fortipass.lock"), socket_path=str(tmp_path / "fortipass.sock"))
+    locker.lock_instance()
+    locker.listen(handlers)
+    return locker
+
+
+def test_forward_request_to_running_instance(tmp_path):
+    """Test przekazania żądania do instancji trzymającej blokadę."""
+    locker = start_locker(tmp_path, {"generate": lambda request: {"passwords": ["x"] * request["count"]}})
+    try:
+        assert forward_request({"command": "generate", "count": 3}, locker.socket_path) == \
+            {"ok": True, "passwords": ["x", "x", "x"]}
+        assert forward_request({"command": "shutdown"}, locker.socket_path)["ok"] is False
+    finally:
+        locker.unlock_instance()
+    assert forward_request({"command": "generate"}, locker.socket_path) is None
+
+
+def test_handler_errors_do_not_stop_listening(tmp_path, caplog):
+    """Test odporności nasłuchu: dowolny błąd obsługi wraca w odpowiedzi, kolejne żądania są obsługiwane."""
+    def fail(request):
+        raise RuntimeError("window destroyed")
+
+    locker = start_locker(tmp_path, {"raise": fail, "lookup": lambda request: {}["missing"],
+                                     "binary": lambda request: {"data": b"not json"}, "ping": lambda request: None})
+    try:
+        assert forward_request({"command": "raise"}, locker.socket_path) == {"ok": False, "error": "window destroyed"}
+        assert forward_request({"command": "lookup"}, locker.socket_path)["ok"] is False
+        assert forward_request({"command": "binary"}, locker.socket_path) is None
+        assert forward_request({"command": "ping"}, locker.socket_path) == {"ok": True}
+    finally:
+        locker.unlock_instance()
+    assert "window destroyed!" in caplog.text
+
+
+def test_stale_socket_is_replaced(tmp_path):
+    """Test przejęcia gniazda pozostawionego przez przerwaną instancję."""
+    (tmp_path / "fortipass.sock").write_text("")
+    locker = start_locker(tmp_path, {"raise": lambda request: None})
+    try:
+        assert forward_request({"command": "raise"}, locker.socket_path) == {"ok": True}
+    finally:
+        locker.unlock_instance()
+
+
+def test_remote_cli(tmp_path, monkeypatch, capsys):
+    """Test polecenia 'remote generate' z działającą instancją i bez niej."""
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert run_cli(["remote", "raise"]) == 2
+    assert "not running" in capsys.readouterr().err
+
+    locker = start_locker(tmp_path, {"generate": lambda request: {"passwords": [str(request["length"])] * request["count"]}})
+    try:
+        assert run_cli(["remote", "generate", "-n", "2", "--length", "20"]) == 0
+        assert capsys.readouterr().out.split() == ["20", "20"]
+    finally:
+        locker.unlock_instance()
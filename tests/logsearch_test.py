@@ -0,0 +1,86 @@
+import time
+import logging
+
+from cli import run_cli
+from logstore import LogDocument, RotatingLogHandler
+from logsearch import LogSearch, FilteredLines
+
+
+MESSAGES = ["Length: %s.", "The lock file could not be removed.", "Strength: strong."]
+
+
+def write_log(handler, count, start=0):
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    for i in range(start, start + count):
+        level = logging.ERROR if i % 3 == 1 else logging.INFO
+        message = MESSAGES[i % 3]
+        record = logging.LogRecord("fortipass", level, __file__, 0, message, (i,) if "%s" in message else None, None)
+        record.created = 1_700_000_000 + i
+        handler.emit(record)
+
+
+def test_search_by_level_and_text_across_segments(tmp_path):
+    """Test wyszukiwania po poziomie i tekście w segmentach i aktywnym pliku."""
+    log_file = tmp_path / "password_generator.log"
+    handler = RotatingLogHandler(log_file, max_bytes=4096)
+    write_log(handler, 599)
+    handler.stream.write("Traceback (most recent call last):\n")
+    handler.close()
+
+    document = LogDocument(log_file, cache_dir=tmp_path / "cache")
+    search = LogSearch(document)
+    errors = search.search(["error"])
+    assert len(errors) == 201 and document.lines(errors[-1], errors[-1] + 1) == ["Traceback (most recent call last):\n"]
+    assert all("ERROR - The lock file" in line for line in FilteredLines(document, errors[:-1]).lines(0, 200))
+    assert list(search.search(text="LOCK FI")) == list(errors[:-1])
+    assert [line.split(" - ")[-1] for line in FilteredLines(document, search.search(text="ength: 57")).lines(0, 10)] == \
+        ["Length: 57.\n", "Length: 570.\n", "Length: 573.\n", "Length: 576.\n", "Length: 579.\n"]
+    assert not search.search(["INFO"], "lock file") and not search.search(text="2023")
+    assert len(search.search(text="raceback (")) == 1
+    search.close()
+    document.close()
+
+
+def test_search_index_is_persisted_and_extended(tmp_path):
+    """Test trwałego indeksu wyszukiwania uzupełnianego o dopisane linie."""
+    log_file = tmp_path / "password_generator.log"
+    handler = RotatingLogHandler(log_file, max_bytes=1 << 20)
+    write_log(handler, 30)
+    handler.flush()
+
+    document = LogDocument(log_file, cache_dir=tmp_path / "cache")
+    search = LogSearch(document)
+    assert len(search.search(["ERROR"])) == 10
+    search.close()
+    assert any((tmp_path / "cache").glob("*/active.search"))
+
+    search = LogSearch(document)
+    assert search._index("active", document.active).count == 30
+    write_log(handler, 30, start=30)
+    handler.close()
+    document.refresh()
+    assert len(search.search(["ERROR"])) == 20 and search.indexes["active"].count == 60
+
+    log_file.write_text("2024-01-01 00:00:00,000 - ERROR - Fresh file.\n")
+    document.refresh()
+    assert list(search.search(["ERROR"], "fresh")) == [0]
+    search.close()
+    document.close()
+
+
+def test_log_command_filters_lines(tmp_path, monkeypatch, capsys):
+    """Test polecenia 'log' z filtrami poziomu, tekstu i czasu."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    log_file = tmp_path / "password_generator.log"
+    handler = RotatingLogHandler(log_file, max_bytes=4096)
+    write_log(handler, 300)
+    handler.close()
+
+    assert run_cli(["log", "--log-file", str(log_file), "--level", "error", "--grep", "lock", "-c"]) == 0
+    assert capsys.readouterr().out == "100\n"
+    second = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(1_700_000_010))
+    assert run_cli(["log", "--log-file", str(log_file), "--since", second, "--until", second, "--grep", "lock"]) == 0
+    output = capsys.readouterr().out.splitlines()
+    assert len(output) == 1 and output[0].startswith(second)
+    assert output[0].endswith("ERROR - The lock file could not be removed.")
+    assert run_cli(["log", "--log-file", str(tmp_path / "missing.log")]) == 2
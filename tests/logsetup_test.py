@@ -0,0 +1,61 @@
+import logging
+
+import pytest
+
+from logsetup import BatchingFileHandler, create_pipeline, resolve_level, setup_logging, stop_logging
+
+
+class Lazy:
+    """Obiekt zliczający formatowania komunikatu."""
+    calls = 0
+
+    def __str__(self):
+        Lazy.calls += 1
+        return "lazy"
+
+
+def test_pipeline_formats_in_listener_and_gates_levels(tmp_path):
+    """Test zapisu w tle: DEBUG pomijany przy INFO, formatowanie dopiero w wątku zapisu."""
+    log_file = tmp_path / "events.log"
+    queue_handler, listener = create_pipeline(BatchingFileHandler(log_file), "INFO")
+    logger = logging.getLogger("fortipass.test.pipeline")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(queue_handler)
+    listener.start()
+
+    Lazy.calls = 0
+    logger.debug("Skipped: %s", Lazy())
+    for i in range(200):
+        logger.info("Event %d: %s", i, Lazy())
+    listener.stop()
+    logger.removeHandler(queue_handler)
+    listener.handlers[0].close()
+
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == 200 and Lazy.calls == 200
+    assert lines[0].endswith(" - INFO - Event 0: lazy") and lines[-1].endswith("Event 199: lazy")
+
+
+def test_setup_logging_is_configured_once(tmp_path):
+    """Test jednej konfiguracji dla całego programu."""
+    log_file = tmp_path / "logs" / "password_generator.log"
+    try:
+        assert setup_logging("WARNING", log_file) == log_file
+        assert setup_logging("DEBUG", tmp_path / "other.log") == log_file
+        logging.info("Not written")
+        logging.warning("Written")
+    finally:
+        stop_logging()
+    assert log_file.read_text().count("WARNING - Written") == 1
+    assert "Not written" not in log_file.read_text()
+
+
+def test_resolve_level(monkeypatch):
+    """Test poziomu ze zmiennej środowiskowej i wartości domyślnej."""
+    monkeypatch.delenv("FORTIPASS_LOG_LEVEL", raising=False)
+    assert resolve_level() == logging.INFO
+    monkeypatch.setenv("FORTIPASS_LOG_LEVEL", "debug")
+    assert resolve_level() == logging.DEBUG
+    with pytest.raises(ValueError):
+        resolve_level("LOUD")
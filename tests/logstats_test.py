@@ -0,0 +1,81 @@
+import json
+import logging
+
+from cli import run_cli
+from logsetup import BatchingFileHandler, create_pipeline, event
+from logstats import LogStats, Summary, parse_record
+
+
+def write_events(log_file, count, start=0, max_bytes=1 << 20):
+    """Zapis zdarzeń 'generate' (co piąte z błędem) przez potok z logiem strukturalnym."""
+    structured = BatchingFileHandler(log_file, max_bytes=max_bytes, parse=parse_record)
+    queue_handler, listener = create_pipeline(BatchingFileHandler(log_file.with_suffix(".log")), "INFO", structured)
+    logger = logging.getLogger("fortipass.test.stats")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(queue_handler)
+    listener.start()
+    for i in range(start, start + count):
+        if i % 5 == 4:
+            logger.error("Input error: %s!", "too short", extra=event("generate"))
+        else:
+            logger.info("The password generated successfully.",
+                        extra=event("generate", length=12 + i % 2 * 4, composition=["letters", "digits"],
+                                    strength="strong" if i % 2 else "medium", duration_ms=0.5 if i % 3 else 7))
+    logger.info("The event log was displayed successfully.", extra=event("show_log"))
+    listener.stop()
+    logger.removeHandler(queue_handler)
+    for handler in listener.handlers:
+        handler.close()
+
+
+def test_structured_sink_records_event_fields(tmp_path):
+    """Test zapisu JSONL: pola zdarzenia obok zwykłego logu tekstowego."""
+    log_file = tmp_path / "password_generator.jsonl"
+    write_events(log_file, 2)
+
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert entries[0]["event"] == "generate" and entries[0]["length"] == 12 and entries[0]["strength"] == "medium"
+    assert entries[0]["composition"] == ["letters", "digits"] and entries[0]["duration_ms"] == 7
+    assert parse_record(log_file.read_text().splitlines()[0]) == (entries[0]["time"], "INFO")
+    assert (tmp_path / "password_generator.log").read_text().splitlines()[0].endswith(
+        "INFO - The password generated successfully.")
+
+
+def test_summary_is_cached_per_segment_and_extended(tmp_path):
+    """Test podsumowania: segmenty z pamięci podręcznej, aktywny plik czytany od ostatniej pozycji."""
+    log_file = tmp_path / "password_generator.jsonl"
+    write_events(log_file, 500, max_bytes=16384)
+    stats = LogStats(log_file, cache_dir=tmp_path / "cache")
+
+    summary = stats.summary()
+    assert len(stats.store.load_index()) >= 2
+    assert summary.records == 501 and summary.events == {"generate": 500, "show_log": 1}
+    assert summary.error_rates() == {"generate": 0.2} and summary.levels == {"INFO": 401, "ERROR": 100}
+    assert summary.lengths == {"12": 200, "16": 200} and summary.strengths == {"strong": 200, "medium": 200}
+    assert summary.durations == {"<=1": 266, "<=10": 134}
+
+    cached = sorted(path.name for path in stats.cache_dir.iterdir())
+    assert "active.json" in cached and "000001.json" in cached
+    offset = json.loads((stats.cache_dir / "active.json").read_text())["offset"]
+    assert offset == log_file.stat().st_size
+
+    write_events(log_file, 10, start=500, max_bytes=0)
+    summary = LogStats(log_file, cache_dir=tmp_path / "cache").summary()
+    assert summary.records == 512 and summary.events["generate"] == 510
+    assert Summary.from_dict(json.loads(json.dumps(summary.to_dict()))).to_dict() == summary.to_dict()
+
+
+def test_stats_command(tmp_path, monkeypatch, capsys):
+    """Test polecenia 'stats' (raport tekstowy i JSON)."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    log_file = tmp_path / "password_generator.jsonl"
+    write_events(log_file, 20)
+
+    assert run_cli(["stats", "--log-file", str(log_file)]) == 0
+    output = capsys.readouterr().out
+    assert "Events: generate: 20, show_log: 1" in output and "Errors: generate: 4 (20.0%)" in output
+    assert "Length: 12: 8, 16: 8" in output
+    assert run_cli(["stats", "--log-file", str(log_file), "--json"]) == 0
+    assert json.loads(capsys.readouterr().out)["records"] == 21
+    assert run_cli(["stats", "--log-file", str(tmp_path / "missing.jsonl")]) == 2
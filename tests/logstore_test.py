@@ -0,0 +1,162 @@
+import gzip
+import logging
+
+from logstore import LogStore, RotatingLogHandler, parse_line
+
+
+def write_entries(handler, count, level=logging.INFO, start=0):
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    for i in range(start, start + count):
+        record = logging.LogRecord("fortipass", level, __file__, 0, "Entry %05d", (i,), None)
+        record.created = 1_700_000_000 + i
+        handler.emit(record)
+
+
+def test_rotation_compresses_segments_and_indexes_them(tmp_path):
+    """Test rotacji: skompresowane segmenty, indeks i odczyt ciągły."""
+    log_file = tmp_path / "password_generator.log"
+    handler = RotatingLogHandler(log_file, max_bytes=4096)
+    write_entries(handler, 300)
+    write_entries(handler, 5, logging.ERROR, start=300)
+    handler.close()
+
+    store = LogStore(log_file)
+    segments = store.load_index()
+    assert len(segments) >= 3
+    assert all((tmp_path / s["name"]).exists() and s["bytes"] < s["raw_bytes"] for s in segments)
+    assert segments[0]["levels"] == {"INFO": segments[0]["lines"]}
+    assert segments[0]["start"] < segments[0]["end"] <= segments[1]["start"]
+    with gzip.open(tmp_path / segments[0]["name"], "rt") as f:
+        assert f.readline().endswith("INFO - Entry 00000\n")
+
+    lines = list(store.iter_lines())
+    assert [line[-6:-1] for line in lines] == [f"{i:05d}" for i in range(305)]
+
+
+def test_rotation_counts_encoded_bytes(tmp_path):
+    """Test rotacji wpisów spoza ASCII: rozmiar liczony w bajtach UTF-8, nie w znakach."""
+    log_file = tmp_path / "password_generator.log"
+    handler = RotatingLogHandler(log_file, max_bytes=4096)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    for i in range(200):
+        record = logging.LogRecord("fortipass", logging.INFO, __file__, 0, "Zażółć gęślą jaźń %05d", (i,), None)
+        handler.emit(record)
+    handler.close()
+
+    line_bytes = len("Zażółć gęślą jaźń 00000\n".encode("utf-8"))
+    segments = LogStore(log_file).load_index()
+    assert segments and all(s["raw_bytes"] < 4096 + line_bytes for s in segments)
+    assert log_file.stat().st_size < 4096
+
+
+def test_filters_skip_segments_by_index(tmp_path):
+    """Test filtrowania po poziomie i czasie z pominięciem zbędnych segmentów."""
+    log_file = tmp_path / "password_generator.log"
+    handler = RotatingLogHandler(log_file, max_bytes=4096)
+    write_entries(handler, 300)
+    write_entries(handler, 5, logging.ERROR, start=300)
+    handler.close()
+    store = LogStore(log_file)
+
+    assert all("ERROR" in s["levels"] for s in store.segments(levels=["ERROR"]))
+    errors = list(store.iter_lines(levels=["ERROR"]))
+    assert len(errors) == 5 and all(parse_line(line)[1] == "ERROR" for line in errors)
+
+    middle = store.load_index()[1]
+    window = list(store.iter_lines(start=middle["start"], end=middle["end"]))
+    assert len(window) == middle["lines"]
+
+
+def test_retention_and_recovery(tmp_path):
+    """Test limitu liczby segmentów i dokończenia przerwanej rotacji."""
+    log_file = tmp_path / "password_generator.log"
+    handler = RotatingLogHandler(log_file, max_bytes=2048, keep_segments=2)
+    write_entries(handler, 300)
+    handler.close()
+    store = LogStore(log_file)
+    assert len(store.load_index()) == 2
+    assert len(list(tmp_path.glob("*.gz"))) == 2
+
+    pending = store.detach()
+    assert pending.exists() and not log_file.exists()
+    RotatingLogHandler(log_file, max_bytes=2048, keep_segments=2).close()
+    assert not pending.exists()
+    assert store.load_index()[-1]["number"] == int(pending.name.rsplit(".", 1)[1])
+
+
+def test_line_index_is_persisted_and_extended(tmp_path):
+    """Test trwałego indeksu linii: ponowne otwarcie bez skanowania, dopisane linie, skrócenie pliku."""
+    from logstore import LineIndex
+
+    log_file, index_file = tmp_path / "events.log", tmp_path / "events.lines"
+    log_file.write_text("".join(f"line {i}\n" for i in range(1000)))
+    index = LineIndex(log_file, index_file)
+    assert len(index) == 1000 and index.lines(998, 1005) == ["line 998\n", "line 999\n"]
+    index.close()
+
+    index = LineIndex(log_file, index_file)
+    assert not index._dirty and len(index) == 1000
+    with open(log_file, "a") as f:
+        f.write("line 1000\nunterminated")
+    assert index.refresh() == "grown"
+    assert index.lines(999, 1002) == ["line 999\n", "line 1000\n", "unterminated\n"]
+
+    log_file.write_text("fresh\n")
+    assert index.refresh() == "reset"
+    assert len(index) == 1 and index.lines(0, 1) == ["fresh\n"]
+    index.close()
+
+
+def test_line_index_matching_across_blocks(tmp_path, monkeypatch):
+    """Test wyszukiwania blokami: wystąpienia na granicy bloków, jedno na linię, wielkość liter bez znaczenia."""
+    import logstore
+
+    log_file = tmp_path / "events.log"
+    log_file.write_text("xxERRORxx error\nnone\nxxxxxxxxxxxxxErr\nor\nxxxxxerror\nERROR")
+    index = logstore.LineIndex(log_file)
+    expected = [(0, 2), (4, 5), (5, 0)]
+    for block in (3, 5, 16, 1 << 20):
+        monkeypatch.setattr(logstore, "SCAN_BLOCK", block)
+        assert index.matching(b"error") == expected
+    index.close()
+
+
+def test_document_spans_segments_and_active_file(tmp_path):
+    """Test dostępu po numerze linii do segmentów i aktywnego pliku."""
+    from logstore import LogDocument
+
+    log_file = tmp_path / "password_generator.log"
+    handler = RotatingLogHandler(log_file, max_bytes=4096)
+    write_entries(handler, 300)
+    handler.flush()
+
+    document = LogDocument(log_file, cache_dir=tmp_path / "cache")
+    assert len(document) == 300 and document.segment_lines > 0
+    boundary = document.bases[1]
+    assert [line[-6:-1] for line in document.lines(boundary - 2, boundary + 2)] == \
+        [f"{i:05d}" for i in range(boundary - 2, boundary + 2)]
+    assert document.lines(299, 400)[0].endswith("Entry 00299\n")
+
+    write_entries(handler, 100, start=300)
+    handler.close()
+    document.refresh()
+    assert len(document) == 400 and document.lines(399, 400)[0].endswith("Entry 00399\n")
+    document.close()
+
+
+def test_file_watcher_detects_appends_and_rotation(tmp_path):
+    """Test wykrywania zmian pliku przez inotify i przez porównanie stat."""
+    from logwatch import FileWatcher
+
+    log_file = tmp_path / "password_generator.log"
+    log_file.write_text("first\n")
+    for use_inotify in (True, False):
+        watcher = FileWatcher(log_file, use_inotify=use_inotify)
+        assert not watcher.changed()
+        with open(log_file, "a") as f:
+            f.write("appended\n")
+        assert watcher.changed() and not watcher.changed()
+        log_file.rename(tmp_path / "password_generator.log.000001")
+        log_file.write_text("")
+        assert watcher.changed()
+        watcher.close()
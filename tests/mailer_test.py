@@ -0,0 +1,118 @@
+import csv
+import email
+
+import pytest
+
+from cli import run_cli
+from generator import get_policy
+from mailer import MailPool, Recipient, seal, unseal, password_jobs, read_recipients, ATTACHMENT
+from smtpsink import SmtpSink
+
+KDF = (1 << 10, 8, 1)  # szybki scrypt w testach
+
+
+def attachment(data):
+    """Zawartość załącznika z hasłem w wysłanej wiadomości."""
+    message = email.message_from_bytes(data)
+    return next(part for part in message.walk() if part.get_filename() == ATTACHMENT).get_payload(decode=True)
+
+
+def recipients(count):
+    return [Recipient(f"user{i}@example.com", f"User {i}", f"passphrase-{i}") for i in range(count)]
+
+
+def test_seal_and_unseal():
+    """Test szyfrowania załącznika: odczyt właściwym hasłem, błąd przy złym haśle lub obcym pliku."""
+    sealed = seal("S3cret!pass", "correct horse", KDF)
+    assert b"S3cret" not in sealed and unseal(sealed, "correct horse") == "S3cret!pass"
+    with pytest.raises(ValueError, match="Wrong passphrase"):
+        unseal(sealed, "wrong")
+    with pytest.raises(ValueError, match="not a password sealed"):
+        unseal(b"hello", "correct horse")
+
+
+@pytest.mark.parametrize("pipelining", [True, False])
+def test_delivery_with_retries_and_rejections(pipelining):
+    """Test wysyłki: ponowienie po błędach 451, odrzucony adres, wiele wiadomości na jednym połączeniu."""
+    people = recipients(20) + [Recipient("gone@example.com", "", "passphrase")]
+    policy = get_policy(18)
+    with SmtpSink(pipelining=pipelining, temporary_failures=2, rejected={"gone@example.com"}) as sink:
+        pool = MailPool("127.0.0.1", sink.port, connections=3, per_connection=5, backoff=0.01)
+        passwords = {}
+        report = pool.deliver(password_jobs(people, "it@example.com", "Welcome", policy, passwords.__setitem__, KDF))
+
+    assert report.sent == 20 and report.retries == 2 and list(report.failed) == ["gone@example.com"]
+    assert "550" in report.failed["gone@example.com"] and report.rate > 0
+    assert 4 <= sink.connections <= 3 + 20 // 5 + 2
+    # PIPELINING: MAIL, RCPT i DATA w jednej porcji, treść w drugiej; bez niego - cztery odpowiedzi na wiadomość
+    per_message = (sink.round_trips - 2 * sink.connections) / 21
+    assert per_message < 2.5 if pipelining else per_message >= 4
+
+    delivered = {tuple(to): data for _, to, data in sink.messages}
+    assert len(delivered) == 20
+    password = unseal(attachment(delivered[("user7@example.com",)]), "passphrase-7")
+    assert len(password) == 18 and password == passwords["user7@example.com"] and len(passwords) == 21
+
+
+@pytest.mark.parametrize("pipelining", [True, False])
+def test_unsendable_address_fails_only_its_message(pipelining):
+    """Test adresu spoza ASCII (błąd kodowania w smtplib) - zgłoszony jako niewysłany, wątek wysyła dalej."""
+    people = [Recipient("jürgen@example.com", "", "passphrase"), Recipient("Ada <ada@example.com>", "Ada", "pp")]
+    people += recipients(3)
+    with SmtpSink(pipelining=pipelining) as sink:
+        pool = MailPool("127.0.0.1", sink.port, connections=1, backoff=0.01)
+        report = pool.deliver(password_jobs(people, "IT <it@example.com>", "Welcome", get_policy(12),
+                                            lambda *entry: None, KDF))
+    assert report.sent == 4 and list(report.failed) == ["jürgen@example.com"] and report.retries == 0
+    # Adres z nazwą: w MAIL FROM i RCPT TO tylko adres w nawiasach ostrych
+    assert {(sender, tuple(to)) for sender, to, _ in sink.messages} >= {("it@example.com", ("ada@example.com",))}
+
+
+def test_read_recipients_rejects_non_ascii(tmp_path):
+    """Test odrzucenia pliku odbiorców z adresem spoza ASCII (serwery bez SMTPUTF8)."""
+    source = tmp_path / "people.csv"
+    source.write_text("email\nada@example.com\njürgen@example.com\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=":3: e-mail address 'jürgen@example.com' is not ASCII"):
+        read_recipients(source)
+
+
+def test_configuration_error_aborts_delivery():
+    """Test przerwania wysyłki po błędzie konfiguracji (serwer bez AUTH) - bez ponowień."""
+    with SmtpSink() as sink:
+        pool = MailPool("127.0.0.1", sink.port, user="it", password="secret", connections=2, backoff=0.01)
+        jobs = password_jobs(recipients(6), "it@example.com", "Welcome", get_policy(12), lambda *entry: None, KDF)
+        report = pool.deliver(jobs)
+    assert report.sent == 0 and report.retries == 0 and len(report.failed) == 6
+    assert all("AUTH" in error for error in report.failed.values()) and not sink.messages
+
+
+def test_mail_commands(tmp_path, capsys, monkeypatch):
+    """Test poleceń 'mail send' (wysłane hasła i wygenerowane hasła szyfrujące w plikach 0600) i 'mail open'."""
+    source = tmp_path / "people.csv"
+    source.write_text("email,name\nada@example.com,Ada\nalan@example.com,Alan\n")
+    passwords, passphrases = tmp_path / "passwords.csv", tmp_path / "passphrases.csv"
+    passwords.write_text("stale\n")
+    passwords.chmod(0o644)
+    with SmtpSink() as sink:
+        command = ["mail", "send", str(source), "--from", "it@example.com", "--host", "127.0.0.1",
+                   "--port", str(sink.port), "--length", "16", "--passwords", str(passwords)]
+        assert run_cli(command) == 2
+        assert "--passphrases" in capsys.readouterr().err
+        assert run_cli(command + ["--passphrases", str(passphrases)]) == 0
+    assert "messages/s" in capsys.readouterr().err
+
+    with open(passphrases, newline="") as f:
+        generated = {row["email"]: row["passphrase"] for row in csv.DictReader(f)}
+    assert sorted(generated) == ["ada@example.com", "alan@example.com"]
+    assert oct(passphrases.stat().st_mode & 0o777) == "0o600"
+    with open(passwords, newline="") as f:
+        sent = {row["email"]: row["password"] for row in csv.DictReader(f)}
+    assert sorted(sent) == sorted(generated) and oct(passwords.stat().st_mode & 0o777) == "0o600"
+    for _, to, data in sink.messages:
+        assert unseal(attachment(data), generated[to[0]]) == sent[to[0]] and len(sent[to[0]]) == 16
+
+    message = next(data for _, to, data in sink.messages if to == ["ada@example.com"])
+    (tmp_path / ATTACHMENT).write_bytes(attachment(message))
+    monkeypatch.setattr("getpass.getpass", lambda prompt="": generated["ada@example.com"])
+    assert run_cli(["mail", "open", str(tmp_path / ATTACHMENT)]) == 0
+    assert capsys.readouterr().out.strip() == sent["ada@example.com"]
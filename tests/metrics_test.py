@@ -0,0 +1,103 @@
+import json
+import time
+
+import pytest
+
+from cli import run_cli
+from lock import AppLocker
+from metrics import Metrics, NULL_SPAN, BUCKETS, describe, format_prometheus
+
+
+def test_spans_record_histograms_only_when_enabled():
+    """Test pomiarów: wyłączony rejestr nic nie zapisuje, włączony liczy czasy, błędy i liczniki."""
+    metrics = Metrics()
+
+    @metrics.timed("work")
+    def work(fail=False):
+        if fail:
+            raise ValueError("broken")
+        return 42
+
+    assert metrics.span("work") is NULL_SPAN and work() == 42
+    metrics.increment("copies")
+    assert metrics.snapshot()["spans"] == {} and metrics.snapshot()["counters"] == {}
+
+    metrics.enabled = True
+    for _ in range(3):
+        work()
+    with pytest.raises(ValueError):
+        work(fail=True)
+    with metrics.span("slow"):
+        time.sleep(0.003)
+    metrics.observe("startup", 20.0)
+    metrics.increment("copies", 2)
+
+    snapshot = json.loads(json.dumps(metrics.snapshot()))
+    assert snapshot["spans"]["work"]["count"] == 4 and snapshot["spans"]["work"]["errors"] == 1
+    work_buckets = snapshot["spans"]["work"]["buckets"]
+    assert work_buckets[0] == 4 and len(work_buckets) == len(BUCKETS) + 1
+    assert snapshot["spans"]["startup"]["buckets"][-1] == 1 and snapshot["counters"] == {"copies": 2}
+    rows = {row[0]: row for row in describe(snapshot)}
+    assert rows["slow"][3] >= 3 and rows["slow"][4] == rows["slow"][5] == rows["slow"][6]
+    assert rows["startup"][5] == rows["startup"][6] == 20000.0
+
+    metrics.reset()
+    assert metrics.snapshot()["spans"] == {}
+
+
+def test_prometheus_and_json_export(tmp_path):
+    """Test eksportu: skumulowane przedziały Prometheus, suma i liczba; JSON według rozszerzenia pliku."""
+    metrics = Metrics(enabled=True)
+    for seconds in (0.0002, 0.003, 0.003, 0.2):
+        metrics.observe('gui."copy"', seconds)
+
+    text = format_prometheus(metrics.snapshot())
+    assert "# TYPE fortipass_span_duration_seconds histogram" in text
+    assert 'fortipass_span_duration_seconds_bucket{span="gui.\\"copy\\"",le="0.0005"} 1' in text
+    assert 'fortipass_span_duration_seconds_bucket{span="gui.\\"copy\\"",le="0.005"} 3' in text
+    assert 'fortipass_span_duration_seconds_bucket{span="gui.\\"copy\\"",le="+Inf"} 4' in text
+    assert 'fortipass_span_duration_seconds_count{span="gui.\\"copy\\""} 4' in text
+
+    assert metrics.write(tmp_path / "metrics.prom").read_text() == text
+    snapshot = json.loads(metrics.write(tmp_path / "out" / "metrics.json").read_text())
+    assert snapshot["spans"]['gui."copy"']["count"] == 4
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == ".tmp"] == []
+
+
+def test_profile_captures_one_slow_action(tmp_path):
+    """Test profilowania: szybsze operacje pomijane, zapisany profil pierwszej wolnej, potem profilowanie wyłączone."""
+    import pstats
+
+    metrics = Metrics()
+    profile = tmp_path / "slow.prof"
+    metrics.profile_next("slow", profile, min_seconds=0.01)
+
+    with metrics.span("other"):
+        time.sleep(0.02)
+    with metrics.span("slow"):
+        pass
+    assert not profile.exists() and metrics.profile_target == "slow"
+
+    with metrics.span("slow"):
+        time.sleep(0.02)
+    assert profile.exists() and metrics.last_profile == profile and metrics.profile_target is None
+    assert any("sleep" in function for _, _, function in pstats.Stats(str(profile)).stats)
+    assert metrics.span("slow") is NULL_SPAN and metrics.snapshot()["spans"] == {}
+
+
+def test_remote_metrics_cli(tmp_path, monkeypatch, capsys):
+    """Test polecenia 'remote metrics' (tabela i format Prometheus)."""
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    metrics = Metrics(enabled=True)
+    metrics.observe("gui.generate_password", 0.004)
+    locker = AppLocker(lock_file=str(tmp_path / "fortipass.lock"))
+    locker.lock_instance()
+    locker.listen({"metrics": lambda request: {"metrics": metrics.snapshot()}})
+    try:
+        assert run_cli(["remote", "metrics"]) == 0
+        row = capsys.readouterr().out.splitlines()[1].split()
+        assert row == ["gui.generate_password", "1", "0", "4.00", "4.00", "4.00", "4.00"]
+        assert run_cli(["remote", "metrics", "-f", "prometheus"]) == 0
+        assert 'fortipass_span_duration_seconds_count{span="gui.generate_password"} 1' in capsys.readouterr().out
+    finally:
+        locker.unlock_instance()
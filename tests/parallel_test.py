@@ -0,0 +1,23 @@
+from generator import Policy
+from parallel import iter_passwords_parallel, shard_sizes
+
+
+def test_shard_sizes():
+    """Test podziału zlecenia na partie."""
+    assert list(shard_sizes(2500, 1000)) == [1000, 1000, 500]
+    assert list(shard_sizes(0, 1000)) == []
+
+
+def test_parallel_ordered_chunks():
+    """Test zachowania stabilnej kolejności partii z puli procesów."""
+    chunks = list(iter_passwords_parallel(2300, Policy(length=10), workers=2, chunk_size=500))
+
+    assert [len(c) for c in chunks] == [500, 500, 500, 500, 300]
+    assert all(len(p) == 10 for chunk in chunks for p in chunk)
+
+
+def test_parallel_unordered_count():
+    """Test trybu bez zachowania kolejności (liczba haseł musi się zgadzać)."""
+    chunks = iter_passwords_parallel(1234, Policy(length=8), workers=2, chunk_size=100, ordered=False)
+
+    assert sum(len(c) for c in chunks) == 1234
@@ -0,0 +1,60 @@
+import pytest
+
+from patterns import Trie, PatternMatcher, load_trie
+
+
+@pytest.fixture(scope="module")
+def matcher(tmp_path_factory):
+    """Obiekt dopasowujący z trie zapisanym w katalogu tymczasowym."""
+    return PatternMatcher(load_trie(tmp_path_factory.mktemp("cache")))
+
+
+def test_trie_binary_cache_roundtrip(tmp_path):
+    """Test zapisu trie do pliku binarnego i ponownego odczytu."""
+    first = load_trie(tmp_path)
+    cache_file = tmp_path / "dictionaries.trie"
+    second = load_trie(tmp_path)
+
+    assert cache_file.exists()
+    assert first.labels == second.labels and list(first.ranks) == list(second.ranks)
+    assert Trie.from_bytes(cache_file.read_bytes(), b"\0" * 32) is None, "A stale cache must be rebuilt"
+
+
+@pytest.mark.parametrize("password, pattern, token", [
+    ("xPassword", "dictionary", "Password"),
+    ("p@ssw0rd", "dictionary", "p@ssw0rd"),
+    ("drowssap", "dictionary", "drowssap"),
+    ("zxcvbn", "spatial", "zxcvbn"),
+    ("x13579", "sequence", "13579"),
+    ("xyzabcabc", "repeat", "abcabc"),
+    ("born19.05.1991", "date", "19.05.1991"),
+])
+def test_pattern_detection(matcher, password, pattern, token):
+    """Test wykrywania słów, l33t, ścieżek klawiatury, sekwencji, powtórzeń i dat."""
+    _, sequence = matcher.analyze(password)
+    assert (pattern, token) in [(m.pattern, m.token) for m in sequence]
+
+
+def test_words_after_long_runs(matcher):
+    """Test słów i dat poza długim powtórzeniem (w nim nie są szukane) - pozycje względem całego hasła."""
+    _, sequence = matcher.analyze("1111111111password" + "abcdefghij" + "x19.05.1991")
+    found = [(m.pattern, m.i, m.j, m.token) for m in sequence]
+    assert ("repeat", 0, 9, "1111111111") in found and ("dictionary", 10, 17, "password") in found
+    assert ("sequence", 18, 27, "abcdefghij") in found and ("date", 29, 38, "19.05.1991") in found
+
+
+def test_random_password_is_not_penalised(matcher):
+    """Test braku wzorców w losowym haśle."""
+    bits, sequence = matcher.analyze("k7Rm2pQx9wZb")
+    assert sequence == []
+    assert bits > 70
+
+
+def test_spatial_guesses_are_bounded():
+    """Test liczby prób dla ścieżki o setkach zwrotów (ograniczona długość, wynik skończony)."""
+    from patterns import _spatial_guesses, MAX_SPATIAL_LENGTH
+
+    longest = _spatial_guesses(MAX_SPATIAL_LENGTH, MAX_SPATIAL_LENGTH - 1, 0, 94, 4.6)
+    assert _spatial_guesses(600, 599, 300, 94, 4.6) < float("inf")
+    assert _spatial_guesses(600, 599, 0, 94, 4.6) == longest
+    assert _spatial_guesses(6, 1, 0, 94, 4.6) < _spatial_guesses(6, 3, 0, 94, 4.6) < longest
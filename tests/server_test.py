@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+from server import PasswordService, start
+
+
+async def request(reader, writer, method, target, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+def exchange(requests, unix_socket=None):
+    """Uruchamia usługę, wysyła żądania jednym połączeniem keep-alive i zwraca odpowiedzi."""
+    async def scenario():
+        service = PasswordService(workers=1)
+        server = await start(service, port=0, unix_socket=unix_socket)
+        try:
+            if unix_socket:
+                reader, writer = await asyncio.open_unix_connection(unix_socket)
+            else:
+                reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            responses = [await request(reader, writer, *r) for r in requests]
+            writer.close()
+            return responses
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+    return asyncio.run(scenario())
+
+
+def test_generate_batches_over_keep_alive():
+    """Test partii haseł (w pętli zdarzeń i w puli procesów) na jednym połączeniu."""
+    small, large = exchange([("GET", "/generate?count=3&length=20&classes=letters,digits"),
+                             ("GET", "/generate?count=500")])
+
+    assert small[0] == 200 and len(small[1]["passwords"]) == 3
+    assert all(len(p) == 20 and p.isalnum() for p in small[1]["passwords"])
+    assert large[0] == 200 and len(large[1]["passwords"]) == 500
+
+
+def test_strength_and_errors():
+    """Test oceny siły (krótkie partie w pętli zdarzeń, długie hasła w puli procesów) oraz odpowiedzi błędów."""
+    strength, walks, too_long, invalid, missing, unknown = exchange([
+        ("POST", "/strength", {"passwords": ["x7#Qm9!vR2$kLp", "Weak123"]}),
+        ("POST", "/strength", {"passwords": ["12" * 128, "qwerty" * 42]}),
+        ("POST", "/strength", {"passwords": ["Weak123", "x" * 257]}),
+        ("GET", "/generate?length=2"),
+        ("GET", "/generate?classes=emoji"),
+        ("GET", "/missing"),
+    ])
+
+    assert strength[0] == 200
+    assert [r["tier"] for r in strength[1]["results"]] == ["strong", "weak"]
+    assert walks[0] == 200 and [r["tier"] for r in walks[1]["results"]] == ["weak", "weak"]
+    assert too_long[0] == 400 and "longer than 256" in too_long[1]["error"]
+    assert invalid[0] == 400 and "at least 4 characters" in invalid[1]["error"]
+    assert missing[0] == 400 and "emoji" in missing[1]["error"]
+    assert unknown[0] == 404
+
+
+def test_unix_socket(tmp_path):
+    """Test obsługi żądań na gnieździe Unix."""
+    [(status, payload)] = exchange([("GET", "/health")], unix_socket=str(tmp_path / "fortipass.sock"))
+    assert status == 200 and payload["status"] == "ok"
@@ -0,0 +1,150 @@
+# Lokalny serwer SMTP dla tests/mailer_test.py i benchmarks/bench_mailer.py (poza pakietem fortipass)
+
+import asyncio, threading
+
+
+HOSTNAME = "fortipass-sink"
+READ_SIZE = 1 << 16
+
+
+class SmtpSink:
+    def __init__(self, host="127.0.0.1", port=0, pipelining=True, latency=0.0, temporary_failures=0,
+                 rejected=()):
+        """Lokalny serwer SMTP zbierający wiadomości w pamięci (zamiast aiosmtpd w testach i benchmarkach).
+        latency - opóźnienie odpowiedzi na każdą porcję poleceń (czas przesyłu w sieci),
+        temporary_failures - liczba pierwszych poleceń MAIL odrzucanych kodem 451, rejected - adresy odrzucane (550)"""
+        self.host = host
+        self.port = port
+        self.pipelining = pipelining
+        self.latency = latency
+        self.temporary_failures = temporary_failures
+        self.rejected = {address.lower() for address in rejected}
+        self.messages = []  # (nadawca, odbiorcy, treść)
+        self.connections = 0
+        self.round_trips = 0  # porcje odpowiedzi wysłane klientom
+        self.loop = None
+        self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Uruchamia serwer w wątku tła; port 0 - wolny port przydzielony przez system (atrybut port)"""
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            try:
+                server = self.loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                self.loop.close()
+                return
+            self.port = server.sockets[0].getsockname()[1]
+            ready.set()
+            try:
+                self.loop.run_forever()
+            finally:
+                server.close()
+                tasks = asyncio.all_tasks(self.loop)
+                for task in tasks:
+                    task.cancel()
+                self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+                self.loop.close()
+
+        self.thread = threading.Thread(target=run, name="smtp-sink", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    async def _handle(self, reader, writer):
+        """Sesja SMTP: polecenia przetwarzane porcjami (PIPELINING), odpowiedzi wysyłane razem"""
+        self.connections += 1
+        writer.write(f"220 {HOSTNAME} ESMTP\r\n".encode())
+        session = {"sender": None, "recipients": [], "data": None}
+        buffer = b""
+        try:
+            while True:
+                chunk = await reader.read(READ_SIZE)
+                if not chunk:
+                    break
+                *lines, buffer = (buffer + chunk).split(b"\r\n")
+                replies = []
+                closing = False
+                for line in lines:
+                    reply = self._line(session, line)
+                    if reply is not None:
+                        replies.append(reply)
+                    if reply == "221 Bye":
+                        closing = True
+                        break
+                if replies:
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    self.round_trips += 1
+                    writer.write("".join(reply + "\r\n" for reply in replies).encode())
+                    await writer.drain()
+                if closing:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _line(self, session, line):
+        """Odpowiedź na linię klienta (None - linia treści wiadomości)"""
+        if session["data"] is not None:
+            if line != b".":
+                session["data"].append(line[1:] if line.startswith(b".") else line)
+                return None
+            self.messages.append((session["sender"], session["recipients"], b"\r\n".join(session["data"]) + b"\r\n"))
+            session.update(sender=None, recipients=[], data=None)
+            return "250 OK: queued"
+
+        command, _, argument = line.decode("ascii", "replace").partition(" ")
+        command = command.upper()
+        address = argument.partition(":")[2].strip().split(" ")[0].strip("<>")
+        if command == "EHLO":
+            extensions = ["PIPELINING"] if self.pipelining else []
+            return "\r\n".join(f"250-{item}" for item in [HOSTNAME] + extensions) + "\r\n250 8BITMIME"
+        if command == "HELO":
+            return f"250 {HOSTNAME}"
+        if command == "MAIL":
+            if self.temporary_failures > 0:
+                self.temporary_failures -= 1
+                return "451 4.3.0 Try again later"
+            session.update(sender=address, recipients=[])
+            return "250 OK"
+        if command == "RCPT":
+            if session["sender"] is None:
+                return "503 5.5.1 Error: need MAIL command"
+            if address.lower() in self.rejected:
+                return "550 5.1.1 Mailbox unavailable"
+            session["recipients"].append(address)
+            return "250 OK"
+        if command == "DATA":
+            if not session["recipients"]:
+                return "554 5.5.1 Error: no valid recipients"
+            session["data"] = []
+            return "354 End data with <CR><LF>.<CR><LF>"
+        if command == "RSET":
+            session.update(sender=None, recipients=[])
+            return "250 OK"
+        if command == "NOOP":
+            return "250 OK"
+        if command == "QUIT":
+            return "221 Bye"
+        return "500 5.5.2 Error: command not recognized"
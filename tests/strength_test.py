@@ -0,0 +1,50 @@
+import pytest
+
+from strength import estimate, evaluate_many, class_mask, LOWER, UPPER, DIGIT, SPECIAL, OTHER
+
+
+def test_class_mask_single_pass():
+    """Test klasyfikacji znaków przez tablicę 256 wpisów."""
+    assert class_mask("aZ9!") == LOWER | UPPER | DIGIT | SPECIAL
+    assert class_mask("żółw 1") == LOWER | DIGIT | OTHER
+    assert class_mask("") == 0
+
+
+@pytest.mark.parametrize("password, expected", [
+    ("x7#Qm9!vR2$kLp", "strong"),
+    ("k7Rm2pQx9wZb", "medium"),
+    ("Weak123", "weak"),
+    ("Password123!", "weak"),
+    ("StrongPass123!", "weak"),
+    ("123", "weak"),
+    ("", "weak"),
+])
+def test_estimate_tiers(password, expected):
+    """Test poziomów siły hasła wyznaczanych z entropii."""
+    bits, strength = estimate(password)
+    assert strength == expected
+    assert bits >= 0
+
+
+def test_evaluate_many_matches_estimate():
+    """Test zgodności oceny wsadowej z oceną pojedynczego hasła."""
+    passwords = ["x7#Qm9!vR2$kLp", "", "Weak123", "zażółć gęślą", "", "aaaa", "A1!"]
+    results = evaluate_many(passwords)
+
+    assert [s for _, s in results] == [estimate(p)[1] for p in passwords]
+    assert [round(b, 6) for b, _ in results] == [round(estimate(p)[0], 6) for p in passwords]
+
+
+def test_long_keyboard_walk_and_long_input(tmp_path, capsys):
+    """Test długiej ścieżki klawiatury z wieloma zwrotami i bardzo długiego wejścia (bez przepełnienia)."""
+    from cli import run_cli
+
+    bits, strength = estimate("12" * 300)
+    assert strength == "weak" and bits < estimate("12" * 10)[0] + 5
+    assert estimate("1" * 8000)[1] == "weak"
+    assert estimate("qwerty" * 100)[1] == "weak"
+
+    source = tmp_path / "export.txt"
+    source.write_text("12" * 300 + "\n")
+    assert run_cli(["audit", str(source)]) == 0
+    assert capsys.readouterr().out.endswith("\tweak\n")
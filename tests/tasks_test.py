@@ -0,0 +1,86 @@
+import time
+import threading
+
+import pytest
+
+from tasks import Cancelled, TaskRunner
+
+
+def test_results_and_progress_are_delivered_by_drain():
+    """Test przekazania wyniku, postępu i błędu przez kolejkę (wywołania zwrotne tylko w drain)."""
+    runner = TaskRunner(max_workers=2)
+    events = []
+
+    def work(task, count):
+        for i in range(count):
+            task.report(i, count)
+        return count * 2
+
+    def fail(task):
+        raise ValueError("broken")
+
+    task = runner.submit(work, 3, on_done=lambda result: events.append(("done", result)),
+                         on_progress=lambda done, total: events.append(("progress", done, total)))
+    failed = runner.submit(fail, on_error=lambda error: events.append(("error", str(error))))
+    assert task.result(5) == 6
+    with pytest.raises(ValueError):
+        failed.result(5)
+    assert events == []
+
+    runner.drain()
+    assert [e for e in events if e[0] == "progress"] == [("progress", 0, 3), ("progress", 1, 3), ("progress", 2, 3)]
+    assert ("done", 6) in events and ("error", "broken") in events
+    runner.shutdown()
+
+
+def test_cancelled_task_stops_at_progress_report():
+    """Test anulowania: zadanie przerwane przy raporcie postępu, bez wywołania on_done."""
+    runner = TaskRunner(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    done = []
+
+    def work(task):
+        started.set()
+        release.wait(5)
+        task.report(1, 2)
+        return "finished"
+
+    task = runner.submit(work, on_done=done.append)
+    queued = runner.submit(work, on_done=done.append)
+    assert started.wait(5)
+    task.cancel()
+    queued.cancel()
+    release.set()
+    with pytest.raises(Cancelled):
+        task.result(5)
+    assert queued.future.cancelled()
+    runner.drain()
+    assert done == [] and task.cancelled
+    runner.shutdown()
+
+
+def test_pool_is_bounded():
+    """Test ograniczenia liczby jednocześnie wykonywanych zadań."""
+    runner = TaskRunner(max_workers=2)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+    release = threading.Event()
+
+    def work(task):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait(5)
+        with lock:
+            running[0] -= 1
+
+    tasks = [runner.submit(work) for _ in range(6)]
+    for _ in range(500):
+        if running[0] == 2:
+            break
+        time.sleep(0.01)
+    release.set()
+    for task in tasks:
+        task.result(5)
+    assert peak[0] == 2
+    runner.shutdown()
@@ -0,0 +1,106 @@
+import multiprocessing
+
+import pytest
+
+from uniqueness import BloomFilter, UniquenessStore, unique_chunks, optimal_parameters
+
+
+def test_bloom_filter_persists_between_runs(tmp_path):
+    """Test trwałości filtra Blooma w pliku mapowanym w pamięci."""
+    path = tmp_path / "issued.bloom"
+    with BloomFilter.create(path, capacity=1000, fp_rate=1e-4) as bloom:
+        assert bloom.add("first") is True
+        assert bloom.add("first") is False
+
+    with BloomFilter(path) as bloom:
+        assert "first" in bloom and "second" not in bloom
+        assert bloom.count == 1
+
+
+@pytest.mark.parametrize("content", [b"", b"FPBLOOM1", b"NOTBLOOM" + bytes(60)])
+def test_invalid_bloom_filter_file(tmp_path, content):
+    """Test odrzucenia pustego, uciętego lub obcego pliku filtra (bez zmiany jego zawartości)."""
+    path = tmp_path / "issued.bloom"
+    path.write_bytes(content)
+    with pytest.raises(ValueError, match="not a valid FortiPass Bloom filter"):
+        BloomFilter(path)
+    assert path.read_bytes() == content
+
+
+def test_store_grows_and_keeps_false_positive_rate(tmp_path):
+    """Test skalowania magazynu: nowe segmenty po przekroczeniu pojemności."""
+    with UniquenessStore(tmp_path / "store", capacity=500, fp_rate=1e-3) as store:
+        issued = [f"password-{i}" for i in range(3000)]
+        assert sum(store.add_many(issued)) >= 2990
+        assert len(store.segments) > 1
+        assert not any(store.add_many(issued[::7]))
+        false_positives = sum(f"other-{i}" in store for i in range(5000))
+        assert false_positives < 25
+
+
+def test_merge_worker_stores(tmp_path):
+    """Test scalania magazynów utworzonych przez równoległe procesy."""
+    main = UniquenessStore(tmp_path / "main", capacity=1000)
+    worker = main.fork(tmp_path / "worker")
+    worker.add_many(["from-worker"])
+    main.add_many(["from-main"])
+    main.merge(worker)
+
+    assert "from-worker" in main and "from-main" in main
+    assert all(segment._map.closed for segment in worker.segments) and worker.lock_fd is None
+    with pytest.raises(ValueError):
+        main.merge(UniquenessStore(tmp_path / "other", capacity=1000))
+    main.close()
+    worker.close()
+
+
+def _add_from_process(directory, prefix):
+    with UniquenessStore(directory, capacity=200, fp_rate=1e-4) as store:
+        for start in range(0, 2000, 50):
+            store.add_many([f"{prefix}-{i}" for i in range(start, start + 50)])
+
+
+def test_concurrent_processes_share_the_store(tmp_path):
+    """Test blokady między procesami: równoległe dodawanie i wzrost bez błędów i bez utraconych wpisów."""
+    directory = tmp_path / "store"
+    UniquenessStore(directory, capacity=200, fp_rate=1e-4).close()
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_add_from_process, args=(directory, f"p{n}")) for n in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [process.exitcode for process in processes] == [0, 0, 0, 0]
+
+    with UniquenessStore(directory, capacity=200, fp_rate=1e-4) as store:
+        assert all(f"p{n}-{i}" in store for n in range(4) for i in range(0, 2000, 37))
+        assert 7900 <= len(store) <= 8000
+        assert not any(store.add_many([f"p3-{i}" for i in range(2000)]))
+
+
+def test_unique_chunks_replaces_duplicates(tmp_path):
+    """Test zastępowania haseł wydanych w poprzednich partiach."""
+    replacements = iter(["fresh-1", "fresh-2"])
+    with UniquenessStore(tmp_path / "store", capacity=100) as store:
+        chunks = list(unique_chunks([["a", "b"], ["a", "c", "b"]], store, lambda: next(replacements)))
+    assert chunks == [["a", "b"], ["fresh-1", "c", "fresh-2"]]
+
+
+def test_optimal_parameters():
+    """Test doboru rozmiaru filtra do zadanego błędu."""
+    bits, hashes = optimal_parameters(1_000_000, 0.01)
+    assert 9_500_000 < bits < 9_700_000 and hashes == 7
+
+
+def test_gen_never_repeats_across_runs(tmp_path):
+    """Test unikalności haseł między kolejnymi uruchomieniami 'gen'."""
+    from cli import run_cli
+
+    store = tmp_path / "issued"
+    outputs = [tmp_path / "first.txt", tmp_path / "second.txt"]
+    for output in outputs:
+        assert run_cli(["gen", "--count", "2000", "--length", "4", "--no-letters", "--no-special",
+                        "--unique-store", str(store), "--quiet", "-o", str(output)]) == 0
+
+    passwords = outputs[0].read_text().split() + outputs[1].read_text().split()
+    assert len(passwords) == len(set(passwords)) == 4000
@@ -0,0 +1,41 @@
+import string
+import pytest
+
+from generator import Policy
+import vectorized
+
+
+def test_fallback_without_vectorized_support():
+    """Test zgodności wyników z silnikiem w czystym Pythonie (np. polityka bez powtórzeń)."""
+    policy = Policy(length=12, no_repeat=True)
+    chunks = list(vectorized.iter_passwords_vectorized(1500, policy, chunk_size=1000))
+    blocks = list(vectorized.iter_raw_blocks(10, policy))
+
+    assert [len(c) for c in chunks] == [1000, 500]
+    assert all(len(set(p)) == 12 for chunk in chunks for p in chunk)
+    assert bytes(blocks[0]).count(b"\n") == 10
+
+
+def test_matrix_class_minimums():
+    """Test macierzy haseł z NumPy: długość, alfabet i minimum z każdej klasy."""
+    pytest.importorskip("numpy")
+    policy = Policy(length=8, min_numbers=2, min_special=3, exclude_ambiguous=True)
+    matrix = vectorized.generate_matrix(5000, policy)
+
+    assert matrix.shape == (5000, 8)
+    for row in matrix:
+        password = row.tobytes().decode("ascii")
+        assert sum(c in string.digits for c in password) >= 2
+        assert sum(c in string.punctuation for c in password) >= 3
+        assert any(c in string.ascii_letters for c in password)
+        assert not set(password) & set("O0l1I")
+
+
+def test_raw_blocks_are_zero_copy_buffers():
+    """Test buforów formatu 'raw' udostępnianych jako memoryview."""
+    pytest.importorskip("numpy")
+    blocks = list(vectorized.iter_raw_blocks(2500, Policy(length=16), chunk_size=1000))
+
+    assert all(isinstance(block, memoryview) for block in blocks)
+    lines = b"".join(bytes(block) for block in blocks).split(b"\n")[:-1]
+    assert len(lines) == 2500 and all(len(line) == 16 for line in lines)